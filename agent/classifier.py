@@ -2,10 +2,24 @@
 分类Agent
 负责执行三级分类逻辑（支持多轮对话记忆）
 """
-from typing import List, Dict
+import asyncio
+from typing import List, Dict, Optional
 from loguru import logger
-from tools.classify_level import ClassifyLevelTool
+from config.settings import settings
+from tools.classify_level import ClassifyLevelTool, track_fallback
+from tools.classify_path import ClassifyPathTool
+from tools.preclassify import PreClassifyTool
+from tools.rule_classify import RuleClassifyTool
 from models.schemas import CategoryData, ClassificationResult
+from utils.category_store import pinned_categories
+from utils.rate_limiter import current_lane
+from utils.speculation import BranchPredictor
+
+# 支持的分类模式
+CLASSIFY_MODES = ("hierarchical", "flat")
+
+# 投机执行二级分类时最多同时发起的分支数
+MAX_SPECULATIVE_BRANCHES = 3
 
 
 class ClassificationAgent:
@@ -18,11 +32,111 @@ class ClassificationAgent:
         Args:
             categories: 分类数据
         """
-        self.categories = categories
+        self._categories = categories
         self.classify_tool = ClassifyLevelTool(categories=categories)
+        self.path_tool = ClassifyPathTool(categories=categories)
+        self.preclassify_tool = PreClassifyTool(categories=categories)
+        self.rule_tool = RuleClassifyTool(categories=categories)
+        self.branch_predictor = BranchPredictor()
         logger.debug("分类Agent初始化完成")
 
-    def classify(self, cleaned_conversation: str) -> ClassificationResult:
+    def classify(
+        self,
+        cleaned_conversation: str,
+        mode: Optional[str] = None,
+        full_conversation: Optional[str] = None
+    ) -> ClassificationResult:
+        """
+        执行分类
+
+        Args:
+            cleaned_conversation: 清洗后的对话（可能已按分类预算截断）
+            mode: 分类模式（hierarchical / flat），为空使用配置
+            full_conversation: 未截断的清洗后对话（近邻预分类用，与索引样本保持一致），为空时同 cleaned_conversation
+
+        Returns:
+            分类结果
+        """
+        rule_path = self.rule_tool._run(conversation=cleaned_conversation)
+        if rule_path is not None and self.rule_tool.decisive:
+            return self._path_result(rule_path)
+
+        path = self.preclassify_tool._run(conversation=full_conversation or cleaned_conversation)
+        if path is not None:
+            self.rule_tool.record_decision(rule_path, path, source="preclassify")
+            return self._path_result(path)
+
+        with track_fallback() as fallbacks:
+            result = self._classify_llm(cleaned_conversation, mode)
+        result.fallback = bool(fallbacks)
+        self.rule_tool.record_decision(rule_path, result.path, source="llm")
+        return result
+
+    async def aclassify(
+        self,
+        cleaned_conversation: str,
+        mode: Optional[str] = None,
+        full_conversation: Optional[str] = None
+    ) -> ClassificationResult:
+        """
+        异步执行分类（不阻塞事件循环）
+
+        Args:
+            cleaned_conversation: 清洗后的对话（可能已按分类预算截断）
+            mode: 分类模式（hierarchical / flat），为空使用配置
+            full_conversation: 未截断的清洗后对话（近邻预分类用），为空时同 cleaned_conversation
+
+        Returns:
+            分类结果
+        """
+        # 规则匹配和近邻检索是本地计算，在线程中执行，不占用事件循环
+        rule_path = await asyncio.to_thread(self.rule_tool._run, conversation=cleaned_conversation)
+        if rule_path is not None and self.rule_tool.decisive:
+            return self._path_result(rule_path)
+
+        path = await asyncio.to_thread(
+            self.preclassify_tool._run, conversation=full_conversation or cleaned_conversation
+        )
+        if path is not None:
+            self.rule_tool.record_decision(rule_path, path, source="preclassify")
+            return self._path_result(path)
+
+        with track_fallback() as fallbacks:
+            result = await self._aclassify_llm(cleaned_conversation, mode)
+        result.fallback = bool(fallbacks)
+        self.rule_tool.record_decision(rule_path, result.path, source="llm")
+        return result
+
+    def _classify_llm(self, cleaned_conversation: str, mode: Optional[str] = None) -> ClassificationResult:
+        """规则和近邻预分类都未决定时的LLM分类（单次路径或分层）"""
+        if self.resolve_mode(mode) == "flat":
+            logger.info("开始分类（单次路径模式）...")
+            path = self.path_tool._run(conversation=cleaned_conversation)
+            if path is not None:
+                return self._path_result(path)
+            logger.warning("单次路径分类未得到有效结果，回退到分层分类")
+        return self._classify_hierarchical(cleaned_conversation)
+
+    async def _aclassify_llm(self, cleaned_conversation: str, mode: Optional[str] = None) -> ClassificationResult:
+        """规则和近邻预分类都未决定时的异步LLM分类（单次路径或分层）"""
+        if self.resolve_mode(mode) == "flat":
+            logger.info("开始分类（异步单次路径模式）...")
+            path = await self.path_tool._arun(conversation=cleaned_conversation)
+            if path is not None:
+                return self._path_result(path)
+            logger.warning("单次路径分类未得到有效结果，回退到分层分类")
+        return await self._aclassify_hierarchical(cleaned_conversation)
+
+    @staticmethod
+    def resolve_mode(mode: Optional[str] = None) -> str:
+        """确定分类模式（请求指定优先，其次使用配置）"""
+        mode = (mode or settings.classification_mode).lower()
+        if mode not in CLASSIFY_MODES:
+            logger.warning(f"未知的分类模式 '{mode}'，使用 hierarchical")
+            return "hierarchical"
+        return mode
+
+    def _classify_hierarchical(self, cleaned_conversation: str) -> ClassificationResult:
         """
         执行三级分类（多轮对话模式）
 
@@ -89,16 +203,176 @@ class ClassificationAgent:
             path=classification_path
         )
 
+    async def _aclassify_hierarchical(self, cleaned_conversation: str) -> ClassificationResult:
+        """
+        异步执行三级分类（多轮对话模式，不阻塞事件循环）
+
+        Args:
+            cleaned_conversation: 清洗后的对话
+
+        Returns:
+            分类结果
+        """
+        logger.info("开始分层分类（异步多轮对话模式）...")
+        classification_path = []
+        chat_history = []
+
+        # 一级分类（投机模式下同时提前发起最可能分支的二级分类）
+        level1_categories = self._get_level1_categories()
+        speculative = await self._start_speculation(cleaned_conversation, level1_categories)
+        try:
+            level1, chat_history = await self.classify_tool._arun(
+                conversation=cleaned_conversation,
+                available_categories=level1_categories,
+                current_path=[],
+                level=1,
+                chat_history=chat_history
+            )
+        except BaseException:
+            for task in speculative.values():
+                task.cancel()
+            raise
+        classification_path.append(level1)
+        logger.info(f"一级分类: {level1}")
+        self.branch_predictor.observe(level1)
+
+        # 二级分类（携带一级分类的历史；投机命中时直接使用提前发起的结果）
+        speculated = await self._take_speculation(speculative, level1)
+        if speculated is not None:
+            level2, chat_history = speculated
+        else:
+            level2, chat_history = await self.classify_tool._arun(
+                conversation=cleaned_conversation,
+                available_categories=self._get_level2_categories(level1),
+                current_path=classification_path,
+                level=2,
+                chat_history=chat_history
+            )
+        classification_path.append(level2)
+        logger.info(f"二级分类: {level2}")
+
+        # 三级分类 (如果需要，携带一二级分类的历史)
+        level3 = None
+        if level2 in self.categories.level3_parents:
+            level3, chat_history = await self.classify_tool._arun(
+                conversation=cleaned_conversation,
+                available_categories=self._get_level3_categories(level2),
+                current_path=classification_path,
+                level=3,
+                chat_history=chat_history
+            )
+            classification_path.append(level3)
+            logger.info(f"三级分类: {level3}")
+
+        logger.success(f"分类完成: {classification_path}")
+
+        return ClassificationResult(
+            level1=level1,
+            level2=level2,
+            level3=level3,
+            path=classification_path
+        )
+
+    async def _start_speculation(
+        self,
+        cleaned_conversation: str,
+        level1_categories: List[str]
+    ) -> Dict[str, asyncio.Task]:
+        """
+        为最可能的几个一级分支提前发起二级分类（仅实时通道、对话不超过 token 上限时）
+
+        Returns:
+            一级分类名称 -> 二级分类任务
+        """
+        if not settings.speculative_level2 or current_lane() != "interactive":
+            return {}
+        tokens = await asyncio.to_thread(self.classify_tool.llm_client.count_tokens, cleaned_conversation)
+        tokens = tokens or len(cleaned_conversation)
+        if tokens > settings.speculative_max_input_tokens:
+            self.branch_predictor.record("skipped")
+            return {}
+
+        top_n = max(0, min(settings.speculative_branches, MAX_SPECULATIVE_BRANCHES))
+        branches = {
+            name: " ".join([name, *self._get_level2_categories(name)])
+            for name in level1_categories
+        }
+        tasks = {}
+        for candidate in self.branch_predictor.rank(cleaned_conversation, branches, top_n):
+            options = self._get_level2_categories(candidate)
+            if not options:
+                continue
+            history = self.classify_tool.history_after(
+                cleaned_conversation, level1_categories, [], 1, [], candidate
+            )
+            tasks[candidate] = asyncio.create_task(self.classify_tool._arun(
+                conversation=cleaned_conversation,
+                available_categories=options,
+                current_path=[candidate],
+                level=2,
+                chat_history=history
+            ))
+        if tasks:
+            self.branch_predictor.record("speculated")
+            self.branch_predictor.record("speculative_calls", len(tasks))
+            logger.debug(f"投机发起二级分类: {list(tasks)}")
+        return tasks
+
+    async def _take_speculation(self, tasks: Dict[str, asyncio.Task], level1: str) -> Optional[tuple]:
+        """取出与实际一级分类一致的投机结果，取消其余分支；未命中或投机失败时返回 None"""
+        if not tasks:
+            return None
+        task = tasks.pop(level1, None)
+        for other in tasks.values():
+            if other.done():
+                if not other.cancelled():
+                    other.exception()  # 读取结果，避免未处理异常告警
+            else:
+                other.cancel()
+        self.branch_predictor.record("wasted_calls", len(tasks))
+
+        if task is None:
+            self.branch_predictor.record("misses")
+            logger.debug(f"投机未命中: 一级分类 {level1}")
+            return None
+        self.branch_predictor.record("hits")
+        try:
+            return await task
+        except Exception as e:
+            logger.warning(f"投机二级分类失败，重新分类: {e}")
+            return None
+
+    @property
+    def categories(self) -> CategoryData:
+        """当前请求固定的分类树（未固定时使用最新加载的分类树）"""
+        return pinned_categories(self._categories)
+
+    def set_categories(self, categories: CategoryData) -> None:
+        """切换分类数据（重新加载分类文件后调用；已固定旧分类树的请求不受影响）"""
+        self._categories = categories
+        self.classify_tool.set_categories(categories)
+        self.path_tool.set_categories(categories)
+        self.preclassify_tool.set_categories(categories)
+        self.rule_tool.set_categories(categories)
+
+    @staticmethod
+    def _path_result(path: List[str]) -> ClassificationResult:
+        """根据完整路径构造分类结果"""
+        logger.success(f"分类完成: {path}")
+        return ClassificationResult(
+            level1=path[0],
+            level2=path[1],
+            level3=path[2] if len(path) > 2 else None,
+            path=list(path)
+        )
+
     def _get_level1_categories(self) -> List[str]:
         """获取一级分类列表"""
         return [info['name'] for _, info in self.categories.level1.items()]
 
     def _get_level2_categories(self, level1: str) -> List[str]:
         """获取二级分类列表"""
-        for l1_id, l1_info in self.categories.level1.items():
-            if l1_info['name'] == level1:
-                return list(l1_info['children'].keys())
-        return []
+        return self.categories.level2_names(level1)
 
     def _get_level3_categories(self, level2: str) -> List[str]:
         """获取三级分类列表"""
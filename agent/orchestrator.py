@@ -3,12 +3,28 @@
 协调分类和摘要Agent
 参考: web2json-agent/agent/orchestrator.py
 """
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from loguru import logger
+from config.settings import settings
 from tools.conversation_cleaner import ConversationCleanerTool
+from tools.conversation_budget import ConversationBudgetTool
 from tools.category_loader import CategoryLoaderTool
 from agent.classifier import ClassificationAgent
 from agent.summarizer import SummarizerAgent
-from models.schemas import ConversationRequest, ConversationResponse
+from models.schemas import CategoryData, ClassificationResult, ConversationRequest, ConversationResponse
+from prompts.classification import ClassificationPrompts
+from prompts.summary import SummaryPrompts
+from utils.category_store import CategoryFileWatcher, CategoryStore, pinned_categories, use_categories
+from utils.cache_key import make_key
+from utils.llm_client import LLMClient
+from utils.result_cache import ResultCache
+from utils.rate_limiter import current_lane, use_lane
+from utils.timing import StageTimer
 
 
 class ConversationAnalyzer:
@@ -23,64 +39,621 @@ class ConversationAnalyzer:
 
         # 初始化工具
         self.cleaner_tool = ConversationCleanerTool()
+        self.budget_tool = ConversationBudgetTool()
         self.category_loader = CategoryLoaderTool()
 
-        # 加载分类数据
+        # 加载分类数据（支持热更新：每个请求固定开始时的分类树版本）
         logger.info("加载分类数据...")
-        self.categories = self.category_loader._run()
+        self.category_store = CategoryStore(self.category_loader._run)
 
         # 初始化Agent
-        self.classifier = ClassificationAgent(self.categories)
+        self.classifier = ClassificationAgent(self.category_store.categories)
         self.summarizer = SummarizerAgent()
 
+        # 同步模式下并行执行摘要的线程池（默认 CPU 核数 + 4；批量调用方按并发数扩容）
+        self._init_summary_pool()
+
+        # 结果缓存（键包含清洗后对话、模型、提示词版本和分类树版本；摘要另存一份不依赖分类树的条目）
+        self.result_cache = None
+        if settings.result_cache_enabled:
+            self.result_cache = ResultCache(
+                max_size=settings.result_cache_max_size,
+                ttl=settings.result_cache_ttl,
+                db_path=settings.result_cache_db_path or None,
+                db_max_rows=settings.result_cache_db_max_rows
+            )
+
+        # 分类文件变化时在后台线程中重新加载
+        self.category_watcher = None
+        if settings.category_watch_interval > 0:
+            self.category_watcher = CategoryFileWatcher(
+                settings.category_csv_path,
+                self.reload_categories,
+                settings.category_watch_interval
+            ).start()
+
         logger.success("对话分析器初始化完成")
 
+    @property
+    def categories(self) -> CategoryData:
+        """当前请求固定的分类树（未固定时使用最新加载的分类树）"""
+        return pinned_categories(self.category_store.categories)
+
+    def _init_summary_pool(self) -> None:
+        """创建默认大小的摘要线程池"""
+        self._summary_lock = threading.Lock()
+        self._summary_workers = 0
+        self._summary_executor: Optional[ThreadPoolExecutor] = None
+        self.reserve_summary_workers((os.cpu_count() or 1) + 4)
+
+    def reserve_summary_workers(self, concurrency: int) -> None:
+        """
+        确保摘要线程池不小于调用方的并发数
+
+        同步并发分析时每个请求各占一个摘要线程；线程池小于并发数时摘要会排在其他请求之后，
+        失去与分类并行的效果。扩容时换用更大的线程池，旧线程池中已提交的摘要照常完成。
+
+        Args:
+            concurrency: 同时调用 analyze 的最大线程数
+        """
+        with self._summary_lock:
+            if concurrency <= self._summary_workers:
+                return
+            old = self._summary_executor
+            self._summary_executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="summary")
+            self._summary_workers = concurrency
+        if old is not None:
+            old.shutdown(wait=False)
+            logger.info(f"摘要线程池扩容至 {concurrency}")
+
+    def _submit_summary(self, timer: StageTimer, summary_text: str, summary_key: Optional[str] = None) -> Future:
+        """在摘要线程池中生成摘要（复制上下文，使摘要线程沿用当前请求的优先级通道和分类树）"""
+        with self._summary_lock:
+            return self._summary_executor.submit(
+                contextvars.copy_context().run,
+                self._timed_summarize, timer, summary_text, summary_key
+            )
+
     def analyze(self, request: ConversationRequest) -> ConversationResponse:
         """
         分析对话
 
         Args:
-            request: 分析请求
+            request: 分析请求（priority 为空时沿用当前上下文的优先级通道）
 
         Returns:
             分析结果
         """
+        with use_lane(request.priority or current_lane()), use_categories(self.category_store.categories):
+            return self._analyze(request)
+
+    def _analyze(self, request: ConversationRequest) -> ConversationResponse:
+        """在当前优先级通道中分析对话"""
         try:
             logger.info(f"开始分析会话: {request.conversationId}")
+            timer = StageTimer()
 
             # 步骤1: 清洗对话
             logger.info("[步骤 1/3] 清洗对话...")
-            cleaned_conversation = self.cleaner_tool._run(
-                conversation=request.conversation
+            with timer.stage("clean"):
+                cleaned_conversation = self.cleaner_tool._run(
+                    conversation=request.conversation
+                )
+            logger.debug(f"清洗后内容长度: {len(cleaned_conversation)}")
+
+            cache_key = self._cache_key(cleaned_conversation, request.classifyMode)
+            cached = self._cached_response(request, cache_key)
+            if cached is not None:
+                return cached
+
+            summary_key = self._summary_cache_key(cleaned_conversation)
+            classify_text, summary_text = self._fit_budgets(cleaned_conversation, timer)
+
+            if settings.parallel_summary:
+                # 步骤2+3: 摘要只依赖清洗后的对话，与分类链同时开始
+                logger.info("[步骤 2-3/3] 并行执行分类与摘要...")
+                summary_future = self._submit_summary(timer, summary_text, summary_key)
+                try:
+                    with timer.stage("classify"):
+                        classification_result = self.classifier.classify(
+                            classify_text, request.classifyMode, cleaned_conversation
+                        )
+                except BaseException:
+                    # 摘要尚未开始（线程池排队中）时取消；已开始的摘要无法从其他线程中断，
+                    # 会在后台运行完成，结果直接丢弃
+                    summary_future.cancel()
+                    raise
+                summary = summary_future.result()
+            else:
+                # 步骤2: 分类
+                logger.info("[步骤 2/3] 执行分类...")
+                with timer.stage("classify"):
+                    classification_result = self.classifier.classify(
+                        classify_text, request.classifyMode, cleaned_conversation
+                    )
+
+                # 步骤3: 生成摘要
+                logger.info("[步骤 3/3] 生成摘要...")
+                summary = self._timed_summarize(timer, summary_text, summary_key)
+
+            logger.success(f"分析完成 - 分类: {classification_result.category_string}")
+            timer.log(f"[{request.conversationId}] ")
+
+            return self._success_response(
+                request, cache_key, classification_result.category_string, summary,
+                cacheable=not classification_result.fallback, summary_key=summary_key
             )
+
+        except Exception as e:
+            return self._fail_response(request, e)
+
+    async def aanalyze(self, request: ConversationRequest) -> ConversationResponse:
+        """
+        异步分析对话（LLM调用不阻塞事件循环）
+
+        Args:
+            request: 分析请求（priority 为空时沿用当前上下文的优先级通道）
+
+        Returns:
+            分析结果
+        """
+        with use_lane(request.priority or current_lane()), use_categories(self.category_store.categories):
+            return await self._aanalyze(request)
+
+    async def _aanalyze(self, request: ConversationRequest) -> ConversationResponse:
+        """在当前优先级通道中异步分析对话（分类与摘要子任务继承通道）"""
+        try:
+            logger.info(f"开始分析会话(异步): {request.conversationId}")
+            timer = StageTimer()
+
+            # 步骤1: 清洗对话（正则清洗、token 计数、SQLite 缓存读写都在线程中执行，不占用事件循环）
+            logger.info("[步骤 1/3] 清洗对话...")
+            with timer.stage("clean"):
+                cleaned_conversation = await asyncio.to_thread(
+                    self.cleaner_tool._run, conversation=request.conversation
+                )
             logger.debug(f"清洗后内容长度: {len(cleaned_conversation)}")
 
-            # 步骤2: 分类
-            logger.info("[步骤 2/3] 执行分类...")
-            classification_result = self.classifier.classify(cleaned_conversation)
+            cache_key = self._cache_key(cleaned_conversation, request.classifyMode)
+            cached = await asyncio.to_thread(self._cached_response, request, cache_key)
+            if cached is not None:
+                return cached
+
+            summary_key = self._summary_cache_key(cleaned_conversation)
+            classify_text, summary_text = await asyncio.to_thread(
+                self._fit_budgets, cleaned_conversation, timer
+            )
+
+            if settings.parallel_summary:
+                # 步骤2+3: 摘要与分类链同时开始，任一失败则取消另一个
+                logger.info("[步骤 2-3/3] 并行执行分类与摘要...")
+                tasks = [
+                    asyncio.create_task(self._atimed(
+                        timer, "classify",
+                        self.classifier.aclassify(classify_text, request.classifyMode, cleaned_conversation)
+                    )),
+                    asyncio.create_task(self._asummarize(timer, summary_text, summary_key)),
+                ]
+                try:
+                    classification_result, summary = await asyncio.gather(*tasks)
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    raise
+            else:
+                # 步骤2: 分类
+                logger.info("[步骤 2/3] 执行分类...")
+                classification_result = await self._atimed(
+                    timer, "classify",
+                    self.classifier.aclassify(classify_text, request.classifyMode, cleaned_conversation)
+                )
 
-            # 步骤3: 生成摘要
-            logger.info("[步骤 3/3] 生成摘要...")
-            summary = self.summarizer.summarize(cleaned_conversation)
+                # 步骤3: 生成摘要
+                logger.info("[步骤 3/3] 生成摘要...")
+                summary = await self._asummarize(timer, summary_text, summary_key)
 
             logger.success(f"分析完成 - 分类: {classification_result.category_string}")
+            timer.log(f"[{request.conversationId}] ")
 
-            return ConversationResponse(
-                conversationId=request.conversationId,
-                userNo=request.userNo,
-                category=classification_result.category_string,
-                summary=summary,
-                message="success"
+            return await asyncio.to_thread(
+                self._success_response,
+                request, cache_key, classification_result.category_string, summary,
+                cacheable=not classification_result.fallback, summary_key=summary_key
             )
 
         except Exception as e:
-            logger.error(f"分析失败: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return ConversationResponse(
-                conversationId=request.conversationId,
-                userNo=request.userNo,
-                category="",
-                summary="",
-                message="fail"
+            return self._fail_response(request, e)
+
+    async def astream_analyze(self, request: ConversationRequest) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式分析对话：分类完成后立即产出分类结果，摘要逐段产出，最后产出完整结果和 token 用量
+
+        分析在独立任务中执行，调用方提前结束迭代（如客户端断开）时自动取消。
+
+        Args:
+            request: 分析请求
+
+        Yields:
+            (事件名, 数据)：
+            - ("category", {"category": ...})
+            - ("summary", {"delta": ...})
+            - ("done", ConversationResponse 字段 + usage + timings)
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self._produce_stream(request, queue))
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    async def _produce_stream(self, request: ConversationRequest, queue: asyncio.Queue) -> None:
+        """执行流式分析，把事件写入队列（结束时写入 None）"""
+        with use_lane(request.priority or current_lane()), use_categories(self.category_store.categories), \
+                LLMClient.track_usage() as usage:
+            timer = StageTimer()
+            try:
+                logger.info(f"开始分析会话(流式): {request.conversationId}")
+
+                with timer.stage("clean"):
+                    cleaned_conversation = await asyncio.to_thread(
+                        self.cleaner_tool._run, conversation=request.conversation
+                    )
+
+                cache_key = self._cache_key(cleaned_conversation, request.classifyMode)
+                response = await asyncio.to_thread(self._cached_response, request, cache_key)
+                if response is not None:
+                    await queue.put(("category", {"category": response.category}))
+                    await queue.put(("summary", {"delta": response.summary}))
+                else:
+                    classify_text, summary_text = await asyncio.to_thread(
+                        self._fit_budgets, cleaned_conversation, timer
+                    )
+                    response = await self._stream_classify_and_summarize(
+                        request, cache_key, cleaned_conversation, classify_text, summary_text, timer, queue
+                    )
+                    timer.log(f"[{request.conversationId}] ")
+            except Exception as e:
+                response = self._fail_response(request, e)
+
+            await queue.put(("done", {
+                **response.model_dump(),
+                "usage": dict(usage),
+                "timings": timer.as_dict()
+            }))
+            await queue.put(None)
+
+    async def _stream_classify_and_summarize(
+        self,
+        request: ConversationRequest,
+        cache_key: str,
+        cleaned_conversation: str,
+        classify_text: str,
+        summary_text: str,
+        timer: StageTimer,
+        queue: asyncio.Queue
+    ) -> ConversationResponse:
+        """分类完成即推送分类事件，摘要边生成边推送"""
+
+        async def classify() -> ClassificationResult:
+            result = await self._atimed(
+                timer, "classify",
+                self.classifier.aclassify(classify_text, request.classifyMode, cleaned_conversation)
             )
+            await queue.put(("category", {"category": result.category_string}))
+            return result
+
+        summary_key = self._summary_cache_key(cleaned_conversation)
+
+        async def summarize() -> str:
+            cached = await asyncio.to_thread(self._cached_summary, summary_key)
+            if cached is not None:
+                await queue.put(("summary", {"delta": cached}))
+                return cached
+            parts = []
+            with timer.stage("summary"):
+                async for delta in self.summarizer.astream_summary(summary_text):
+                    parts.append(delta)
+                    await queue.put(("summary", {"delta": delta}))
+            return "".join(parts).strip()
+
+        if settings.parallel_summary:
+            tasks = [asyncio.create_task(classify()), asyncio.create_task(summarize())]
+            try:
+                result, summary = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+        else:
+            result = await classify()
+            summary = await summarize()
+
+        logger.success(f"分析完成 - 分类: {result.category_string}")
+        return await asyncio.to_thread(
+            self._success_response,
+            request, cache_key, result.category_string, summary,
+            cacheable=not result.fallback, summary_key=summary_key
+        )
+
+    def analyze_many(
+        self,
+        requests: List[ConversationRequest],
+        concurrency: Optional[int] = None,
+        priority: str = "bulk"
+    ) -> List[ConversationResponse]:
+        """
+        批量分析对话（线程池并发，结果顺序与输入一致）
+
+        单条失败只会得到 message="fail" 的结果，不影响其他会话。
+
+        Args:
+            requests: 分析请求列表
+            concurrency: 最大并发数（默认 settings.batch_concurrency）
+            priority: 未指定 priority 的请求使用的优先级通道（默认 bulk）
+
+        Returns:
+            分析结果列表
+        """
+        if not requests:
+            return []
+        concurrency = max(1, concurrency or settings.batch_concurrency)
+        logger.info(f"开始批量分析: {len(requests)} 条会话, 并发数: {concurrency}")
+        self.reserve_summary_workers(concurrency)
+
+        def _analyze(request: ConversationRequest) -> ConversationResponse:
+            try:
+                with use_lane(priority):
+                    return self.analyze(request)
+            except Exception as e:
+                return self._fail_response(request, e)
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+            results = list(executor.map(_analyze, requests))
+
+        self._log_batch_summary(results)
+        return results
+
+    async def aanalyze_many(
+        self,
+        requests: List[ConversationRequest],
+        concurrency: Optional[int] = None,
+        priority: str = "bulk"
+    ) -> List[ConversationResponse]:
+        """
+        异步批量分析对话（信号量限制并发，结果顺序与输入一致）
+
+        单条失败只会得到 message="fail" 的结果，不影响其他会话。
+
+        Args:
+            requests: 分析请求列表
+            concurrency: 最大并发数（默认 settings.batch_concurrency）
+            priority: 未指定 priority 的请求使用的优先级通道（默认 bulk）
+
+        Returns:
+            分析结果列表
+        """
+        if not requests:
+            return []
+        concurrency = max(1, concurrency or settings.batch_concurrency)
+        logger.info(f"开始批量分析(异步): {len(requests)} 条会话, 并发数: {concurrency}")
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _bounded(request: ConversationRequest) -> ConversationResponse:
+            async with semaphore:
+                try:
+                    with use_lane(priority):
+                        return await self.aanalyze(request)
+                except Exception as e:
+                    return self._fail_response(request, e)
+
+        results = await asyncio.gather(*(_bounded(request) for request in requests))
+
+        self._log_batch_summary(results)
+        return list(results)
+
+    @staticmethod
+    def _log_batch_summary(results: List[ConversationResponse]) -> None:
+        """打印批量分析统计"""
+        fail_count = sum(1 for r in results if r.message != "success")
+        logger.success(
+            f"批量分析完成 - 总数: {len(results)}, "
+            f"成功: {len(results) - fail_count}, 失败: {fail_count}"
+        )
+
+    def reload_categories(self, force: bool = False) -> Dict[str, Any]:
+        """
+        重新加载分类数据
+
+        在调用线程中构建新的分类树（不占用请求路径），构建成功后原子替换；
+        处理中的请求继续使用开始时固定的旧分类树，之后的请求使用新分类树。
+
+        Args:
+            force: 分类文件内容未变化时也替换
+
+        Returns:
+            {"reloaded": 是否替换, "version": 分类树版本, "generation": 代数}
+        """
+        logger.info("重新加载分类数据...")
+        swapped = self.category_store.reload(force, on_swap=self._on_categories_swapped)
+        return {
+            "reloaded": swapped is not None,
+            "version": self.category_store.categories.version,
+            "generation": self.category_store.generation
+        }
+
+    def _on_categories_swapped(self, old: CategoryData, categories: CategoryData) -> None:
+        """分类树替换后切换各工具的默认分类树，并使旧版本相关的缓存失效"""
+        # 单级决策缓存只删除选项已变化的条目，未改动分支的决策继续复用
+        self.classifier.set_categories(categories)
+        if self.result_cache is not None and old.version != categories.version:
+            # 结果缓存键包含分类树版本，旧版本的分类结果已不会命中，删除释放空间；
+            # 摘要条目不依赖分类树，继续复用
+            self.result_cache.prune_category_version(old.version)
+
+    def close(self) -> None:
+        """停止分类文件监听"""
+        if self.category_watcher is not None:
+            self.category_watcher.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """运行统计（缓存命中、token 用量等）"""
+        return {
+            "result_cache": self.result_cache.stats() if self.result_cache else None,
+            "classify_cache": (
+                self.classifier.classify_tool.decision_cache.stats()
+                if self.classifier.classify_tool.decision_cache else None
+            ),
+            "rules": self.classifier.rule_tool.stats(),
+            "preclassify": self.classifier.preclassify_tool.stats(),
+            "speculation": self.classifier.branch_predictor.stats(),
+            "categories": self.category_store.stats(),
+            "classify_resolution": {
+                "level": self.classifier.classify_tool.resolver.stats(),
+                "path": self.classifier.path_tool.resolver.stats()
+            },
+            "llm_usage": LLMClient.get_total_usage(),
+            "llm_limiter": LLMClient.get_limiter_stats()
+        }
+
+    def _cache_key(self, cleaned_conversation: str, classify_mode: Optional[str] = None) -> str:
+        """计算结果缓存键"""
+        return make_key(
+            cleaned_conversation,
+            self.classifier.resolve_mode(classify_mode),
+            self.classifier.classify_tool.llm_client.model,
+            self.summarizer.summarize_tool.llm_client.model,
+            ClassificationPrompts.VERSION,
+            SummaryPrompts.VERSION,
+            settings.prompt_cache_layout,
+            self.budget_tool.budget_for("classification"),
+            self.budget_tool.budget_for("summary"),
+            settings.budget_head_turns,
+            settings.budget_tail_turns,
+            settings.summary_long_mode,
+            settings.summary_chunk_tokens,
+            self.classifier.preclassify_tool.version,
+            settings.category_rules_mode,
+            self.categories.version
+        )
+
+    def _summary_cache_key(self, cleaned_conversation: str) -> Optional[str]:
+        """计算摘要缓存键（只包含影响摘要的部分，不含分类树版本）；结果缓存未启用时返回 None"""
+        if self.result_cache is None:
+            return None
+        return make_key(
+            "summary",
+            cleaned_conversation,
+            self.summarizer.summarize_tool.llm_client.model,
+            SummaryPrompts.VERSION,
+            settings.prompt_cache_layout,
+            self.budget_tool.budget_for("summary"),
+            settings.budget_head_turns,
+            settings.budget_tail_turns,
+            settings.summary_long_mode,
+            settings.summary_chunk_tokens
+        )
+
+    def _cached_summary(self, summary_key: Optional[str]) -> Optional[str]:
+        """查询摘要缓存（分类树更新后分类需重新执行，摘要仍可复用）"""
+        if self.result_cache is None or summary_key is None:
+            return None
+        cached = self.result_cache.get(summary_key)
+        if cached is None:
+            return None
+        logger.info("摘要缓存命中")
+        return cached["summary"]
+
+    def _cached_response(self, request: ConversationRequest, cache_key: str) -> Optional[ConversationResponse]:
+        """查询结果缓存，命中时直接构造响应（不调用LLM）"""
+        if self.result_cache is None:
+            return None
+        cached = self.result_cache.get(cache_key)
+        if cached is None:
+            return None
+        logger.success(f"结果缓存命中 - 分类: {cached['category']}")
+        return ConversationResponse(
+            conversationId=request.conversationId,
+            userNo=request.userNo,
+            category=cached["category"],
+            summary=cached["summary"],
+            message="success"
+        )
+
+    def _success_response(
+        self,
+        request: ConversationRequest,
+        cache_key: str,
+        category: str,
+        summary: str,
+        cacheable: bool = True,
+        summary_key: Optional[str] = None
+    ) -> ConversationResponse:
+        """写入结果缓存并构造成功响应（分类使用了兜底选项时不缓存，避免降级结果被长期复用）"""
+        if self.result_cache is not None:
+            if cacheable:
+                self.result_cache.set(
+                    cache_key, {"category": category, "summary": summary}, self.categories.version
+                )
+            if summary_key is not None:
+                # 摘要与分类是否兜底无关，单独缓存，分类树更新后仍可复用
+                self.result_cache.set(summary_key, {"summary": summary})
+        return ConversationResponse(
+            conversationId=request.conversationId,
+            userNo=request.userNo,
+            category=category,
+            summary=summary,
+            message="success"
+        )
+
+    def _fit_budgets(self, cleaned_conversation: str, timer: StageTimer) -> Tuple[str, str]:
+        """按分类/摘要各自的 token 预算裁剪对话，返回 (分类用文本, 摘要用文本)"""
+        with timer.stage("budget"):
+            classify_text = self.budget_tool._run(cleaned_conversation, task="classification")
+            # map_reduce 模式下超长对话由摘要工具分段处理，不裁剪
+            if settings.summary_long_mode == "map_reduce":
+                summary_text = cleaned_conversation
+            else:
+                summary_text = self.budget_tool._run(cleaned_conversation, task="summary")
+        return classify_text, summary_text
+
+    def _timed_summarize(self, timer: StageTimer, cleaned_conversation: str, summary_key: Optional[str] = None) -> str:
+        """生成摘要并记录耗时（摘要缓存命中时不调用LLM）"""
+        cached = self._cached_summary(summary_key)
+        if cached is not None:
+            return cached
+        with timer.stage("summary"):
+            return self.summarizer.summarize(cleaned_conversation)
+
+    async def _asummarize(self, timer: StageTimer, cleaned_conversation: str, summary_key: Optional[str] = None) -> str:
+        """异步生成摘要并记录耗时（摘要缓存命中时不调用LLM）"""
+        cached = await asyncio.to_thread(self._cached_summary, summary_key)
+        if cached is not None:
+            return cached
+        with timer.stage("summary"):
+            return await self.summarizer.asummarize(cleaned_conversation)
+
+    @staticmethod
+    async def _atimed(timer: StageTimer, name: str, awaitable):
+        """等待协程并记录耗时"""
+        with timer.stage(name):
+            return await awaitable
+
+    @staticmethod
+    def _fail_response(request: ConversationRequest, error: Exception) -> ConversationResponse:
+        """记录异常并构造失败响应"""
+        logger.error(f"分析失败: {str(error)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return ConversationResponse(
+            conversationId=request.conversationId,
+            userNo=request.userNo,
+            category="",
+            summary="",
+            message="fail"
+        )
@@ -1,6 +1,7 @@
 """
 摘要生成Agent
 """
+from typing import AsyncIterator
 from loguru import logger
 from tools.summarize import SummarizeTool
 
@@ -26,3 +27,33 @@ class SummarizerAgent:
         summary = self.summarize_tool._run(conversation=cleaned_conversation)
         logger.success("摘要生成完成")
         return summary
+
+    async def asummarize(self, cleaned_conversation: str) -> str:
+        """
+        异步生成摘要
+
+        Args:
+            cleaned_conversation: 清洗后的对话
+
+        Returns:
+            摘要文本
+        """
+        logger.info("开始生成摘要（异步）...")
+        summary = await self.summarize_tool._arun(conversation=cleaned_conversation)
+        logger.success("摘要生成完成")
+        return summary
+
+    async def astream_summary(self, cleaned_conversation: str) -> AsyncIterator[str]:
+        """
+        流式生成摘要
+
+        Args:
+            cleaned_conversation: 清洗后的对话
+
+        Yields:
+            摘要文本片段
+        """
+        logger.info("开始流式生成摘要...")
+        async for delta in self.summarize_tool.astream(cleaned_conversation):
+            yield delta
+        logger.success("摘要生成完成")
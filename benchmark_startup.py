@@ -0,0 +1,88 @@
+"""
+启动耗时基准
+每次在新的 Python 进程中测量：导入 run_fastapi 的耗时、初始化 ConversationAnalyzer 的耗时，
+以及初始化后是否已导入 pandas / numpy、是否已加载 tokenizer 编码文件。分别在不使用快照（每次解析 CSV）和使用快照两种情况下运行。
+
+用法：
+    python benchmark_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+MARKER = "STARTUP_BENCHMARK "
+
+# 子进程中执行的测量代码
+PROBE = f"""
+import sys, time, json
+started = time.perf_counter()
+import run_fastapi
+from utils import tokenizer
+imported = time.perf_counter()
+from agent.orchestrator import ConversationAnalyzer
+analyzer = ConversationAnalyzer()
+initialized = time.perf_counter()
+print({MARKER!r} + json.dumps({{
+    "import": imported - started,
+    "init": initialized - imported,
+    "total": initialized - started,
+    "pandas": "pandas" in sys.modules,
+    "numpy": "numpy" in sys.modules,
+    "tokenizer": tokenizer.loaded_models(),
+}}))
+"""
+
+
+def measure(env_overrides: dict) -> dict:
+    """在新进程中测量一次启动耗时"""
+    env = {**os.environ, "LOG_LEVEL": "ERROR", **env_overrides}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"启动失败:\n{result.stderr[-2000:]}")
+    line = next(line for line in result.stdout.splitlines() if line.startswith(MARKER))
+    return json.loads(line[len(MARKER):])
+
+
+def run_case(name: str, env_overrides: dict, runs: int) -> None:
+    """重复测量并打印中位数与最小值"""
+    results = [measure(env_overrides) for _ in range(runs)]
+    print(f"\n[{name}] {runs} 次")
+    for field in ("import", "init", "total"):
+        values = [r[field] * 1000 for r in results]
+        print(f"  {field:<7} 中位数 {statistics.median(values):8.1f} ms   最小 {min(values):8.1f} ms")
+    last = results[-1]
+    print(
+        f"  启动后已导入 pandas: {last['pandas']}, numpy: {last['numpy']}, "
+        f"已加载 tokenizer: {last['tokenizer']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准")
+    parser.add_argument("--runs", type=int, default=5, help="每种情况的测量次数")
+    args = parser.parse_args()
+
+    run_case("解析 CSV（不使用快照）", {"CATEGORY_SNAPSHOT_ENABLED": "false"}, args.runs)
+
+    # 快照写到临时目录，不影响项目中已有的快照
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_env = {
+            "CATEGORY_SNAPSHOT_ENABLED": "true",
+            "CATEGORY_SNAPSHOT_PATH": str(Path(tmp_dir) / "categories.snapshot")
+        }
+        # 第一次运行生成快照，之后的测量直接加载快照
+        measure(snapshot_env)
+        run_case("加载分类快照", snapshot_env, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 """
 import os
 from pathlib import Path
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
@@ -12,6 +13,18 @@ env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
 
 
+def _optional_float(name: str) -> Optional[float]:
+    """读取可选的浮点型环境变量，未设置时返回 None（不向模型传该参数）"""
+    value = os.getenv(name, "").strip()
+    return float(value) if value else None
+
+
+def _stop_sequences(name: str) -> List[str]:
+    """读取停止序列，多个用 | 分隔，支持 \\n 表示换行"""
+    value = os.getenv(name, "")
+    return [item.replace("\\n", "\n") for item in value.split("|") if item]
+
+
 class Settings(BaseModel):
     """全局配置"""
 
@@ -46,6 +59,236 @@ class Settings(BaseModel):
         default_factory=lambda: float(os.getenv("AGENT_TEMPERATURE", "0"))
     )
 
+    # ============================================
+    # 场景生成参数（每次调用时传给模型，同一模型的客户端在各场景间共享）
+    # ============================================
+    # 分类只需输出一个分类名称/路径，限制输出长度避免失控生成
+    # （此前 max_tokens 未传给模型，输出长度不受限制；模型先输出推理过程时需调大）
+    classification_max_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("CLASSIFICATION_MAX_TOKENS", "64"))
+    )
+    classification_top_p: Optional[float] = Field(
+        default_factory=lambda: _optional_float("CLASSIFICATION_TOP_P")
+    )
+    classification_stop: List[str] = Field(
+        default_factory=lambda: _stop_sequences("CLASSIFICATION_STOP")
+    )
+    summary_max_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("SUMMARY_MAX_TOKENS", "1024"))
+    )
+    summary_top_p: Optional[float] = Field(
+        default_factory=lambda: _optional_float("SUMMARY_TOP_P")
+    )
+    summary_stop: List[str] = Field(
+        default_factory=lambda: _stop_sequences("SUMMARY_STOP")
+    )
+
+    # 对话输入的 token 预算（清洗后超出预算的对话按任务裁剪，0 表示不限制）
+    # 分类默认不裁剪：裁剪会改变送入模型的对话，可能改变分类结果，需评估后再开启
+    classification_input_budget: int = Field(
+        default_factory=lambda: int(os.getenv("CLASSIFICATION_INPUT_BUDGET", "0"))
+    )
+    summary_input_budget: int = Field(
+        default_factory=lambda: int(os.getenv("SUMMARY_INPUT_BUDGET", "12000"))
+    )
+    # 超出摘要预算的长对话: truncate(按预算裁剪) / map_reduce(分段并行摘要后汇总)
+    summary_long_mode: str = Field(
+        default_factory=lambda: os.getenv("SUMMARY_LONG_MODE", "truncate")
+    )
+    # map_reduce 模式下每段的 token 数及每段要点的最大输出 token 数
+    summary_chunk_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("SUMMARY_CHUNK_TOKENS", "4000"))
+    )
+    summary_chunk_max_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("SUMMARY_CHUNK_MAX_TOKENS", "512"))
+    )
+    # 裁剪时始终保留的开头/结尾轮次数
+    budget_head_turns: int = Field(
+        default_factory=lambda: int(os.getenv("BUDGET_HEAD_TURNS", "4"))
+    )
+    budget_tail_turns: int = Field(
+        default_factory=lambda: int(os.getenv("BUDGET_TAIL_TURNS", "6"))
+    )
+
+    # ============================================
+    # LLM HTTP 连接配置（所有 LLM 客户端共享连接池）
+    # ============================================
+    llm_http_max_connections: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+    )
+    llm_http_max_keepalive: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+    )
+    # 空闲连接保活时间（秒）
+    llm_http_keepalive_expiry: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+    )
+    # 启用 HTTP/2（需要安装 h2，未安装时自动回退到 HTTP/1.1）
+    llm_http2: bool = Field(
+        default_factory=lambda: os.getenv("LLM_HTTP2", "true").lower() == "true"
+    )
+    llm_connect_timeout: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    )
+    llm_read_timeout: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_READ_TIMEOUT", "120"))
+    )
+    # 服务启动时预热的连接数，0 表示不预热
+    llm_warmup_connections: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_WARMUP_CONNECTIONS", "2"))
+    )
+
+    # ============================================
+    # LLM 限流调度配置（每个模型客户端独立调度）
+    # ============================================
+    # 服务商额度：每分钟请求数 / token 数，0 表示不限制
+    llm_rpm: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_RPM", "0"))
+    )
+    llm_tpm: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_TPM", "0"))
+    )
+    # AIMD 自适应并发：初始 / 最小 / 最大并发数
+    llm_initial_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_INITIAL_CONCURRENCY", "16"))
+    )
+    llm_min_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    )
+    llm_max_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+    )
+    # 单次调用延迟超过该值（秒）时减小并发，0 表示只根据 429 调整
+    llm_latency_target: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_LATENCY_TARGET", "30"))
+    )
+    # 优先级通道权重：实时请求（/ai/analyze）与批量任务（批量接口、离线回刷）共享同一额度，
+    # 两者都在排队时按权重比例放行；批量权重为 0 表示实时请求始终优先，批量只使用剩余容量
+    llm_interactive_weight: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_INTERACTIVE_WEIGHT", "10"))
+    )
+    llm_bulk_weight: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_BULK_WEIGHT", "0"))
+    )
+    # 429/5xx/网络错误的重试次数及指数退避参数（秒）
+    llm_max_retries: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_MAX_RETRIES", "5"))
+    )
+    llm_backoff_base: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_BACKOFF_BASE", "1"))
+    )
+    llm_backoff_max: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_BACKOFF_MAX", "30"))
+    )
+
+    # ============================================
+    # 编排配置
+    # ============================================
+    # 摘要与分类链并行执行（摘要只依赖清洗后的对话）
+    parallel_summary: bool = Field(
+        default_factory=lambda: os.getenv("PARALLEL_SUMMARY", "true").lower() == "true"
+    )
+    # 批量分析的最大并发会话数
+    batch_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("BATCH_CONCURRENCY", "16"))
+    )
+    # 单次批量请求允许的最大会话数
+    batch_max_size: int = Field(
+        default_factory=lambda: int(os.getenv("BATCH_MAX_SIZE", "500"))
+    )
+
+    # 分类模式: hierarchical(逐级多轮对话) / flat(单次调用选择完整路径)
+    classification_mode: str = Field(
+        default_factory=lambda: os.getenv("CLASSIFICATION_MODE", "hierarchical")
+    )
+
+    # 投机执行二级分类（仅实时通道）：一级分类请求进行的同时，为最可能的几个一级分支提前发起二级分类，
+    # 保留与实际一级分类一致的分支、取消其余分支；以额外调用换取时延
+    speculative_level2: bool = Field(
+        default_factory=lambda: os.getenv("SPECULATIVE_LEVEL2", "false").lower() == "true"
+    )
+    # 每次最多投机的分支数（上限 3）
+    speculative_branches: int = Field(
+        default_factory=lambda: int(os.getenv("SPECULATIVE_BRANCHES", "2"))
+    )
+    # 对话超过该 token 数时不投机（每个投机分支都要重复发送整段对话）
+    speculative_max_input_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("SPECULATIVE_MAX_INPUT_TOKENS", "2000"))
+    )
+
+    # 分类文件 keywords/regex 列编译的规则: on(唯一命中直接采用) / shadow(只记录并与LLM结果对比) / off
+    category_rules_mode: str = Field(
+        default_factory=lambda: os.getenv("CATEGORY_RULES_MODE", "shadow")
+    )
+
+    # 近邻预分类：已核实的历史结果（.csv/.jsonl，字段 conversation/category），为空则不启用
+    preclassify_data_path: str = Field(
+        default_factory=lambda: os.getenv("PRECLASSIFY_DATA_PATH", "")
+    )
+    # 本地向量模型（sentence-transformers），为空或未安装时使用字符 n-gram TF-IDF
+    preclassify_embedding_model: str = Field(
+        default_factory=lambda: os.getenv("PRECLASSIFY_EMBEDDING_MODEL", "")
+    )
+    preclassify_top_k: int = Field(
+        default_factory=lambda: int(os.getenv("PRECLASSIFY_TOP_K", "5"))
+    )
+    # 近邻的最低相似度、同一路径的最少票数和加权得票率阈值，均满足时跳过 LLM 分类
+    preclassify_min_similarity: float = Field(
+        default_factory=lambda: float(os.getenv("PRECLASSIFY_MIN_SIMILARITY", "0.6"))
+    )
+    preclassify_min_votes: int = Field(
+        default_factory=lambda: int(os.getenv("PRECLASSIFY_MIN_VOTES", "3"))
+    )
+    preclassify_confidence: float = Field(
+        default_factory=lambda: float(os.getenv("PRECLASSIFY_CONFIDENCE", "0.8"))
+    )
+
+    # 分类输出不在可选项中时，本地模糊匹配（编辑距离相似度）的阈值
+    classify_fuzzy_threshold: float = Field(
+        default_factory=lambda: float(os.getenv("CLASSIFY_FUZZY_THRESHOLD", "0.8"))
+    )
+    # 约束输出模式: off / json_schema（用枚举 JSON Schema 约束输出，需要后端支持，
+    # 如 OpenAI、vLLM、SGLang；后端不支持时自动关闭）
+    classify_constrained_mode: str = Field(
+        default_factory=lambda: os.getenv("CLASSIFY_CONSTRAINED_MODE", "off")
+    )
+
+    # 前缀缓存友好的提示词布局：规则与分类选项放在固定的 system 消息中、对话内容放在最后，
+    # 便于 DashScope/DeepSeek 等 OpenAI 兼容服务复用前缀缓存
+    prompt_cache_layout: bool = Field(
+        default_factory=lambda: os.getenv("PROMPT_CACHE_LAYOUT", "false").lower() == "true"
+    )
+
+    # ============================================
+    # 结果缓存配置
+    # ============================================
+    result_cache_enabled: bool = Field(
+        default_factory=lambda: os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    )
+    result_cache_max_size: int = Field(
+        default_factory=lambda: int(os.getenv("RESULT_CACHE_MAX_SIZE", "10000"))
+    )
+    # 过期时间（秒），0 表示不过期
+    result_cache_ttl: int = Field(
+        default_factory=lambda: int(os.getenv("RESULT_CACHE_TTL", "86400"))
+    )
+    # SQLite 磁盘缓存路径，为空则只使用内存缓存
+    result_cache_db_path: str = Field(
+        default_factory=lambda: os.getenv("RESULT_CACHE_DB_PATH", "")
+    )
+    # SQLite 磁盘缓存最大行数（超出时删除最旧的行），0 表示不限制
+    result_cache_db_max_rows: int = Field(
+        default_factory=lambda: int(os.getenv("RESULT_CACHE_DB_MAX_ROWS", "100000"))
+    )
+
+    # 单级分类决策缓存（按 对话+路径+级别+选项 复用决策）
+    classify_cache_enabled: bool = Field(
+        default_factory=lambda: os.getenv("CLASSIFY_CACHE_ENABLED", "true").lower() == "true"
+    )
+    classify_cache_max_size: int = Field(
+        default_factory=lambda: int(os.getenv("CLASSIFY_CACHE_MAX_SIZE", "20000"))
+    )
+
     # ============================================
     # 数据路径
     # ============================================
@@ -55,6 +298,21 @@ class Settings(BaseModel):
             "data/categories.csv"
         )
     )
+    # 分类文件轮询间隔（秒），文件变化时在后台重新加载分类树；0 表示不监听
+    category_watch_interval: float = Field(
+        default_factory=lambda: float(os.getenv("CATEGORY_WATCH_INTERVAL", "0"))
+    )
+    # 分类数据快照：分类文件未变化时直接加载解析结果（不导入 pandas），路径为空时放在分类文件旁
+    category_snapshot_enabled: bool = Field(
+        default_factory=lambda: os.getenv("CATEGORY_SNAPSHOT_ENABLED", "true").lower() == "true"
+    )
+    category_snapshot_path: str = Field(
+        default_factory=lambda: os.getenv("CATEGORY_SNAPSHOT_PATH", "")
+    )
+    # 随项目打包的 tiktoken 编码文件目录（python -m utils.tokenizer 下载），运行时不访问网络
+    tokenizer_cache_dir: str = Field(
+        default_factory=lambda: os.getenv("TOKENIZER_CACHE_DIR", "data/tiktoken")
+    )
 
     # ============================================
     # API服务配置
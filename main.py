@@ -1,13 +1,28 @@
 """
 本地运行入口 - 无需FastAPI
 直接在命令行运行对话分类和摘要
+
+用法:
+    python main.py                                  # 分析内置示例对话
+    python main.py --input conversations.jsonl --output results.jsonl
+                                                    # 批量模式（支持 .csv/.jsonl，断点续跑）
 """
+import argparse
+import json
+import os
 import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Optional
 from loguru import logger
 
 from agent.orchestrator import ConversationAnalyzer
-from models.schemas import ConversationRequest
+from models.schemas import ConversationRequest, ConversationResponse
 from config.settings import settings
+from utils.bulk_io import BulkCheckpoint, iter_rows, get_field
+from utils.rate_limiter import use_lane
 
 # 配置日志
 logger.remove()
@@ -17,6 +32,18 @@ logger.add(
     level=settings.log_level
 )
 
+# 分析器（进程内复用，避免每次调用重新加载分类数据）
+_analyzer: Optional[ConversationAnalyzer] = None
+
+
+def get_analyzer() -> ConversationAnalyzer:
+    """获取进程内共享的分析器"""
+    global _analyzer
+    if _analyzer is None:
+        logger.info("正在初始化对话分析器...")
+        _analyzer = ConversationAnalyzer()
+    return _analyzer
+
 
 def analyze_conversation(conversation_text: str, conversation_id: str = "local", user_no: str = "user"):
     """
@@ -27,9 +54,7 @@ def analyze_conversation(conversation_text: str, conversation_id: str = "local",
         conversation_id: 会话ID（可选）
         user_no: 用户编号（可选）
     """
-    # 初始化分析器
-    logger.info("正在初始化对话分析器...")
-    analyzer = ConversationAnalyzer()
+    analyzer = get_analyzer()
 
     # 创建请求
     message_num = str(conversation_text.count('\n') + 1)
@@ -61,8 +86,170 @@ def analyze_conversation(conversation_text: str, conversation_id: str = "local",
     return result
 
 
+def build_request(row: Dict[str, Any], index: int) -> Optional[ConversationRequest]:
+    """
+    将输入行转换为分析请求
+
+    Args:
+        row: 输入行（需包含 conversation 字段）
+        index: 输入行号（缺少 conversationId 时使用）
+
+    Returns:
+        分析请求，缺少对话内容时返回 None
+    """
+    conversation = get_field(row, "conversation")
+    if conversation is None:
+        return None
+    return ConversationRequest(
+        conversationId=get_field(row, "conversationId", str(index)),
+        userNo=get_field(row, "userNo", ""),
+        conversation=conversation,
+        messageNum=get_field(row, "messageNum", str(conversation.count('\n') + 1)),
+        classifyMode=get_field(row, "classifyMode")
+    )
+
+
+def _analyze_row(analyzer: ConversationAnalyzer, row: Dict[str, Any], index: int) -> ConversationResponse:
+    """分析单行，无效行或处理异常时返回失败结果（单行出错不中断整个任务）"""
+    try:
+        request = build_request(row, index)
+        if request is None:
+            logger.warning(f"第 {index} 行缺少 conversation 字段，标记为失败")
+            return _fail_row(row, index)
+        # 离线批量任务走 bulk 通道，不挤占实时请求的额度
+        with use_lane("bulk"):
+            return analyzer.analyze(request)
+    except Exception as e:
+        logger.error(f"第 {index} 行处理失败，标记为失败: {e}")
+        return _fail_row(row, index)
+
+
+def _fail_row(row: Dict[str, Any], index: int) -> ConversationResponse:
+    """构造单行的失败结果"""
+    row = row if isinstance(row, dict) else {}
+    return ConversationResponse(
+        conversationId=get_field(row, "conversationId", str(index)),
+        userNo=get_field(row, "userNo", ""),
+        message="fail"
+    )
+
+
+def run_bulk(
+    input_path: str,
+    output_path: str,
+    workers: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: int = 20,
+    resume: bool = True
+) -> int:
+    """
+    批量分析会话文件
+
+    流式读取输入，多线程并发分析，结果按输入顺序逐行写入 JSONL，
+    并定期记录断点；中断后重新运行同一命令即可从断点继续。
+
+    Args:
+        input_path: 输入文件（.csv / .jsonl）
+        output_path: 输出 JSONL 文件
+        workers: 并发数（默认 settings.batch_concurrency）
+        checkpoint_path: 断点文件路径（默认 <output>.checkpoint）
+        checkpoint_every: 每写入多少条结果保存一次断点
+        resume: 是否从已有断点继续
+
+    Returns:
+        本次处理的行数
+    """
+    workers = max(1, workers or settings.batch_concurrency)
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint"
+
+    if resume:
+        checkpoint = BulkCheckpoint.load(checkpoint_path, input_path)
+    else:
+        checkpoint = BulkCheckpoint(checkpoint_path, input_path)
+    if checkpoint.rows_done:
+        logger.info(f"从断点继续: 已完成 {checkpoint.rows_done} 行")
+
+    analyzer = get_analyzer()
+    analyzer.reserve_summary_workers(workers)
+    rows = islice(enumerate(iter_rows(input_path)), checkpoint.rows_done, None)
+
+    # 结果按输入顺序写出，断点只需记录已完成行数；窗口限制在途任务数量
+    max_in_flight = workers * 4
+    in_flight = deque()
+    rows_done = checkpoint.rows_done
+    processed = 0
+    fail_count = 0
+    started = time.perf_counter()
+
+    with checkpoint.open_output(output_path) as out, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk") as executor:
+
+        def save_checkpoint():
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint.save(rows_done, out.tell())
+
+        def write_next():
+            nonlocal rows_done, processed, fail_count
+            result = in_flight.popleft().result()
+            line = json.dumps(result.model_dump(), ensure_ascii=False) + "\n"
+            out.write(line.encode("utf-8"))
+            rows_done += 1
+            processed += 1
+            if result.message != "success":
+                fail_count += 1
+            if processed % checkpoint_every == 0:
+                save_checkpoint()
+                rate = processed / (time.perf_counter() - started)
+                logger.info(
+                    f"已完成 {rows_done} 行（本次 {processed}, 失败 {fail_count}, "
+                    f"{rate:.2f} 行/秒）"
+                )
+
+        try:
+            for index, row in rows:
+                in_flight.append(executor.submit(_analyze_row, analyzer, row, index))
+                while len(in_flight) >= max_in_flight:
+                    write_next()
+            while in_flight:
+                write_next()
+        finally:
+            # 中断时取消尚未开始的任务，并保存已写出部分的断点
+            for future in in_flight:
+                future.cancel()
+            save_checkpoint()
+
+    logger.success(
+        f"批量分析完成 - 本次处理: {processed}, 失败: {fail_count}, "
+        f"累计完成: {rows_done}, 输出: {output_path}"
+    )
+    return processed
+
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="对话分类与摘要")
+    parser.add_argument("--input", help="批量模式输入文件（.csv / .jsonl）")
+    parser.add_argument("--output", help="批量模式输出文件（.jsonl）")
+    parser.add_argument("--workers", type=int, default=None, help="并发数")
+    parser.add_argument("--checkpoint", default=None, help="断点文件路径（默认 <output>.checkpoint）")
+    parser.add_argument("--checkpoint-every", type=int, default=20, help="每写入多少条保存一次断点")
+    parser.add_argument("--no-resume", action="store_true", help="忽略已有断点，从头开始")
+    args = parser.parse_args()
+
+    if args.input:
+        if not args.output:
+            parser.error("批量模式需要同时指定 --output")
+        run_bulk(
+            input_path=args.input,
+            output_path=args.output,
+            workers=args.workers,
+            checkpoint_path=args.checkpoint,
+            checkpoint_every=max(1, args.checkpoint_every),
+            resume=not args.no_resume
+        )
+        return
+
     # 示例对话
     example_conversation = """客户：我想退飞享会员
 客服：好的，请问您是什么原因想要退订呢？
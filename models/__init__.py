@@ -2,6 +2,8 @@
 from .schemas import (
     ConversationRequest,
     ConversationResponse,
+    BatchConversationRequest,
+    BatchConversationResponse,
     CategoryData,
     ClassificationResult
 )
@@ -9,6 +11,8 @@ from .schemas import (
 __all__ = [
     'ConversationRequest',
     'ConversationResponse',
+    'BatchConversationRequest',
+    'BatchConversationResponse',
     'CategoryData',
     'ClassificationResult'
 ]
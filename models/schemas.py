@@ -3,7 +3,7 @@
 使用Pydantic进行数据验证
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 
 
 class ConversationRequest(BaseModel):
@@ -12,6 +12,14 @@ class ConversationRequest(BaseModel):
     userNo: str = Field(..., description="用户编号")
     conversation: str = Field(..., description="对话内容")
     messageNum: str = Field(..., description="消息数量")
+    classifyMode: Optional[str] = Field(
+        default=None,
+        description="分类模式: hierarchical(逐级多轮) / flat(单次选择完整路径)，为空使用配置"
+    )
+    priority: Optional[str] = Field(
+        default=None,
+        description="优先级通道: interactive(实时) / bulk(批量)，为空时单条接口为 interactive、批量接口为 bulk"
+    )
 
 
 class ConversationResponse(BaseModel):
@@ -23,6 +31,19 @@ class ConversationResponse(BaseModel):
     message: str = Field(default="success", description="处理状态")
 
 
+class BatchConversationRequest(BaseModel):
+    """批量对话分析请求"""
+    conversations: List[ConversationRequest] = Field(..., description="待分析的会话列表")
+
+
+class BatchConversationResponse(BaseModel):
+    """批量对话分析响应（结果顺序与请求一致）"""
+    results: List[ConversationResponse] = Field(default_factory=list)
+    total: int = Field(default=0, description="会话总数")
+    success: int = Field(default=0, description="成功数")
+    fail: int = Field(default=0, description="失败数")
+
+
 class CategoryNode(BaseModel):
     """分类节点"""
     id: int
@@ -38,10 +59,49 @@ class CategoryData(BaseModel):
     level2: Dict[str, Dict] = Field(default_factory=dict)
     level3: Dict[str, str] = Field(default_factory=dict)
     level3_parents: set = Field(default_factory=lambda: {'飞享会员', '提额卡', '新提额卡'})
+    version: str = Field(default="", description="分类树版本（分类文件内容哈希）")
+    nodes: Dict[int, Dict] = Field(default_factory=dict, description="id -> 节点（name/parent_id/level）索引")
+    level1_ids: Dict[str, int] = Field(default_factory=dict, description="一级分类名称 -> id 索引")
+    option_blocks: Dict[tuple, str] = Field(default_factory=dict, description="预渲染的选项块 (级别, 选项) -> 文本")
+    rules: Optional[Any] = Field(default=None, description="编译后的关键词/正则分类规则（CategoryRules）")
+    paths: Dict[str, List[str]] = Field(default_factory=dict, description="路径字符串 -> 完整分类路径索引")
 
     class Config:
         arbitrary_types_allowed = True
 
+    def get_level1(self, name: str) -> Optional[Dict]:
+        """按名称获取一级分类信息（O(1)）"""
+        if self.level1 and not self.level1_ids:
+            # 手工构造、未建立索引的分类数据
+            self.level1_ids = {}
+            for cat_id, info in self.level1.items():
+                self.level1_ids.setdefault(info['name'], cat_id)
+        cat_id = self.level1_ids.get(name)
+        return self.level1.get(cat_id) if cat_id is not None else None
+
+    def level2_names(self, level1: str) -> List[str]:
+        """获取一级分类下的二级分类名称列表"""
+        l1_info = self.get_level1(level1)
+        return list(l1_info['children'].keys()) if l1_info else []
+
+    def leaf_paths(self) -> List[List[str]]:
+        """枚举所有合法的完整分类路径（一级-二级[-三级]）"""
+        paths = []
+        for l1_info in self.level1.values():
+            for l2_name in l1_info['children']:
+                l3_children = self.level2.get(l2_name, {}).get('children', [])
+                if l2_name in self.level3_parents and l3_children:
+                    paths.extend([l1_info['name'], l2_name, l3_name] for l3_name in l3_children)
+                else:
+                    paths.append([l1_info['name'], l2_name])
+        return paths
+
+    def path_index(self) -> Dict[str, List[str]]:
+        """路径字符串 -> 完整分类路径（按 leaf_paths 顺序，首次调用时建立）"""
+        if not self.paths:
+            self.paths = {"-".join(path): path for path in self.leaf_paths()}
+        return self.paths
+
 
 class ClassificationResult(BaseModel):
     """分类结果"""
@@ -49,6 +109,7 @@ class ClassificationResult(BaseModel):
     level2: str
     level3: Optional[str] = None
     path: List[str] = Field(default_factory=list)
+    fallback: bool = Field(default=False, description="是否有某级分类在重试耗尽后使用了兜底选项（此类结果不写入结果缓存）")
 
     @property
     def category_string(self) -> str:
@@ -9,6 +9,29 @@ from models.schemas import CategoryData
 class ClassificationPrompts:
     """分类提示词管理"""
 
+    # 提示词版本（修改模板后需递增，用于使结果缓存失效）
+    VERSION = "1"
+
+    LEVEL1_RULES = """分类规则：
+1. 仔细阅读对话内容，准确判断主要诉求
+2. 根据主要诉求选择最匹配的一级分类
+3. **只输出【】中的分类名称，不要输出"说明"或"示例"的内容**
+4. 必须从上述【】选项中选择，不能创建新的分类
+5. 如果对话内容涉及多个分类，选择最主要的诉求对应的分类
+6. 如果实在无法确定具体类别，再选择"其他"类
+
+请直接输出一个分类名称（只输出【】里的内容）。"""
+
+    FLAT_RULES = """分类规则：
+1. 仔细阅读对话内容，准确判断主要诉求
+2. 从上述【】选项中选择最匹配的一个完整路径，不能创建新的路径
+3. **只输出【】中的分类路径，不要输出"说明"或"示例"的内容**
+4. 如果对话内容涉及多个分类，选择最主要的诉求对应的路径
+5. 如果实在无法确定具体类别，再选择"其他"类
+6. 涉及"飞享会员"时重点区分：用户要求退款、退费、取消扣费选【取消扣款】；要求停止自动续费、关闭续费功能选【取消续费】；若未明确提到"续费"字眼，通常选择【取消扣款】
+
+请直接输出一个分类路径（只输出【】里的内容）。"""
+
     @classmethod
     def create_prompt(
         cls,
@@ -38,7 +61,7 @@ class ClassificationPrompts:
 
         if level == 1:
             # 一级分类提示词（首轮必须包含对话内容）
-            categories_str = cls._build_level1_categories_str(available_categories, categories)
+            categories_str = cls.build_categories_str(available_categories, level, categories)
 
             prompt = f"""作为专业的对话分类分析师，请对以下对话进行一级分类。请注意，一级分类是最重要的，它决定了后续的分类方向。
 
@@ -50,20 +73,10 @@ class ClassificationPrompts:
 可选的一级分类及其含义:
 {categories_str}
 
-分类规则：
-1. 仔细阅读对话内容，准确判断主要诉求
-2. 根据主要诉求选择最匹配的一级分类
-3. **只输出【】中的分类名称，不要输出"说明"或"示例"的内容**
-4. 必须从上述【】选项中选择，不能创建新的分类
-5. 如果对话内容涉及多个分类，选择最主要的诉求对应的分类
-6. 如果实在无法确定具体类别，再选择"其他"类
-
-请直接输出一个分类名称（只输出【】里的内容）。"""
+{cls.LEVEL1_RULES}"""
         else:
             # 二级/三级分类提示词（多轮对话模式，不重复对话内容）
-            categories_str = cls._build_other_level_categories_str(
-                available_categories, level, current_path, categories
-            )
+            categories_str = cls.build_categories_str(available_categories, level, categories)
             current_path_str = " > ".join(current_path)
 
             prompt = f"""现在进行{level_names[level]}分类。
@@ -93,6 +106,191 @@ class ClassificationPrompts:
 
         return prompt
 
+    @classmethod
+    def create_flat_prompt(
+        cls,
+        conversation: str,
+        leaf_paths: List[List[str]],
+        categories: Optional[CategoryData] = None
+    ) -> str:
+        """
+        创建单次分类提示词（一次选择完整的 一级-二级-三级 路径）
+
+        Args:
+            conversation: 对话内容
+            leaf_paths: 所有合法的完整分类路径
+            categories: 分类数据对象（包含描述和示例）
+
+        Returns:
+            格式化的提示词
+        """
+        paths_str = cls._get_flat_paths_str(leaf_paths, categories)
+
+        return f"""作为专业的对话分类分析师，请为以下对话选择一个完整的分类路径。
+
+当前对话内容:
+{conversation}
+
+可选的分类路径（格式：一级-二级 或 一级-二级-三级）:
+{paths_str}
+
+{cls.FLAT_RULES}"""
+
+    @staticmethod
+    def flat_retry_prompt(answer: str) -> str:
+        """单次分类输出无效时的纠正提示"""
+        return (
+            f"你的回答“{answer.strip()}”不是可选的分类路径。"
+            "请只从上述【】选项中选择一个完整路径，并原样输出【】里的内容。"
+        )
+
+    @classmethod
+    def create_level1_messages(
+        cls,
+        conversation: str,
+        available_categories: List[str],
+        categories: Optional[CategoryData] = None
+    ) -> List[Dict]:
+        """
+        创建前缀缓存友好的一级分类消息
+
+        规则和分类选项放在固定的 system 消息中，对话内容放在最后，
+        使不同请求共享相同的前缀，便于服务端复用前缀缓存（KV cache）
+
+        Returns:
+            [system, user] 消息列表
+        """
+        categories_str = cls.build_categories_str(available_categories, 1, categories)
+        system_prompt = f"""作为专业的对话分类分析师，请对用户提供的对话进行一级分类。请注意，一级分类是最重要的，它决定了后续的分类方向。
+
+当前分类层级: 一级分类
+
+可选的一级分类及其含义:
+{categories_str}
+
+{cls.LEVEL1_RULES}"""
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"当前对话内容:\n{conversation}"}
+        ]
+
+    @classmethod
+    def create_flat_messages(
+        cls,
+        conversation: str,
+        leaf_paths: List[List[str]],
+        categories: Optional[CategoryData] = None
+    ) -> List[Dict]:
+        """
+        创建前缀缓存友好的单次分类消息（规则和路径选项在前，对话内容在后）
+
+        Returns:
+            [system, user] 消息列表
+        """
+        paths_str = cls._get_flat_paths_str(leaf_paths, categories)
+
+        system_prompt = f"""作为专业的对话分类分析师，请为用户提供的对话选择一个完整的分类路径。
+
+可选的分类路径（格式：一级-二级 或 一级-二级-三级）:
+{paths_str}
+
+{cls.FLAT_RULES}"""
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"当前对话内容:\n{conversation}"}
+        ]
+
+    @classmethod
+    def _get_flat_paths_str(
+        cls,
+        leaf_paths: List[List[str]],
+        categories: Optional[CategoryData]
+    ) -> str:
+        """获取完整路径选项字符串，优先使用预渲染结果"""
+        paths_str = cls._get_compiled_block(categories, 0, ["-".join(path) for path in leaf_paths])
+        if paths_str is None:
+            paths_str = cls._build_flat_paths_str(leaf_paths, categories)
+        return paths_str
+
+    @classmethod
+    def _build_flat_paths_str(
+        cls,
+        leaf_paths: List[List[str]],
+        categories: Optional[CategoryData]
+    ) -> str:
+        """构建完整路径选项字符串（末级分类有说明/示例时附上）"""
+        result = []
+        for path in leaf_paths:
+            line = f"【{'-'.join(path)}】"
+            leaf_info = None
+            if categories:
+                leaf_info = (categories.level3 if len(path) == 3 else categories.level2).get(path[-1])
+            if leaf_info:
+                desc = leaf_info.get('description', '')
+                example = leaf_info.get('example', '')
+                if desc and str(desc) != 'nan':
+                    line += f"\n  说明：{desc}"
+                if example and str(example).strip() and str(example) != 'nan':
+                    line += f"\n  示例：{example}"
+            result.append(line)
+        return "\n".join(result)
+
+    @classmethod
+    def build_categories_str(
+        cls,
+        available_categories: List[str],
+        level: int,
+        categories: Optional[CategoryData]
+    ) -> str:
+        """构建指定级别的可选分类字符串（带描述和示例），优先使用预渲染结果"""
+        compiled = cls._get_compiled_block(categories, level, available_categories)
+        if compiled is not None:
+            return compiled
+        if level == 1:
+            return cls._build_level1_categories_str(available_categories, categories)
+        return cls._build_other_level_categories_str(available_categories, level, [], categories)
+
+    @classmethod
+    def compile_option_blocks(cls, categories: CategoryData) -> None:
+        """
+        预渲染分类树中每个 (级别, 父节点) 的选项块，存入 categories.option_blocks
+
+        选项块只依赖分类树，加载分类数据时渲染一次；重新加载会生成新的 CategoryData，
+        预渲染结果随之重建。级别 0 为单次分类使用的完整路径列表。
+        """
+        blocks = {}
+
+        def add(level: int, options: List[str], block: str) -> None:
+            blocks.setdefault((level, tuple(options)), block)
+
+        level1_names = [info['name'] for info in categories.level1.values()]
+        add(1, level1_names, cls._build_level1_categories_str(level1_names, categories))
+        for info in categories.level1.values():
+            l2_names = list(info['children'].keys())
+            add(2, l2_names, cls._build_other_level_categories_str(l2_names, 2, [], categories))
+        for l2_info in categories.level2.values():
+            if l2_info['children']:
+                l3_names = list(l2_info['children'])
+                add(3, l3_names, cls._build_other_level_categories_str(l3_names, 3, [], categories))
+
+        leaf_paths = categories.leaf_paths()
+        add(0, ["-".join(path) for path in leaf_paths], cls._build_flat_paths_str(leaf_paths, categories))
+
+        categories.option_blocks = blocks
+
+    @staticmethod
+    def _get_compiled_block(
+        categories: Optional[CategoryData],
+        level: int,
+        options: List[str]
+    ) -> Optional[str]:
+        """查找预渲染的选项块（选项与分类树中某个父节点的子节点完全一致时命中）"""
+        if not categories or not categories.option_blocks:
+            return None
+        return categories.option_blocks.get((level, tuple(options)))
+
     @classmethod
     def _build_level1_categories_str(
         cls,
@@ -106,12 +304,8 @@ class ClassificationPrompts:
 
         result = []
         for cat_name in available_categories:
-            # 从categories.level1中查找对应的分类信息
-            cat_info = None
-            for cat_id, info in categories.level1.items():
-                if info['name'] == cat_name:
-                    cat_info = info
-                    break
+            # 通过名称索引查找对应的一级分类信息
+            cat_info = categories.get_level1(cat_name)
 
             if cat_info:
                 desc = cat_info.get('description', '')
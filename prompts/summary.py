@@ -1,14 +1,16 @@
 """
 摘要提示词模板
 """
+from typing import List, Dict
 
 
 class SummaryPrompts:
     """摘要提示词管理"""
 
-    TEMPLATE = """作为一名专业的对话分析师，请分析以下客服对话记录，提取关键信息并按照以下格式输出结构化摘要:
+    # 提示词版本（修改模板后需递增，用于使结果缓存失效）
+    VERSION = "1"
 
-【沟通内容】
+    REQUIREMENTS = """【沟通内容】
 提取用户反馈的主要问题和诉求要点，保持简洁明了。如涉及产品需明确指出(如飞享会员)。多个诉求分条呈现。
 
 【方案详情】
@@ -29,12 +31,59 @@ class SummaryPrompts:
 3. 按照【】分类标题组织内容
 4. 多个问题按时间顺序分别完整描述
 5. 每个部分表述要简明扼要
-6. 总字数不要超过120字
+6. 总字数不要超过120字"""
+
+    TEMPLATE = """作为一名专业的对话分析师，请分析以下客服对话记录，提取关键信息并按照以下格式输出结构化摘要:
+
+""" + REQUIREMENTS + """
 
 请基于以上要求，分析如下对话内容:
 {conversation}"""
 
+    # 前缀缓存友好布局：固定的 system 消息在前，对话内容在后
+    SYSTEM_PROMPT = """作为一名专业的对话分析师，请分析用户提供的客服对话记录，提取关键信息并按照以下格式输出结构化摘要:
+
+""" + REQUIREMENTS
+
+    # 分段摘要（map）：逐段提取要点，保留方案与处理结果所需的细节
+    CHUNK_TEMPLATE = """以下是一段较长客服对话的第{index}/{total}部分。请按时间顺序逐条提取这一部分的要点:
+- 用户反馈的问题和诉求（如涉及产品需明确指出）
+- 客服给出的解决方案，金额、减免/退款操作、订单编号必须与原文一致
+- 处理进展、用户是否接受方案、待跟进事项
+
+只输出要点，不要遗漏具体数字，总字数不要超过200字。
+
+对话片段:
+{conversation}"""
+
+    # 汇总（reduce）：基于各段要点按原有格式输出整段对话的摘要
+    REDUCE_TEMPLATE = """作为一名专业的对话分析师，以下是一段较长客服对话按时间顺序分段提取的要点，请综合全部要点，按照以下格式输出整段对话的结构化摘要:
+
+""" + REQUIREMENTS + """
+
+请基于以上要求，汇总如下分段要点:
+{notes}"""
+
     @classmethod
     def create_prompt(cls, conversation: str) -> str:
         """创建摘要提示词"""
         return cls.TEMPLATE.format(conversation=conversation)
+
+    @classmethod
+    def create_messages(cls, conversation: str) -> List[Dict]:
+        """创建前缀缓存友好的摘要消息（[system, user]）"""
+        return [
+            {"role": "system", "content": cls.SYSTEM_PROMPT},
+            {"role": "user", "content": f"请基于以上要求，分析如下对话内容:\n{conversation}"}
+        ]
+
+    @classmethod
+    def create_chunk_prompt(cls, chunk: str, index: int, total: int) -> str:
+        """创建分段要点提取提示词（index 从 1 开始）"""
+        return cls.CHUNK_TEMPLATE.format(index=index, total=total, conversation=chunk)
+
+    @classmethod
+    def create_reduce_prompt(cls, notes: List[str]) -> str:
+        """创建汇总提示词"""
+        joined = "\n\n".join(f"第{i}部分:\n{note}" for i, note in enumerate(notes, 1))
+        return cls.REDUCE_TEMPLATE.format(notes=joined)
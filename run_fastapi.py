@@ -2,14 +2,24 @@
 FastAPI应用入口
 简化版，核心逻辑移至Agent层
 """
+import asyncio
+import json
 import sys
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 import uvicorn
 from loguru import logger
 
 from agent.orchestrator import ConversationAnalyzer
-from models.schemas import ConversationRequest, ConversationResponse
+from models.schemas import (
+    ConversationRequest,
+    ConversationResponse,
+    BatchConversationRequest,
+    BatchConversationResponse
+)
 from config.settings import settings
+from utils import tokenizer
+from utils.llm_client import LLMClient
 
 # 配置日志
 logger.remove()  # 移除默认处理器
@@ -42,11 +52,83 @@ async def startup_event():
         logger.error(f"对话分析器初始化失败: {e}")
         raise
 
+    # 预热 LLM 连接，避免首个请求承担建连开销
+    await LLMClient.awarmup()
+
+    # 后台加载 tokenizer（不阻塞启动，首个请求无需等待编码文件加载）
+    tokenizer.preload(settings.default_model, settings.agent_model)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用停止时停止分类文件监听并关闭 LLM 连接池"""
+    if analyzer is not None:
+        analyzer.close()
+    await LLMClient.aclose_http_clients()
+
 
 @app.post("/ai/analyze", response_model=ConversationResponse)
 async def analyze_conversation(request: ConversationRequest):
-    """对话分析接口"""
-    return analyzer.analyze(request)
+    """对话分析接口（异步执行，不阻塞事件循环）"""
+    return await analyzer.aanalyze(request)
+
+
+@app.post("/ai/analyze/stream")
+async def analyze_conversation_stream(request: ConversationRequest):
+    """
+    流式对话分析接口（Server-Sent Events）
+
+    事件顺序：category（分类完成即推送）、summary（摘要片段，可能多条）、done（完整结果与 token 用量）
+    """
+    async def event_stream():
+        async for event, data in analyzer.astream_analyze(request):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/ai/analyze/batch", response_model=BatchConversationResponse)
+async def analyze_conversation_batch(request: BatchConversationRequest):
+    """批量对话分析接口（结果顺序与请求一致，单条失败不影响其他会话）"""
+    if len(request.conversations) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"单次批量请求最多 {settings.batch_max_size} 条会话"
+        )
+
+    results = await analyzer.aanalyze_many(request.conversations)
+    success_count = sum(1 for r in results if r.message == "success")
+    return BatchConversationResponse(
+        results=results,
+        total=len(results),
+        success=success_count,
+        fail=len(results) - success_count
+    )
+
+
+@app.get("/ai/stats")
+async def get_stats():
+    """运行统计（结果缓存命中率、token用量等）"""
+    return analyzer.get_stats()
+
+
+@app.post("/ai/admin/reload-categories")
+async def reload_categories(force: bool = False):
+    """
+    重新加载分类树（在线程池中构建，不阻塞事件循环；处理中的请求继续使用旧分类树）
+
+    Args:
+        force: 分类文件内容未变化时也替换
+    """
+    try:
+        return await asyncio.to_thread(analyzer.reload_categories, force)
+    except Exception as e:
+        logger.error(f"重新加载分类树失败: {e}")
+        raise HTTPException(status_code=500, detail=f"重新加载分类树失败: {e}")
 
 
 @app.get("/health")
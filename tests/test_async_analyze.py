@@ -0,0 +1,120 @@
+"""
+异步分析路径测试
+"""
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import settings
+from models.schemas import ConversationRequest
+from utils.llm_client import LLMClient
+
+pytest.importorskip("pandas")
+
+CSV = """id,name,parent_id,level
+1,费用异议咨询,0,1
+2,账户管理,0,1
+11,利息,1,2
+13,注销账号,2,2
+14,修改手机号,2,2
+"""
+
+
+class _FakeAsyncClient:
+    """异步 LLM：每次调用先让出事件循环再返回（分类选第一个选项），记录各会话调用的开始与结束"""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.events = []
+
+    def count_tokens(self, text):
+        return len(text)
+
+    async def achat_completion(self, messages, **kwargs):
+        text = "\n".join(message["content"] for message in messages)
+        conversation_id = re.search(r"问题(\d+)", text).group(1)
+        self.events.append((conversation_id, "start"))
+        await asyncio.sleep(0.01)
+        self.events.append((conversation_id, "end"))
+        prompt = messages[-1]["content"]
+        if "可选的" not in prompt:
+            return "摘要"
+        block = prompt.split("可选的", 1)[1].split("\n\n", 1)[0]
+        return re.findall(r"^【([^】]+)】", block, re.M)[0]
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    from agent.orchestrator import ConversationAnalyzer
+
+    path = tmp_path / "categories.csv"
+    path.write_text(CSV, encoding="utf-8")
+    for name, value in {
+        "category_csv_path": str(path),
+        "category_snapshot_enabled": False,
+        "category_watch_interval": 0,
+        "result_cache_enabled": False,
+        "classify_cache_enabled": False,
+        "classify_constrained_mode": "off",
+        "prompt_cache_layout": False,
+        "speculative_level2": False,
+        "preclassify_data_path": "",
+        "parallel_summary": True,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    client = _FakeAsyncClient()
+    # 先替换客户端工厂，构造各工具时不创建真实的 LLM 客户端
+    monkeypatch.setattr(LLMClient, "for_scenario", staticmethod(lambda scenario="default": client))
+    return ConversationAnalyzer(), client
+
+
+def test_concurrent_aanalyze_interleaves(analyzer):
+    analyzer, client = analyzer
+    requests = [
+        ConversationRequest(conversationId=str(i), userNo="u", conversation=f"客户：问题{i}", messageNum="1")
+        for i in range(3)
+    ]
+
+    async def run():
+        return await asyncio.gather(*(analyzer.aanalyze(request) for request in requests))
+
+    results = asyncio.run(run())
+    assert [r.message for r in results] == ["success"] * 3
+    assert [r.category for r in results] == ["费用异议咨询-利息"] * 3
+    assert {r.summary for r in results} == {"摘要"}
+
+    # 三个会话的 LLM 调用都在第一个调用返回之前开始，事件循环没有被任何一个请求独占
+    first_end = client.events.index(("0", "end"))
+    started = {conversation_id for conversation_id, kind in client.events[:first_end] if kind == "start"}
+    assert started == {"0", "1", "2"}
+
+
+def test_local_steps_do_not_block_event_loop(analyzer):
+    analyzer, _ = analyzer
+
+    def slow_clean(conversation):
+        time.sleep(0.2)
+        return conversation
+
+    analyzer.cleaner_tool = SimpleNamespace(_run=slow_clean)
+    request = ConversationRequest(conversationId="0", userNo="u", conversation="客户：问题0", messageNum="1")
+
+    async def run():
+        ticks = []
+
+        async def ticker():
+            while len(ticks) < 20:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        _, result = await asyncio.gather(ticker(), analyzer.aanalyze(request))
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+    assert result.message == "success"
+    # 清洗在线程中执行时，其他协程照常运行，不会出现接近清洗耗时的停顿
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.15
@@ -0,0 +1,105 @@
+"""
+批量分析测试
+"""
+import asyncio
+import threading
+import time
+
+from agent.orchestrator import ConversationAnalyzer
+from config.settings import settings
+from models.schemas import ConversationRequest, ConversationResponse
+
+
+def _requests(count: int):
+    return [
+        ConversationRequest(conversationId=str(i), userNo="u", conversation=f"客户：问题{i}", messageNum="1")
+        for i in range(count)
+    ]
+
+
+def _response(request: ConversationRequest) -> ConversationResponse:
+    return ConversationResponse(
+        conversationId=request.conversationId, userNo=request.userNo, category="其他", summary="摘要"
+    )
+
+
+class _InFlight:
+    """记录同时在处理中的最大请求数"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def _analyzer(failing: str = "3") -> tuple:
+    """不加载分类数据和模型的分析器：单条分析由桩函数代替（failing 对应的会话抛出异常）"""
+    analyzer = ConversationAnalyzer.__new__(ConversationAnalyzer)
+    analyzer._init_summary_pool()
+    in_flight = _InFlight()
+
+    def analyze(request):
+        with in_flight:
+            # 先开始的会话后完成，检验结果顺序不受完成顺序影响
+            time.sleep(0.002 * (10 - int(request.conversationId)))
+            if request.conversationId == failing:
+                raise RuntimeError("模型调用失败")
+            return _response(request)
+
+    async def aanalyze(request):
+        with in_flight:
+            await asyncio.sleep(0.002 * (10 - int(request.conversationId)))
+            if request.conversationId == failing:
+                raise RuntimeError("模型调用失败")
+            return _response(request)
+
+    analyzer.analyze = analyze
+    analyzer.aanalyze = aanalyze
+    return analyzer, in_flight
+
+
+def _check(results, count: int):
+    assert [r.conversationId for r in results] == [str(i) for i in range(count)]
+    assert [r.message for r in results] == ["fail" if i == 3 else "success" for i in range(count)]
+
+
+def test_analyze_many_keeps_order_isolates_failures_and_bounds_concurrency():
+    analyzer, in_flight = _analyzer()
+    results = analyzer.analyze_many(_requests(10), concurrency=3)
+    _check(results, 10)
+    assert in_flight.peak == 3
+
+
+def test_aanalyze_many_keeps_order_isolates_failures_and_bounds_concurrency():
+    analyzer, in_flight = _analyzer()
+    results = asyncio.run(analyzer.aanalyze_many(_requests(10), concurrency=3))
+    _check(results, 10)
+    assert in_flight.peak == 3
+
+
+def test_batch_endpoint(monkeypatch):
+    from fastapi.testclient import TestClient
+    import run_fastapi
+
+    analyzer, _ = _analyzer()
+    monkeypatch.setattr(run_fastapi, "analyzer", analyzer)
+    monkeypatch.setattr(settings, "batch_max_size", 5)
+    client = TestClient(run_fastapi.app)
+
+    conversations = [request.model_dump() for request in _requests(5)]
+    body = client.post("/ai/analyze/batch", json={"conversations": conversations}).json()
+    assert [r["conversationId"] for r in body["results"]] == ["0", "1", "2", "3", "4"]
+    assert (body["total"], body["success"], body["fail"]) == (5, 4, 1)
+
+    conversations = [request.model_dump() for request in _requests(6)]
+    response = client.post("/ai/analyze/batch", json={"conversations": conversations})
+    assert response.status_code == 413
@@ -0,0 +1,80 @@
+"""
+批量处理输入测试
+"""
+import json
+
+import pytest
+
+from main import _analyze_row
+from models.schemas import ConversationResponse
+from utils.bulk_io import BulkCheckpoint, iter_rows
+
+
+def test_non_object_jsonl_lines_become_empty_rows(tmp_path):
+    path = tmp_path / "input.jsonl"
+    path.write_text('{"conversation": "你好"}\n123\n[1, 2]\nnot json\n', encoding="utf-8")
+    assert list(iter_rows(str(path))) == [{"conversation": "你好"}, {}, {}, {}]
+
+
+class _FailingAnalyzer:
+    def analyze(self, request):
+        raise RuntimeError("boom")
+
+
+def test_bad_row_is_recorded_as_failure():
+    assert _analyze_row(None, [1, 2], 0).message == "fail"
+    response = _analyze_row(_FailingAnalyzer(), {"conversation": "客户：你好", "conversationId": "c1"}, 1)
+    assert (response.conversationId, response.message) == ("c1", "fail")
+
+
+class _InterruptingAnalyzer:
+    """interrupt_at 对应的会话抛出 KeyboardInterrupt（模拟中途终止），记录分析过的会话"""
+
+    def __init__(self, interrupt_at=None):
+        self.interrupt_at = interrupt_at
+        self.seen = []
+
+    def reserve_summary_workers(self, concurrency):
+        pass
+
+    def analyze(self, request):
+        if request.conversationId == self.interrupt_at:
+            raise KeyboardInterrupt
+        self.seen.append(request.conversationId)
+        return ConversationResponse(
+            conversationId=request.conversationId, userNo=request.userNo, category="其他", summary="摘要"
+        )
+
+
+def test_resume_after_interruption(tmp_path, monkeypatch):
+    import main
+
+    input_path = tmp_path / "input.jsonl"
+    input_path.write_text(
+        "".join(json.dumps({"conversationId": str(i), "conversation": f"客户：问题{i}"}) + "\n" for i in range(10)),
+        encoding="utf-8"
+    )
+    output_path = tmp_path / "output.jsonl"
+    checkpoint_path = f"{output_path}.checkpoint"
+
+    first = _InterruptingAnalyzer(interrupt_at="6")
+    monkeypatch.setattr(main, "get_analyzer", lambda: first)
+    with pytest.raises(KeyboardInterrupt):
+        main.run_bulk(str(input_path), str(output_path), workers=1, checkpoint_every=2)
+
+    checkpoint = BulkCheckpoint.load(checkpoint_path, str(input_path))
+    assert checkpoint.rows_done == 6
+    assert checkpoint.output_offset == output_path.stat().st_size
+
+    # 模拟进程被强制结束：断点之后已写出一行完整结果和半行结果，断点尚未更新
+    with open(output_path, "ab") as f:
+        f.write(b'{"conversationId": "6", "message": "success"}\n{"conversationId": "7", "mes')
+
+    second = _InterruptingAnalyzer()
+    monkeypatch.setattr(main, "get_analyzer", lambda: second)
+    assert main.run_bulk(str(input_path), str(output_path), workers=2, checkpoint_every=2) == 4
+    assert sorted(second.seen) == ["6", "7", "8", "9"]
+
+    lines = output_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["conversationId"] for line in lines] == [str(i) for i in range(10)]
+    assert BulkCheckpoint.load(checkpoint_path, str(input_path)).rows_done == 10
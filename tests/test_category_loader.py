@@ -0,0 +1,79 @@
+"""
+分类数据加载测试
+"""
+import pytest
+
+from config.settings import settings
+from prompts.classification import ClassificationPrompts
+from tools.category_loader import CategoryLoaderTool
+
+pytest.importorskip("pandas")
+
+CSV = """id,name,parent_id,level
+主键ID,分类名称,上级问题分类ID,问题分类级别
+13,取消扣款,12,3
+1,费用异议咨询,0,1
+12,飞享会员,1,2
+11,利息,1,2
+14,取消续费,12,3
+2,其他,0,1
+21,其他,2,2
+"""
+
+
+@pytest.fixture
+def categories(tmp_path, monkeypatch):
+    csv_path = tmp_path / "categories.csv"
+    csv_path.write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(settings, "category_csv_path", str(csv_path))
+    return CategoryLoaderTool()._run()
+
+
+def test_tree_built_regardless_of_row_order(categories):
+    assert [info['name'] for info in categories.level1.values()] == ["费用异议咨询", "其他"]
+    assert categories.level2_names("费用异议咨询") == ["飞享会员", "利息"]
+    assert categories.level2["飞享会员"]["children"] == ["取消扣款", "取消续费"]
+    assert categories.level3["取消续费"]["parent"] == "飞享会员"
+
+
+def test_indexes(categories):
+    assert categories.get_level1("其他") is categories.level1[2]
+    assert categories.get_level1("不存在") is None
+    assert categories.level2_names("不存在") == []
+    assert categories.nodes[21] == {'name': "其他", 'parent_id': 2, 'level': 2}
+
+
+def test_option_blocks_match_rendering(categories):
+    raw = categories.model_copy(update={"option_blocks": {}})
+    assert (2, ("飞享会员", "利息")) in categories.option_blocks
+    for options, level in [(["费用异议咨询", "其他"], 1), (["飞享会员", "利息"], 2), (["取消扣款", "取消续费"], 3)]:
+        assert ClassificationPrompts.build_categories_str(options, level, categories) == \
+            ClassificationPrompts.build_categories_str(options, level, raw)
+    leaf_paths = categories.leaf_paths()
+    assert ClassificationPrompts.create_flat_prompt("对话", leaf_paths, categories) == \
+        ClassificationPrompts.create_flat_prompt("对话", leaf_paths, raw)
+
+
+def test_snapshot_skips_csv_parsing(tmp_path, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    csv_path = tmp_path / "categories.csv"
+    csv_path.write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(settings, "category_csv_path", str(csv_path))
+    monkeypatch.setattr(settings, "category_snapshot_enabled", True)
+    monkeypatch.setattr(settings, "category_snapshot_path", "")
+    parsed = CategoryLoaderTool()._run()
+    assert (tmp_path / "categories.csv.snapshot").exists()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("快照有效时不应解析 CSV")
+
+    monkeypatch.setattr(pd, "read_csv", fail)
+    loaded = CategoryLoaderTool()._run()
+    assert loaded.version == parsed.version
+    assert loaded.option_blocks == parsed.option_blocks
+    assert loaded.path_index() == parsed.path_index()
+
+    # 分类文件变化后快照失效，重新解析
+    csv_path.write_text(CSV + "22,新增分类,2,2\n", encoding="utf-8")
+    with pytest.raises(AssertionError):
+        CategoryLoaderTool()._run()
@@ -0,0 +1,76 @@
+"""
+分类规则快速路径测试
+"""
+import pytest
+
+from config.settings import settings
+from tools.category_loader import CategoryLoaderTool
+from tools.rule_classify import RuleClassifyTool
+from utils.keyword_matcher import KeywordMatcher
+
+pytest.importorskip("pandas")
+
+CSV = """id,name,parent_id,level,keywords,regex
+主键ID,分类名称,上级问题分类ID,问题分类级别,关键词,正则
+1,账户管理,0,1,,
+13,关闭营销电话/短信,1,2,营销电话|营销短信|别再给我打电话,
+15,注销账号,1,2,注销账号|注销账户,
+2,其他,0,1,不应生效,
+21,其他,2,2,,"退订.{0,4}短信"
+"""
+
+
+def test_keyword_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher()
+    for keyword in ("注销", "注销账号", "账号"):
+        matcher.add(keyword, keyword)
+    matcher.build()
+    assert [keyword for _, keyword, _ in matcher.iter_matches("我要注销账号")] == ["注销", "注销账号", "账号"]
+
+
+@pytest.fixture
+def tool(tmp_path, monkeypatch):
+    csv_path = tmp_path / "categories.csv"
+    csv_path.write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(settings, "category_csv_path", str(csv_path))
+    monkeypatch.setattr(settings, "category_rules_mode", "on")
+    return RuleClassifyTool(categories=CategoryLoaderTool()._run())
+
+
+def test_rules_compiled_for_leaves_only(tool):
+    # 一级分类"其他"不是叶子，其关键词被忽略
+    assert tool.categories.rules.size == 6
+    assert tool._run("客户：不应生效") is None
+
+
+def test_unique_hit_decides(tool):
+    assert tool._run("客服：您好\n客户：我要注销账号") == ["账户管理", "注销账号"]
+    assert tool._run("客户：帮我退订这个短信") == ["其他", "其他"]
+    # 只匹配客户发言
+    assert tool._run("客服：营销短信已为您关闭\n客户：好的") is None
+    # 命中多个分类时交给LLM
+    assert tool._run("客户：别再给我打电话了，我要注销账户") is None
+    assert tool.stats()["rule_hits"] == 2
+    assert tool.stats()["ambiguous"] == 1
+
+
+def test_shadow_mode_records_agreement(tool, monkeypatch):
+    monkeypatch.setattr(settings, "category_rules_mode", "shadow")
+    assert not tool.decisive
+    rule_path = tool._run("客户：我要注销账号")
+    tool.record_decision(rule_path, ["账户管理", "注销账号"])
+    tool.record_decision(rule_path, ["其他", "其他"])
+    stats = tool.stats()
+    assert stats["shadow_agree"] == 1 and stats["shadow_disagree"] == 1 and stats["llm_decisions"] == 2
+
+
+def test_decisions_are_recorded_by_source(tool, monkeypatch):
+    monkeypatch.setattr(settings, "category_rules_mode", "shadow")
+    rule_path = tool._run("客户：我要注销账号")
+    tool.record_decision(rule_path, ["账户管理", "注销账号"], source="preclassify")
+    tool.record_decision(rule_path, ["其他", "其他"], source="llm")
+    stats = tool.stats()
+    # 近邻预分类的决定不计入与 LLM 的一致率
+    assert stats["preclassify_decisions"] == 1 and stats["preclassify_shadow_agree"] == 1
+    assert stats["llm_decisions"] == 1 and stats["shadow_disagree"] == 1
+    assert "shadow_agree" not in stats
@@ -0,0 +1,85 @@
+"""
+分类树热更新测试
+"""
+import os
+
+import pytest
+
+from config.settings import settings
+from tools.category_loader import CategoryLoaderTool
+from tools.rule_classify import RuleClassifyTool
+from utils.category_store import CategoryFileWatcher, CategoryStore, pinned_categories, use_categories
+
+pytest.importorskip("pandas")
+
+CSV_V1 = """id,name,parent_id,level,keywords
+1,账户管理,0,1,
+13,注销账号,1,2,注销账号
+"""
+
+CSV_V2 = """id,name,parent_id,level,keywords
+1,账户管理,0,1,
+13,注销账号,1,2,注销账号
+14,修改手机号,1,2,换手机号
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    path = tmp_path / "categories.csv"
+    path.write_text(CSV_V1, encoding="utf-8")
+    monkeypatch.setattr(settings, "category_csv_path", str(path))
+    monkeypatch.setattr(settings, "category_rules_mode", "on")
+    return path
+
+
+def test_reload_swaps_only_when_content_changes(csv_path):
+    store = CategoryStore(CategoryLoaderTool()._run)
+    assert store.reload() is None
+    assert store.generation == 1
+
+    csv_path.write_text(CSV_V2, encoding="utf-8")
+    swapped = []
+    old, new = store.reload(on_swap=lambda *trees: swapped.append(trees))
+    assert swapped == [(old, new)]
+    assert store.categories is new and old.version != new.version
+    assert store.generation == 2
+    assert "账户管理-修改手机号" in new.path_index()
+
+
+def test_failed_reload_keeps_current_tree(csv_path):
+    store = CategoryStore(CategoryLoaderTool()._run)
+    current = store.categories
+    csv_path.write_text("broken", encoding="utf-8")
+    with pytest.raises(Exception):
+        store.reload()
+    assert store.categories is current
+    assert store.stats()["failures"] == 1
+
+
+def test_pinned_request_keeps_old_tree(csv_path):
+    store = CategoryStore(CategoryLoaderTool()._run)
+    tool = RuleClassifyTool(categories=store.categories)
+
+    with use_categories(store.categories) as pinned:
+        csv_path.write_text(CSV_V2, encoding="utf-8")
+        store.reload(on_swap=lambda old, new: tool.set_categories(new))
+        # 处理中的请求仍使用开始时的分类树
+        assert pinned_categories() is pinned
+        assert tool._run("客户：我想换手机号") is None
+
+    assert pinned_categories() is None
+    assert tool._run("客户：我想换手机号") == ["账户管理", "修改手机号"]
+
+
+def test_watcher_triggers_on_file_change(csv_path):
+    calls = []
+    watcher = CategoryFileWatcher(str(csv_path), lambda: calls.append(1), interval=1)
+    assert not watcher.check()
+
+    csv_path.write_text(CSV_V2, encoding="utf-8")
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert watcher.check()
+    assert not watcher.check()
+    assert calls == [1]
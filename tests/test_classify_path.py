@@ -0,0 +1,107 @@
+"""
+单次路径分类测试
+"""
+import asyncio
+import re
+
+import pytest
+
+from config.settings import settings
+from agent.classifier import ClassificationAgent
+from models.schemas import CategoryData
+from utils.llm_client import LLMClient
+
+CATEGORIES = CategoryData(
+    level1={
+        1: {"name": "费用异议咨询", "children": {"飞享会员": [], "利息": []}},
+        2: {"name": "账户管理", "children": {"注销账号": [], "修改手机号": []}},
+    },
+    level2={
+        "飞享会员": {"parent": "费用异议咨询", "children": ["取消扣款", "取消续费"]},
+        "利息": {"parent": "费用异议咨询", "children": []},
+        "注销账号": {"parent": "账户管理", "children": []},
+        "修改手机号": {"parent": "账户管理", "children": []},
+    },
+)
+CONVERSATION = "客户：我要注销账号"
+
+
+class _FakeClient:
+    """单次路径提示词返回 flat_answers 中的下一个回答，分层提示词选择第一个选项"""
+
+    model = "fake-classifier"
+
+    def __init__(self, *flat_answers: str):
+        self.flat_answers = list(flat_answers)
+        self.flat_calls = []
+        self.level_calls = 0
+
+    def chat_completion(self, messages, **kwargs):
+        if "可选的分类路径" in messages[0]["content"]:
+            self.flat_calls.append(messages)
+            return self.flat_answers.pop(0)
+        self.level_calls += 1
+        block = messages[-1]["content"].split("可选的", 1)[1].split("\n\n", 1)[0]
+        return re.findall(r"^【([^】]+)】", block, re.M)[0]
+
+    async def achat_completion(self, messages, **kwargs):
+        return self.chat_completion(messages, **kwargs)
+
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    monkeypatch.setattr(settings, "classification_mode", "hierarchical")
+    monkeypatch.setattr(settings, "classify_cache_enabled", False)
+    monkeypatch.setattr(settings, "classify_constrained_mode", "off")
+    monkeypatch.setattr(settings, "prompt_cache_layout", False)
+    monkeypatch.setattr(settings, "speculative_level2", False)
+
+    def make(client: _FakeClient) -> ClassificationAgent:
+        # 先替换客户端工厂，构造分类工具时不创建真实的 LLM 客户端
+        monkeypatch.setattr(LLMClient, "for_scenario", staticmethod(lambda scenario="default": client))
+        return ClassificationAgent(CATEGORIES)
+
+    return make
+
+
+def test_valid_path_uses_single_call(make_agent):
+    client = _FakeClient("【费用异议咨询-飞享会员-取消续费】")
+    agent = make_agent(client)
+
+    result = agent.classify(CONVERSATION, mode="flat")
+    assert result.path == ["费用异议咨询", "飞享会员", "取消续费"]
+    assert result.level3 == "取消续费"
+    assert len(client.flat_calls) == 1 and client.level_calls == 0
+
+
+def test_path_outside_tree_retries_with_feedback_then_falls_back(make_agent):
+    # 路径各级都存在但组合不在分类树中
+    client = _FakeClient("账户管理-利息-扣款", "账户管理-利息-扣款")
+    agent = make_agent(client)
+
+    result = asyncio.run(agent.aclassify(CONVERSATION, mode="flat"))
+    assert result.path == ["费用异议咨询", "飞享会员", "取消扣款"]
+    assert client.level_calls == 3
+
+    # 重试时附上模型的无效回答和纠正提示，而不是原样重发
+    first, retry = client.flat_calls
+    assert retry[:len(first)] == first
+    assert retry[len(first)] == {"role": "assistant", "content": "账户管理-利息-扣款"}
+    assert "不是可选的分类路径" in retry[-1]["content"]
+    assert agent.path_tool.resolver.stats()["fallback"] == 1
+
+
+def test_request_mode_overrides_setting(make_agent, monkeypatch):
+    client = _FakeClient("账户管理-注销账号")
+    agent = make_agent(client)
+
+    assert agent.classify(CONVERSATION).path == ["费用异议咨询", "飞享会员", "取消扣款"]
+    assert not client.flat_calls
+    assert agent.classify(CONVERSATION, mode="FLAT").path == ["账户管理", "注销账号"]
+    assert len(client.flat_calls) == 1
+
+    monkeypatch.setattr(settings, "classification_mode", "flat")
+    agent.classify(CONVERSATION, mode="hierarchical")
+    assert len(client.flat_calls) == 1
+    assert ClassificationAgent.resolve_mode("unknown") == "hierarchical"
+    assert ClassificationAgent.resolve_mode() == "flat"
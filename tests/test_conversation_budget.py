@@ -0,0 +1,81 @@
+"""
+对话 token 预算裁剪测试
+"""
+import pytest
+
+from config.settings import settings
+from tools.conversation_budget import ConversationBudgetTool
+from utils.llm_client import LLMClient
+
+
+class _FakeCounter:
+    """按字符数计 token（不创建真实的 LLM 客户端）"""
+
+    def count_tokens(self, text):
+        return len(text)
+
+
+@pytest.fixture
+def tool(monkeypatch):
+    monkeypatch.setattr(LLMClient, "for_scenario", staticmethod(lambda scenario="default": _FakeCounter()))
+    return ConversationBudgetTool()
+
+
+def _conversation(rounds: int) -> str:
+    lines = []
+    for i in range(rounds):
+        lines.append(f"客户：第{i}个问题，我想退飞享会员")
+        lines.append("客服小飞：亲亲，请您稍等，正在为您查询")
+        lines.append(f"客服小飞：第{i}次回复，已为您处理退款")
+    return "\n".join(lines)
+
+
+def test_within_budget_is_unchanged(tool):
+    text = _conversation(2)
+    assert tool.fit(text, 10000) == text
+    assert tool.fit(text, 0) == text
+
+
+def test_repeated_agent_boilerplate_is_dropped(tool):
+    text = _conversation(3)
+    fitted = tool.fit(text, tool._count(text) - 1)
+    assert fitted.count("正在为您查询") == 1
+    assert fitted.count("客户：") == 3
+
+
+def test_keeps_head_tail_and_customer_turns(tool, monkeypatch):
+    monkeypatch.setattr(settings, "budget_head_turns", 2)
+    monkeypatch.setattr(settings, "budget_tail_turns", 2)
+    text = _conversation(40)
+    budget = 600
+    fitted = tool.fit(text, budget)
+    lines = fitted.split("\n")
+
+    assert tool._count(fitted) <= budget
+    assert lines[:2] == text.split("\n")[:2]
+    # 结尾的重复话术已被删除
+    assert lines[-2:] == ["客户：第39个问题，我想退飞享会员", "客服小飞：第39次回复，已为您处理退款"]
+    assert "省略" in fitted
+    # 中间部分优先保留客户发言
+    middle = lines[2:-2]
+    customer = sum(line.startswith("客户：") for line in middle)
+    agent = sum(line.startswith("客服") for line in middle)
+    assert customer > agent
+
+
+def test_task_budgets(tool, monkeypatch):
+    monkeypatch.setattr(settings, "classification_input_budget", 200)
+    monkeypatch.setattr(settings, "summary_input_budget", 0)
+    text = _conversation(40)
+    assert tool._count(tool._run(text, task="classification")) <= 200
+    assert tool._run(text, task="summary") == text
+
+
+def test_classification_budget_disabled_by_default(tool, monkeypatch):
+    from config.settings import Settings
+
+    # 默认不裁剪分类输入，升级后分类结果不会悄悄改变
+    monkeypatch.delenv("CLASSIFICATION_INPUT_BUDGET", raising=False)
+    monkeypatch.setattr(settings, "classification_input_budget", Settings().classification_input_budget)
+    text = _conversation(200)
+    assert tool._run(text, task="classification") == text
@@ -0,0 +1,125 @@
+"""
+分类决策缓存测试
+"""
+import re
+
+import pytest
+
+from config.settings import settings
+from models.schemas import CategoryData
+from tools.classify_level import ClassifyLevelTool
+from utils.decision_cache import LevelDecisionCache
+from utils.llm_client import LLMClient
+
+CONVERSATION = "客户：我要换绑手机号"
+
+
+def _categories(phone_description: str = "") -> CategoryData:
+    return CategoryData(
+        level1={
+            1: {"name": "费用异议咨询", "children": {"飞享会员": [], "利息": []}},
+            2: {"name": "账户管理", "children": {"注销账号": [], "修改手机号": []}},
+        },
+        level2={
+            "飞享会员": {"parent": "费用异议咨询", "children": []},
+            "利息": {"parent": "费用异议咨询", "children": []},
+            "注销账号": {"parent": "账户管理", "children": []},
+            "修改手机号": {"parent": "账户管理", "children": [], "description": phone_description},
+        },
+    )
+
+
+class _FakeClient:
+    """选择提示词中的第一个选项（answer 不为空时固定返回 answer），记录调用次数"""
+
+    model = "fake-classifier"
+
+    def __init__(self, answer: str = ""):
+        self.answer = answer
+        self.calls = 0
+
+    def chat_completion(self, messages, **kwargs):
+        self.calls += 1
+        if self.answer:
+            return self.answer
+        block = messages[-1]["content"].split("可选的", 1)[1].split("\n\n", 1)[0]
+        return re.findall(r"^【([^】]+)】", block, re.M)[0]
+
+
+@pytest.fixture
+def make_tool(monkeypatch):
+    monkeypatch.setattr(settings, "classify_cache_enabled", True)
+    monkeypatch.setattr(settings, "classify_constrained_mode", "off")
+    monkeypatch.setattr(settings, "prompt_cache_layout", False)
+
+    def make(client: _FakeClient, categories: CategoryData = None) -> ClassifyLevelTool:
+        # 先替换客户端工厂，构造分类工具时不创建真实的 LLM 客户端
+        monkeypatch.setattr(LLMClient, "for_scenario", staticmethod(lambda scenario="default": client))
+        return ClassifyLevelTool(categories=categories or _categories())
+
+    return make
+
+
+def _level2(tool: ClassifyLevelTool, level1: str) -> str:
+    options = tool.categories.level2_names(level1)
+    return tool._run(CONVERSATION, options, [level1], level=2)[0]
+
+
+def test_repeat_call_is_served_from_cache(make_tool):
+    client = _FakeClient()
+    tool = make_tool(client)
+    history = [{"role": "user", "content": "上一轮"}]
+
+    first = tool._run(CONVERSATION, ["费用异议咨询", "账户管理"], [], 1, history)
+    second = tool._run(CONVERSATION, ["费用异议咨询", "账户管理"], [], 1, history)
+    assert first == second
+    assert client.calls == 1
+    assert tool.decision_cache.stats()["hits"] == 1
+
+    # 选项或路径不同时不复用
+    tool._run(CONVERSATION, ["账户管理", "费用异议咨询"], [], 1, history)
+    assert client.calls == 2
+
+
+def test_lru_eviction_at_capacity():
+    cache = LevelDecisionCache(max_size=2)
+    cache.set("a", "fp", "A")
+    cache.set("b", "fp", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "fp", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_reload_drops_only_changed_branch(make_tool):
+    client = _FakeClient()
+    tool = make_tool(client)
+    tool._run(CONVERSATION, ["费用异议咨询", "账户管理"], [], 1)
+    _level2(tool, "费用异议咨询")
+    _level2(tool, "账户管理")
+    assert client.calls == 3
+
+    # 只修改“账户管理”分支下某个二级分类的说明
+    tool.set_categories(_categories(phone_description="更换绑定的手机号"))
+    assert tool.decision_cache.stats()["size"] == 2
+
+    tool._run(CONVERSATION, ["费用异议咨询", "账户管理"], [], 1)
+    _level2(tool, "费用异议咨询")
+    assert client.calls == 3
+    _level2(tool, "账户管理")
+    assert client.calls == 4
+
+
+def test_fallback_is_never_cached(make_tool):
+    client = _FakeClient(answer="无法判断")
+    tool = make_tool(client)
+
+    assert tool._run(CONVERSATION, ["费用异议咨询", "账户管理"])[0] == "费用异议咨询"
+    assert client.calls == 3
+    assert tool.decision_cache.stats()["size"] == 0
+
+    tool._run(CONVERSATION, ["费用异议咨询", "账户管理"])
+    assert client.calls == 6
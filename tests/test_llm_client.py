@@ -0,0 +1,108 @@
+"""
+LLM 客户端调用参数测试
+"""
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from config.settings import settings
+from utils.llm_client import LLMClient
+
+
+class _RecordingChat:
+    """记录调用参数，按 max_tokens 模拟截断"""
+
+    def __init__(self):
+        self.kwargs = []
+
+    def invoke(self, messages, **kwargs):
+        self.kwargs.append(kwargs)
+        finish_reason = "length" if kwargs["extra_body"]["max_tokens"] < 4 else "stop"
+        return AIMessage(content="其他", response_metadata={
+            "token_usage": {"prompt_tokens": 3, "completion_tokens": 2},
+            "finish_reason": finish_reason,
+        })
+
+    async def ainvoke(self, messages, **kwargs):
+        return self.invoke(messages, **kwargs)
+
+
+def test_generation_params_are_forwarded(monkeypatch):
+    monkeypatch.setattr(settings, "classification_max_tokens", 16)
+    monkeypatch.setattr(settings, "classification_top_p", 0.8)
+    monkeypatch.setattr(settings, "classification_stop", ["\n"])
+    client = LLMClient(api_key="sk-test", api_base="http://test/v1", model="params-test")
+    client.client = _RecordingChat()
+    messages = [{"role": "user", "content": "hi"}]
+
+    client.chat_completion(messages, temperature=0.1, **LLMClient.generation_params("classification"))
+    assert client.client.kwargs[-1] == {
+        "temperature": 0.1, "top_p": 0.8, "stop": ["\n"], "extra_body": {"max_tokens": 16}
+    }
+    # 未配置的参数不传给模型
+    monkeypatch.setattr(settings, "summary_top_p", None)
+    monkeypatch.setattr(settings, "summary_stop", [])
+    client.chat_completion(messages, **LLMClient.generation_params("summary"))
+    assert client.client.kwargs[-1] == {"extra_body": {"max_tokens": settings.summary_max_tokens}}
+
+
+def test_truncated_responses_are_counted():
+    client = LLMClient(api_key="sk-test", api_base="http://test/v1", model="truncate-test")
+    client.client = _RecordingChat()
+    messages = [{"role": "user", "content": "hi"}]
+    before = LLMClient.get_total_usage()["truncated_count"]
+
+    async def run():
+        with LLMClient.track_usage() as usage:
+            await client.achat_completion(messages, max_tokens=2)
+            await client.achat_completion(messages, max_tokens=64)
+        return usage
+
+    usage = asyncio.run(run())
+    assert usage["truncated"] == 1
+    assert LLMClient.get_total_usage()["truncated_count"] == before + 1
+
+
+def test_clients_are_rebuilt_after_http_pool_close(monkeypatch):
+    import httpx
+
+    def handler(request):
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "reuse-test",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "其他"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4},
+        })
+
+    transport = httpx.MockTransport(handler)
+
+    class _MockClient(httpx.Client):
+        def __init__(self, **kwargs):
+            super().__init__(transport=transport, **kwargs)
+
+    class _MockAsyncClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=transport, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", _MockClient)
+    monkeypatch.setattr(httpx, "AsyncClient", _MockAsyncClient)
+    monkeypatch.setattr(LLMClient, "_http_client", None)
+    monkeypatch.setattr(LLMClient, "_http_async_client", None)
+
+    client = LLMClient(api_key="sk-test", api_base="http://test/v1", model="reuse-test")
+    messages = [{"role": "user", "content": "hi"}]
+
+    # 每次 asyncio.run 使用新的事件循环，结束时关闭连接池（如 main.py、uvicorn 重载）
+    async def call_then_close():
+        pool = client.client.http_async_client
+        try:
+            return await client.achat_completion(messages), pool
+        finally:
+            await LLMClient.aclose_http_clients()
+
+    answer, first_pool = asyncio.run(call_then_close())
+    assert answer == "其他" and first_pool.is_closed
+
+    # 关闭后再调用时按新连接池重新创建 ChatOpenAI，而不是继续使用已关闭的连接池
+    answer, second_pool = asyncio.run(call_then_close())
+    assert answer == "其他" and second_pool is not first_pool
+    assert client.chat_completion(messages) == "其他"
@@ -0,0 +1,99 @@
+"""
+分类结果本地纠正测试
+"""
+import json
+
+import httpx
+import openai
+import pytest
+
+from config.settings import settings
+from tools.classify_level import ClassifyLevelTool, track_fallback
+from utils.llm_client import LLMClient
+from utils.option_resolver import OptionResolver, enum_response_format, extract_answer
+
+OPTIONS = ["费用异议咨询", "账户安全", "其他"]
+LEVEL3 = ["扣款", "取消扣款", "取消续费"]
+
+
+def test_resolve_methods():
+    resolver = OptionResolver()
+    assert resolver.resolve("【账户安全】", OPTIONS) == ("账户安全", "exact")
+    assert resolver.resolve("分类：“账户安全”。", OPTIONS) == ("账户安全", "normalized")
+    assert resolver.resolve("根据对话内容，用户在咨询费用，应归为【费用异议咨询】类", OPTIONS) == \
+        ("费用异议咨询", "bracket")
+    assert resolver.resolve("用户问的是取消扣款的问题", LEVEL3) == ("取消扣款", "substring")
+    assert resolver.resolve("费用异义咨询", OPTIONS) == ("费用异议咨询", "fuzzy")
+    assert resolver.stats() == {"exact": 1, "normalized": 1, "bracket": 1, "substring": 1, "fuzzy": 1}
+
+
+def test_ambiguous_answer_is_unresolved():
+    resolver = OptionResolver()
+    assert resolver.resolve("可能是取消扣款，也可能是取消续费", LEVEL3) == (None, "unresolved")
+    assert resolver.resolve("无法判断", OPTIONS) == (None, "unresolved")
+    resolver.record("retry")
+    assert resolver.stats() == {"unresolved": 2, "retry": 1}
+
+
+def test_constrained_output_helpers():
+    response_format = enum_response_format(OPTIONS, key="category")
+    assert response_format["json_schema"]["schema"]["properties"]["category"]["enum"] == OPTIONS
+    assert extract_answer(json.dumps({"category": "其他"}, ensure_ascii=False)) == "其他"
+    assert extract_answer("【其他】") == "【其他】"
+    assert extract_answer("{不是JSON") == "{不是JSON"
+
+
+def _bad_request(message, param=None):
+    request = httpx.Request("POST", "http://llm/v1/chat/completions")
+    return openai.BadRequestError(
+        message,
+        response=httpx.Response(400, request=request),
+        body={"message": message, "param": param, "code": None}
+    )
+
+
+class _RejectingClient:
+    """带 response_format 的请求抛出指定错误，普通请求正常返回"""
+
+    model = "fake-classifier"
+
+    def __init__(self, error):
+        self.error = error
+
+    def chat_completion(self, messages, **kwargs):
+        if "response_format" in kwargs:
+            raise self.error
+        return "其他"
+
+
+def test_constrained_mode_disabled_only_for_schema_errors(monkeypatch):
+    monkeypatch.setattr(settings, "classify_constrained_mode", "json_schema")
+    monkeypatch.setattr(LLMClient, "for_scenario", staticmethod(lambda scenario="default": None))
+
+    tool = ClassifyLevelTool()
+    tool.llm_client = _RejectingClient(_bad_request("maximum context length exceeded"))
+    with pytest.raises(openai.BadRequestError):
+        tool._complete([], OPTIONS)
+    assert tool.constrained_supported
+
+    tool.llm_client = _RejectingClient(_bad_request("unsupported parameter", param="response_format"))
+    assert tool._complete([], OPTIONS) == "其他"
+    assert not tool.constrained_supported
+
+
+class _GarbageClient:
+    model = "fake-classifier"
+
+    def chat_completion(self, messages, **kwargs):
+        return "无法判断"
+
+
+def test_fallback_is_tracked(monkeypatch):
+    monkeypatch.setattr(settings, "classify_constrained_mode", "off")
+    monkeypatch.setattr(settings, "classify_cache_enabled", False)
+    monkeypatch.setattr(LLMClient, "for_scenario", staticmethod(lambda scenario="default": _GarbageClient()))
+    tool = ClassifyLevelTool()
+    with track_fallback() as fallbacks:
+        category, _ = tool._run("客户：你好", OPTIONS)
+    assert category == OPTIONS[0]
+    assert fallbacks == [OPTIONS[0]]
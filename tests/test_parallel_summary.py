@@ -0,0 +1,97 @@
+"""
+摘要与分类并行执行测试
+"""
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from agent.orchestrator import ConversationAnalyzer
+from config.settings import settings
+from models.schemas import CategoryData, ClassificationResult, ConversationRequest
+
+
+def _analyzer(classify, summarize) -> ConversationAnalyzer:
+    """不加载分类数据和模型的分析器：清洗、预算、分类、摘要均由桩函数代替"""
+    analyzer = ConversationAnalyzer.__new__(ConversationAnalyzer)
+    analyzer._init_summary_pool()
+    analyzer.result_cache = None
+    analyzer.category_store = SimpleNamespace(categories=CategoryData())
+    analyzer._cache_key = lambda *args: "key"
+    analyzer.cleaner_tool = SimpleNamespace(_run=lambda conversation: conversation)
+    analyzer.budget_tool = SimpleNamespace(_run=lambda text, task: text)
+    analyzer.classifier = SimpleNamespace(classify=classify)
+    analyzer.summarizer = SimpleNamespace(summarize=summarize)
+    return analyzer
+
+
+def _classified(text, mode=None, full_conversation=None) -> ClassificationResult:
+    return ClassificationResult(level1="其他", level2="其他", path=["其他", "其他"])
+
+
+def _requests(count: int):
+    return [
+        ConversationRequest(conversationId=str(i), userNo="u", conversation=f"客户：问题{i}", messageNum="1")
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def _parallel(monkeypatch):
+    monkeypatch.setattr(settings, "parallel_summary", True)
+    monkeypatch.setattr(settings, "summary_long_mode", "truncate")
+
+
+def test_summary_pool_grows_to_batch_concurrency():
+    # 所有摘要必须同时进行才能通过屏障；线程池小于并发数时屏障超时，分析失败
+    concurrency = (os.cpu_count() or 1) + 4 + 2
+    barrier = threading.Barrier(concurrency, timeout=5)
+
+    def summarize(text):
+        barrier.wait()
+        return "摘要"
+
+    analyzer = _analyzer(_classified, summarize)
+    results = analyzer.analyze_many(_requests(concurrency), concurrency=concurrency)
+    assert [r.message for r in results] == ["success"] * concurrency
+    assert analyzer._summary_workers == concurrency
+
+
+def test_summary_overlaps_classification():
+    # 分类等待摘要开始、摘要等待分类开始：两者不并行时等待超时，分析失败
+    classify_started = threading.Event()
+    summary_started = threading.Event()
+
+    def classify(text, mode=None, full_conversation=None):
+        classify_started.set()
+        assert summary_started.wait(timeout=5)
+        return _classified(text)
+
+    def summarize(text):
+        summary_started.set()
+        assert classify_started.wait(timeout=5)
+        return "摘要"
+
+    response = _analyzer(classify, summarize).analyze(_requests(1)[0])
+    assert response.message == "success"
+    assert (response.category, response.summary) == ("其他-其他", "摘要")
+
+
+def test_classify_failure_fails_request_while_summary_runs():
+    summary_started = threading.Event()
+    summary_done = threading.Event()
+
+    def classify(text, mode=None, full_conversation=None):
+        assert summary_started.wait(timeout=5)
+        raise RuntimeError("模型调用失败")
+
+    def summarize(text):
+        summary_started.set()
+        summary_done.set()
+        return "摘要"
+
+    response = _analyzer(classify, summarize).analyze(_requests(1)[0])
+    assert response.message == "fail"
+    # 已开始的摘要不会被中断，在后台正常结束
+    assert summary_done.wait(timeout=5)
@@ -0,0 +1,96 @@
+"""
+近邻预分类测试
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import settings
+from models.schemas import CategoryData
+from tools.preclassify import PreClassifyTool
+from utils.neighbor_index import TfidfIndex
+
+CATEGORIES = CategoryData(
+    level1={1: {"name": "费用异议咨询", "children": {"飞享会员": {}, "利息": {}}}},
+    level2={"飞享会员": {"children": ["取消扣款", "取消续费"]}, "利息": {"children": []}},
+)
+
+SAMPLES = [
+    ("客户：飞享会员为什么扣了我的钱，帮我退掉\n客服：已为您退款29.9元", "费用异议咨询-飞享会员-取消扣款"),
+    ("客户：飞享会员扣了我29.9，我要退款\n客服：好的已为您申请退款", "费用异议咨询-飞享会员-取消扣款"),
+    ("客户：怎么又扣了飞享会员的钱，退给我\n客服：已为您办理退款", "费用异议咨询-飞享会员-取消扣款"),
+    ("客户：利息怎么这么高，能减免吗\n客服：利率是按合同计算的", "费用异议咨询-利息"),
+    ("客户：下个月不想续费飞享会员了\n客服：已为您关闭自动续费", "费用异议咨询-飞享会员-取消续费"),
+]
+
+
+def test_tfidf_index_ranks_similar_text_first():
+    index = TfidfIndex().fit([text for text, _ in SAMPLES])
+    results = index.search("飞享会员又扣钱了，给我退款", k=3)
+    assert results[0][0] in (0, 1, 2)
+    assert all(0 < score <= 1.0001 for _, score in results)
+
+
+@pytest.fixture
+def tool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "preclassify_min_similarity", 0.1)
+    monkeypatch.setattr(settings, "preclassify_min_votes", 2)
+    monkeypatch.setattr(settings, "preclassify_confidence", 0.6)
+    monkeypatch.setattr(settings, "preclassify_top_k", 3)
+    data_path = tmp_path / "verified.jsonl"
+    data_path.write_text("\n".join(
+        json.dumps({"conversation": text, "category": category}, ensure_ascii=False)
+        for text, category in SAMPLES
+    ), encoding="utf-8")
+    return PreClassifyTool(categories=CATEGORIES, data_path=str(data_path))
+
+
+def test_confident_neighbors_skip_llm(tool):
+    assert tool._run("客户：飞享会员扣了我的钱，我要退款") == ["费用异议咨询", "飞享会员", "取消扣款"]
+    assert tool._run("客户：请问怎么修改绑定的手机号") is None
+    assert tool.stats() == {"size": 5, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_disabled_without_data():
+    tool = PreClassifyTool(categories=CATEGORIES, data_path="")
+    assert not tool.enabled
+    assert tool._run("客户：飞享会员扣了我的钱") is None
+
+
+def test_load_cleans_in_process(tmp_path, monkeypatch):
+    import tools.cleaner_engine
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("加载索引时不应创建进程池")
+
+    monkeypatch.setattr(tools.cleaner_engine, "ProcessPoolExecutor", no_pool)
+    data_path = tmp_path / "verified.jsonl"
+    data_path.write_text("\n".join(
+        json.dumps({"conversation": text, "category": category}, ensure_ascii=False)
+        for text, category in SAMPLES * 100
+    ), encoding="utf-8")
+    assert PreClassifyTool(categories=CATEGORIES, data_path=str(data_path)).index.size == 500
+
+
+def test_preclassify_queries_untruncated_text():
+    from agent.classifier import ClassificationAgent
+
+    queries = []
+
+    def preclassify(conversation):
+        queries.append(conversation)
+        return ["费用异议咨询", "利息"]
+
+    agent = ClassificationAgent.__new__(ClassificationAgent)
+    agent.rule_tool = SimpleNamespace(
+        _run=lambda conversation: None, decisive=False, record_decision=lambda *args, **kwargs: None
+    )
+    agent.preclassify_tool = SimpleNamespace(_run=preclassify)
+
+    # 分类用预算截断后的文本，近邻检索用与索引样本一致的完整清洗文本
+    assert agent.classify("截断", full_conversation="完整对话").path == ["费用异议咨询", "利息"]
+    asyncio.run(agent.aclassify("截断", full_conversation="完整对话"))
+    agent.classify("完整对话")
+    assert queries == ["完整对话"] * 3
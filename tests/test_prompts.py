@@ -0,0 +1,28 @@
+"""
+提示词布局测试
+"""
+from prompts.classification import ClassificationPrompts
+from prompts.summary import SummaryPrompts
+from utils.llm_client import LLMClient
+
+
+def test_cache_layout_shares_static_prefix():
+    options = ["费用异议咨询", "其他"]
+    first = ClassificationPrompts.create_level1_messages("对话一", options)
+    second = ClassificationPrompts.create_level1_messages("对话二", options)
+    assert first[0] == second[0] and first[0]["role"] == "system"
+    assert "【费用异议咨询】" in first[0]["content"]
+    assert first[-1]["content"].endswith("对话一")
+
+    flat = ClassificationPrompts.create_flat_messages("对话", [["其他", "其他"]])
+    assert "【其他-其他】" in flat[0]["content"] and flat[-1]["content"].endswith("对话")
+
+    summary = SummaryPrompts.create_messages("对话")
+    assert summary[0]["content"] == SummaryPrompts.SYSTEM_PROMPT
+    assert summary[-1]["content"].endswith("对话")
+
+
+def test_extract_cached_tokens():
+    assert LLMClient._extract_cached_tokens({"prompt_tokens_details": {"cached_tokens": 64}}) == 64
+    assert LLMClient._extract_cached_tokens({"prompt_cache_hit_tokens": 32}) == 32
+    assert LLMClient._extract_cached_tokens({"prompt_tokens_details": None}) == 0
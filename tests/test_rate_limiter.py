@@ -0,0 +1,165 @@
+"""
+LLM 限流调度器测试
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage
+
+from config.settings import settings
+from utils.llm_client import LLMClient
+from utils.rate_limiter import AdaptiveRateLimiter, _TokenBucket, current_lane, use_lane
+
+
+def test_aimd_adjusts_limit():
+    limiter = AdaptiveRateLimiter(initial_concurrency=8, min_concurrency=2, max_concurrency=10)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+    # 同一个延迟周期内的连续 429 只减小一次
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 10
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_concurrency_is_bounded():
+    limiter = AdaptiveRateLimiter(initial_concurrency=2, max_concurrency=2)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def work():
+        limiter.acquire()
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.01)
+        with lock:
+            state["running"] -= 1
+        limiter.release(latency=0.01)
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state["peak"] == 2
+    assert limiter.stats()["admitted"] == 12
+
+
+def test_token_bucket_wait_time():
+    bucket = _TokenBucket(per_minute=600)
+    now = time.monotonic()
+    assert bucket.wait_time(600, now) == 0
+    bucket.consume(600, now)
+    assert bucket.wait_time(10, now) == pytest.approx(1.0)
+    # 超过额度的单次请求按额度上限等待，不会永久阻塞
+    assert bucket.wait_time(10000, now) == pytest.approx(60.0)
+
+
+def test_cancelled_waiter_leaves_queue():
+    limiter = AdaptiveRateLimiter(initial_concurrency=1, max_concurrency=1)
+
+    async def scenario():
+        await limiter.aacquire()
+        task = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["queued"] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.stats()["queued"] == 0
+        limiter.release(latency=0.01)
+        await asyncio.wait_for(limiter.aacquire(), timeout=1)
+
+    asyncio.run(scenario())
+
+
+def _admission_order(lane_weights, lanes):
+    """占满唯一的并发槽位后按 lanes 顺序排队，返回实际放行顺序"""
+    limiter = AdaptiveRateLimiter(initial_concurrency=1, max_concurrency=1, lane_weights=lane_weights)
+    order = []
+
+    async def call(lane):
+        await limiter.aacquire(lane=lane)
+        order.append(lane)
+        limiter.release(latency=0.01)
+
+    async def scenario():
+        await limiter.aacquire()
+        tasks = []
+        for lane in lanes:
+            tasks.append(asyncio.create_task(call(lane)))
+            await asyncio.sleep(0)
+        queued = limiter.stats()["lanes"]
+        assert queued["bulk"]["queued"] == lanes.count("bulk")
+        limiter.release(latency=0.01)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    return order
+
+
+def test_interactive_lane_jumps_ahead_of_bulk():
+    lanes = ["bulk"] * 3 + ["interactive"] * 3
+    assert _admission_order({"interactive": 10, "bulk": 0}, lanes) == ["interactive"] * 3 + ["bulk"] * 3
+
+
+def test_weighted_lanes_share_capacity():
+    order = _admission_order({"interactive": 2, "bulk": 1}, ["bulk"] * 6 + ["interactive"] * 6)
+    assert order[:3].count("interactive") == 2
+    assert order[:6].count("bulk") == 2
+
+
+def test_use_lane_context():
+    assert current_lane() == "interactive"
+    with use_lane("bulk"):
+        assert current_lane() == "bulk"
+        with use_lane("unknown"):
+            assert current_lane() == "interactive"
+        assert current_lane() == "bulk"
+    assert current_lane() == "interactive"
+
+
+class _FlakyChat:
+    """前两次返回 429，之后成功"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        if self.calls <= 2:
+            request = httpx.Request("POST", "http://test/v1/chat/completions")
+            response = httpx.Response(429, request=request, headers={"retry-after": "0"})
+            raise openai.RateLimitError("rate limited", response=response, body=None)
+        return AIMessage(content="ok", response_metadata={"token_usage": {"prompt_tokens": 3, "completion_tokens": 1}})
+
+    def invoke(self, messages):
+        return self._next()
+
+    async def ainvoke(self, messages):
+        return self._next()
+
+
+def test_llm_client_retries_on_429(monkeypatch):
+    monkeypatch.setattr(settings, "llm_backoff_base", 0.001)
+    client = LLMClient(api_key="sk-test", api_base="http://test/v1", model="rate-limit-test")
+    messages = [{"role": "user", "content": "hi"}]
+
+    client.client = _FlakyChat()
+    assert client.chat_completion(messages) == "ok"
+    client.client = _FlakyChat()
+    assert asyncio.run(client.achat_completion(messages)) == "ok"
+
+    stats = client.limiter.stats()
+    assert stats["in_flight"] == 0
+    assert stats["throttled"] == 4
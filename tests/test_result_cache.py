@@ -0,0 +1,106 @@
+"""
+结果缓存测试
+"""
+import sqlite3
+
+from utils.result_cache import ResultCache
+
+
+def _rows(db_path):
+    with sqlite3.connect(db_path) as db:
+        return db.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+
+
+def test_expired_disk_row_deleted_on_read(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResultCache(max_size=10, ttl=60, db_path=db_path)
+    cache.set("k", {"category": "其他"})
+    cache._memory.clear()
+
+    monkeypatch.setattr("utils.result_cache.time.time", lambda: 10 ** 12)
+    assert cache.get("k") is None
+    assert _rows(db_path) == 0
+
+
+def test_disk_rows_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(ResultCache, "PURGE_EVERY", 5)
+    db_path = str(tmp_path / "cache.db")
+    cache = ResultCache(max_size=10, ttl=0, db_path=db_path, db_max_rows=3)
+    for i in range(10):
+        cache.set(f"k{i}", {"category": str(i)})
+    assert _rows(db_path) == 3
+    cache._memory.clear()
+    assert cache.get("k9") == {"category": "9"}
+    assert cache.get("k0") is None
+
+
+def test_prune_category_version_keeps_other_entries(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResultCache(max_size=10, ttl=0, db_path=db_path)
+    cache.set("old", {"category": "其他"}, "v1")
+    cache.set("new", {"category": "其他"}, "v2")
+    cache.set("summary", {"summary": "摘要"})
+
+    cache.prune_category_version("v1")
+    assert cache.get("old") is None
+    cache._memory.clear()
+    assert cache.get("new") == {"category": "其他"}
+    assert cache.get("summary") == {"summary": "摘要"}
+    assert _rows(db_path) == 2
+
+
+def test_legacy_db_gains_category_version(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    with sqlite3.connect(db_path) as db:
+        db.execute("CREATE TABLE result_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+        db.execute("INSERT INTO result_cache VALUES ('k', '{\"category\": \"其他\"}', 1e12)")
+
+    cache = ResultCache(max_size=10, ttl=0, db_path=db_path)
+    cache.prune_category_version("v1")
+    assert cache.get("k") == {"category": "其他"}
+
+
+def test_category_reload_reuses_cached_summary(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from agent.orchestrator import ConversationAnalyzer
+    from config.settings import settings
+    from models.schemas import CategoryData, ClassificationResult, ConversationRequest
+
+    monkeypatch.setattr(settings, "parallel_summary", False)
+    calls = {"classify": 0, "summarize": 0}
+
+    def classify(text, mode=None, full_conversation=None):
+        calls["classify"] += 1
+        return ClassificationResult(level1="其他", level2="其他", path=["其他", "其他"])
+
+    def summarize(text):
+        calls["summarize"] += 1
+        return "摘要"
+
+    # 不加载分类数据和模型的分析器：清洗、预算、分类、摘要均由桩函数代替，结果缓存使用真实实现
+    model = SimpleNamespace(llm_client=SimpleNamespace(model="fake-model"))
+    analyzer = ConversationAnalyzer.__new__(ConversationAnalyzer)
+    analyzer._init_summary_pool()
+    analyzer.result_cache = ResultCache(max_size=10, ttl=0, db_path=str(tmp_path / "cache.db"))
+    analyzer.category_store = SimpleNamespace(categories=CategoryData(version="v1"))
+    analyzer.cleaner_tool = SimpleNamespace(_run=lambda conversation: conversation)
+    analyzer.budget_tool = SimpleNamespace(_run=lambda text, task: text, budget_for=lambda task: 0)
+    analyzer.classifier = SimpleNamespace(
+        classify=classify, resolve_mode=lambda mode=None: "hierarchical", classify_tool=model,
+        preclassify_tool=SimpleNamespace(version=""), set_categories=lambda categories: None
+    )
+    analyzer.summarizer = SimpleNamespace(summarize=summarize, summarize_tool=model)
+    request = ConversationRequest(conversationId="1", userNo="u", conversation="客户：我想退会员", messageNum="1")
+
+    assert analyzer.analyze(request).summary == "摘要"
+    analyzer.analyze(request)
+    assert calls == {"classify": 1, "summarize": 1}
+
+    # 分类树更新后旧版本的分类结果被删除，分类重新执行，摘要仍从缓存读取
+    old, new = analyzer.category_store.categories, CategoryData(version="v2")
+    analyzer.category_store.categories = new
+    analyzer._on_categories_swapped(old, new)
+    response = analyzer.analyze(request)
+    assert (response.message, response.summary) == ("success", "摘要")
+    assert calls == {"classify": 2, "summarize": 1}
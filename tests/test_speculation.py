@@ -0,0 +1,98 @@
+"""
+投机执行二级分类测试
+"""
+import asyncio
+import re
+
+from config.settings import settings
+from agent.classifier import ClassificationAgent
+from models.schemas import CategoryData
+from utils.llm_client import LLMClient
+from utils.speculation import BranchPredictor
+
+CATEGORIES = CategoryData(
+    level1={
+        1: {"name": "费用异议咨询", "children": {"飞享会员": [], "利息": []}},
+        2: {"name": "账户管理", "children": {"注销账号": [], "修改手机号": []}},
+    },
+    level2={
+        "飞享会员": {"parent": "费用异议咨询", "children": ["取消扣款", "取消续费"]},
+        "利息": {"parent": "费用异议咨询", "children": []},
+        "注销账号": {"parent": "账户管理", "children": []},
+        "修改手机号": {"parent": "账户管理", "children": []},
+    },
+)
+CONVERSATION = "客户：飞享会员扣了我的钱，我要退款"
+
+
+class _FakeClient:
+    """一级分类较慢；每级都选择第一个选项（一级固定选费用异议咨询）"""
+
+    model = "fake-classifier"
+
+    def __init__(self):
+        self.events = []
+
+    def count_tokens(self, text):
+        return len(text)
+
+    async def achat_completion(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        block = prompt.split("可选的", 1)[1].split("\n\n", 1)[0]
+        options = re.findall(r"^【([^】]+)】", block, re.M)
+        self.events.append(("start", options[0]))
+        if "费用异议咨询" in options:
+            await asyncio.sleep(0.05)
+            answer = "费用异议咨询"
+        else:
+            answer = options[0]
+        self.events.append(("end", answer))
+        return answer
+
+
+def _agent(monkeypatch, enabled: bool):
+    monkeypatch.setattr(settings, "speculative_level2", enabled)
+    monkeypatch.setattr(settings, "speculative_branches", 2)
+    monkeypatch.setattr(settings, "classify_cache_enabled", False)
+    monkeypatch.setattr(settings, "prompt_cache_layout", False)
+    # 先替换客户端工厂，构造分类工具时不创建真实的 LLM 客户端
+    monkeypatch.setattr(LLMClient, "for_scenario", staticmethod(lambda scenario="default": _FakeClient()))
+    return ClassificationAgent(CATEGORIES)
+
+
+def test_branch_predictor_ranks_overlap_and_priors():
+    predictor = BranchPredictor()
+    branches = {"费用异议咨询": "费用异议咨询 飞享会员 利息", "账户管理": "账户管理 注销账号 修改手机号"}
+    assert predictor.rank(CONVERSATION, branches, 1) == ["费用异议咨询"]
+    for _ in range(3):
+        predictor.observe("账户管理")
+    assert predictor.rank("客户：你好", branches, 1) == ["账户管理"]
+
+
+def test_speculation_matches_sequential_result(monkeypatch):
+    sequential = _agent(monkeypatch, enabled=False)
+    expected = asyncio.run(sequential._aclassify_hierarchical(CONVERSATION))
+
+    agent = _agent(monkeypatch, enabled=True)
+    result = asyncio.run(agent._aclassify_hierarchical(CONVERSATION))
+    assert result.path == expected.path == ["费用异议咨询", "飞享会员", "取消扣款"]
+
+    # 二级分类在一级分类返回之前就已发起
+    events = agent.classify_tool.llm_client.events
+    assert events.index(("start", "飞享会员")) < events.index(("end", "费用异议咨询"))
+    stats = agent.branch_predictor.stats()
+    assert stats["speculated"] == 1 and stats["hits"] == 1 and stats["hit_rate"] == 1.0
+    assert stats["speculative_calls"] == 2 and stats["wasted_calls"] == 1
+
+
+def test_speculation_skips_bulk_lane(monkeypatch):
+    from utils.rate_limiter import use_lane
+
+    agent = _agent(monkeypatch, enabled=True)
+
+    async def run():
+        with use_lane("bulk"):
+            return await agent._aclassify_hierarchical(CONVERSATION)
+
+    assert asyncio.run(run()).path == ["费用异议咨询", "飞享会员", "取消扣款"]
+    assert "speculated" not in agent.branch_predictor.stats()
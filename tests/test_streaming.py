@@ -0,0 +1,70 @@
+"""
+流式摘要测试
+"""
+import asyncio
+
+from langchain_core.messages import AIMessageChunk
+
+from utils.llm_client import LLMClient
+
+
+class _StreamingChat:
+    """逐段返回文本，最后一个片段携带 usage"""
+
+    async def astream(self, messages, **kwargs):
+        assert kwargs.get("stream_usage") is True
+        for text in ("【沟通内容】", "退会员", ""):
+            yield AIMessageChunk(content=text)
+        yield AIMessageChunk(
+            content="",
+            usage_metadata={
+                "input_tokens": 30,
+                "output_tokens": 6,
+                "total_tokens": 36,
+                "input_token_details": {"cache_read": 16},
+            },
+        )
+
+
+def test_astream_completion_yields_chunks_and_tracks_usage():
+    client = LLMClient(api_key="sk-test", api_base="http://test/v1", model="stream-test")
+    client.client = _StreamingChat()
+
+    async def collect():
+        with LLMClient.track_usage() as usage:
+            chunks = [chunk async for chunk in client.astream_completion([{"role": "user", "content": "hi"}])]
+        return chunks, usage
+
+    chunks, usage = asyncio.run(collect())
+    assert chunks == ["【沟通内容】", "退会员"]
+    assert usage == {
+        "request_count": 1,
+        "input_tokens": 30,
+        "completion_tokens": 6,
+        "cached_tokens": 16,
+        "total_tokens": 36,
+        "truncated": 0,
+    }
+    assert client.limiter.stats()["in_flight"] == 0
+
+
+def test_stream_endpoint_formats_sse(monkeypatch):
+    from fastapi.testclient import TestClient
+    import run_fastapi
+
+    class _Analyzer:
+        async def astream_analyze(self, request):
+            yield "category", {"category": "费用异议咨询-飞享会员-取消扣款"}
+            yield "summary", {"delta": "退款"}
+            yield "done", {"conversationId": request.conversationId, "message": "success"}
+
+    monkeypatch.setattr(run_fastapi, "analyzer", _Analyzer())
+    response = TestClient(run_fastapi.app).post("/ai/analyze/stream", json={
+        "conversationId": "1", "userNo": "u", "conversation": "对话", "messageNum": "1"
+    })
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.split("\n\n")[:3] == [
+        'event: category\ndata: {"category": "费用异议咨询-飞享会员-取消扣款"}',
+        'event: summary\ndata: {"delta": "退款"}',
+        'event: done\ndata: {"conversationId": "1", "message": "success"}',
+    ]
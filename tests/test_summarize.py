@@ -0,0 +1,86 @@
+"""
+长对话分段摘要测试
+"""
+import asyncio
+
+from config.settings import settings
+from tools.summarize import SummarizeTool
+from utils.llm_client import LLMClient
+
+
+class _FakeClient:
+    """记录收到的提示词，分段请求返回段号，汇总请求返回固定摘要"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def count_tokens(self, text):
+        return len(text)
+
+    def _reply(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append((prompt, kwargs.get("max_tokens")))
+        if prompt.startswith("以下是一段较长客服对话的第"):
+            return "要点" + prompt[len("以下是一段较长客服对话的第"):].split("部分")[0]
+        return "【沟通内容】退会员"
+
+    def chat_completion(self, messages, **kwargs):
+        return self._reply(messages, **kwargs)
+
+    async def achat_completion(self, messages, **kwargs):
+        return self._reply(messages, **kwargs)
+
+
+def _tool(monkeypatch):
+    monkeypatch.setattr(settings, "summary_long_mode", "map_reduce")
+    monkeypatch.setattr(settings, "summary_input_budget", 100)
+    monkeypatch.setattr(settings, "summary_chunk_tokens", 60)
+    monkeypatch.setattr(settings, "summary_chunk_max_tokens", 128)
+    # 先替换客户端工厂，构造工具时不创建真实的 LLM 客户端
+    monkeypatch.setattr(LLMClient, "for_scenario", staticmethod(lambda scenario="default": _FakeClient()))
+    return SummarizeTool()
+
+
+def test_short_conversation_uses_single_call(monkeypatch):
+    tool = _tool(monkeypatch)
+    assert tool._run("客户：我想退会员") == "【沟通内容】退会员"
+    assert len(tool.llm_client.prompts) == 1
+
+
+def test_long_conversation_map_reduce(monkeypatch):
+    tool = _tool(monkeypatch)
+    lines = [f"客户：第{i:02d}轮问题，我想退飞享会员" for i in range(12)]
+    conversation = "\n".join(lines)
+
+    chunks = tool._split_chunks(conversation)
+    assert len(chunks) > 1
+    assert "\n".join(chunks) == conversation
+    assert all(len(chunk) <= 60 or "\n" not in chunk for chunk in chunks)
+
+    assert asyncio.run(tool._arun(conversation)) == "【沟通内容】退会员"
+    assert tool._run(conversation) == "【沟通内容】退会员"
+
+    prompts = tool.llm_client.prompts
+    map_calls = [max_tokens for prompt, max_tokens in prompts if prompt.startswith("以下是一段较长")]
+    assert map_calls == [128] * (2 * len(chunks))
+    reduce_prompt = prompts[-1][0]
+    assert f"第1部分:\n要点1/{len(chunks)}" in reduce_prompt
+    assert "【方案详情】" in reduce_prompt
+
+
+def test_overlong_line_is_split(monkeypatch):
+    tool = _tool(monkeypatch)
+    long_line = "客户：" + "".join(f"第{i:03d}句" for i in range(40))
+    conversation = "\n".join(["客户：你好", long_line, "客服：好的"])
+
+    chunks = tool._split_chunks(conversation)
+    # 单轮超出分段预算时切开，每段都不超过预算，内容不丢失
+    assert all(len(chunk) + 1 <= 60 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == conversation.replace("\n", "")
+
+
+def test_long_mode_defaults_to_truncate(monkeypatch):
+    from config.settings import Settings
+
+    monkeypatch.delenv("SUMMARY_LONG_MODE", raising=False)
+    assert Settings().summary_long_mode == "truncate"
@@ -1,12 +1,20 @@
 """工具模块"""
 from .conversation_cleaner import ConversationCleanerTool
+from .conversation_budget import ConversationBudgetTool
 from .category_loader import CategoryLoaderTool
 from .classify_level import ClassifyLevelTool
+from .classify_path import ClassifyPathTool
+from .preclassify import PreClassifyTool
+from .rule_classify import RuleClassifyTool
 from .summarize import SummarizeTool
 
 __all__ = [
     'ConversationCleanerTool',
+    'ConversationBudgetTool',
     'CategoryLoaderTool',
     'ClassifyLevelTool',
+    'ClassifyPathTool',
+    'PreClassifyTool',
+    'RuleClassifyTool',
     'SummarizeTool'
 ]
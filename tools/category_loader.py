@@ -1,11 +1,17 @@
 """
 分类数据加载工具
+解析结果保存为快照（见 utils/category_snapshot.py），分类文件未变化时直接加载快照，不导入 pandas。
+构建镜像时可预先生成快照：python -m tools.category_loader
 """
-import pandas as pd
+import hashlib
+import io
 from pathlib import Path
 from langchain.tools import BaseTool
 from pydantic import BaseModel
 from models.schemas import CategoryData
+from prompts.classification import ClassificationPrompts
+from utils.category_rules import CategoryRules
+from utils.category_snapshot import load_snapshot, save_snapshot, snapshot_key, snapshot_path
 from config.settings import settings
 from loguru import logger
 
@@ -16,62 +22,103 @@ class CategoryLoaderTool(BaseTool):
     description: str = "加载三级分类数据"
 
     def _run(self) -> CategoryData:
-        """加载分类数据"""
+        """加载分类数据（分类文件未变化时使用快照）"""
         try:
             csv_path = Path(settings.category_csv_path)
             logger.info(f"正在读取分类文件: {csv_path}")
+            content = csv_path.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()
 
-            df = pd.read_csv(csv_path)
-            df = df[df['id'].astype(str).str.isnumeric()]
+            path = snapshot_path(csv_path)
+            key = snapshot_key(digest, ClassificationPrompts.VERSION)
+            if path is not None:
+                categories = load_snapshot(path, key)
+                if categories is not None:
+                    logger.success(f"分类数据从快照加载完成 - 版本: {categories.version}")
+                    return categories
 
-            df['id'] = df['id'].astype(int)
-            df['parent_id'] = df['parent_id'].astype(int)
-            df['level'] = df['level'].astype(int)
+            categories = self._parse(content, digest[:12])
+            if path is not None:
+                save_snapshot(path, key, categories)
 
-            categories = CategoryData()
+            logger.success(f"分类数据加载完成 - 版本: {categories.version}")
+            return categories
+
+        except Exception as e:
+            logger.error(f"加载分类数据失败: {str(e)}")
+            raise
+
+    @staticmethod
+    def _parse(content: bytes, version: str) -> CategoryData:
+        """用 pandas 解析分类文件，构建分类树、预渲染选项块并编译规则"""
+        import pandas as pd
+
+        df = pd.read_csv(io.BytesIO(content))
+        df = df[df['id'].astype(str).str.isnumeric()]
+
+        df['id'] = df['id'].astype(int)
+        df['parent_id'] = df['parent_id'].astype(int)
+        df['level'] = df['level'].astype(int)
+
+        categories = CategoryData(version=version)
+
+        # 可选的规则列：keywords（多个用 | 分隔）、regex
+        rule_rows = []
 
-            # 构建分类树
-            for _, row in df.iterrows():
-                cat_id = row['id']
-                name = row['name']
-                parent_id = row['parent_id']
-                level = row['level']
-                description = row.get('description', '')
-                example = row.get('example', '')
+        # 构建分类树：按级别稳定排序后单次遍历，父节点通过 id 索引 O(1) 定位
+        df = df.sort_values('level', kind='stable')
+        for row in df.to_dict('records'):
+            cat_id = row['id']
+            name = row['name']
+            parent_id = row['parent_id']
+            level = row['level']
+            description = row.get('description', '')
+            example = row.get('example', '')
 
-                if level == 1:
-                    categories.level1[cat_id] = {
-                        'name': name,
+            categories.nodes[cat_id] = {'name': name, 'parent_id': parent_id, 'level': level}
+            keywords, regex = row.get('keywords'), row.get('regex')
+            if isinstance(keywords, str) or isinstance(regex, str):
+                rule_rows.append((
+                    cat_id,
+                    keywords if isinstance(keywords, str) else "",
+                    regex if isinstance(regex, str) else ""
+                ))
+
+            if level == 1:
+                categories.level1[cat_id] = {
+                    'name': name,
+                    'description': description,
+                    'example': example,
+                    'children': {}
+                }
+                categories.level1_ids.setdefault(name, cat_id)
+            elif level == 2:
+                l1_info = categories.level1.get(parent_id)
+                if l1_info is not None:
+                    l1_info['children'][name] = []
+                    categories.level2[name] = {
+                        'parent': l1_info['name'],
                         'description': description,
                         'example': example,
-                        'children': {}
+                        'children': []
+                    }
+            elif level == 3:
+                parent = categories.nodes.get(parent_id)
+                if parent and parent['level'] == 2 and parent['name'] in categories.level2:
+                    l2_name = parent['name']
+                    categories.level2[l2_name]['children'].append(name)
+                    categories.level3[name] = {
+                        'parent': l2_name,
+                        'description': description,
+                        'example': example
                     }
-                elif level == 2:
-                    for l1_id, l1_info in categories.level1.items():
-                        if parent_id == l1_id:
-                            l1_info['children'][name] = []
-                            categories.level2[name] = {
-                                'parent': l1_info['name'],
-                                'description': description,
-                                'example': example,
-                                'children': []
-                            }
-                            break
-                elif level == 3:
-                    for l2_name, l2_info in categories.level2.items():
-                        parent_row = df[df['name'] == l2_name]
-                        if not parent_row.empty and parent_row['id'].iloc[0] == parent_id:
-                            categories.level2[l2_name]['children'].append(name)
-                            categories.level3[name] = {
-                                'parent': l2_name,
-                                'description': description,
-                                'example': example
-                            }
-                            break
-
-            logger.success(f"分类数据加载完成")
-            return categories
 
-        except Exception as e:
-            logger.error(f"加载分类数据失败: {str(e)}")
-            raise
+        ClassificationPrompts.compile_option_blocks(categories)
+        categories.rules = CategoryRules.compile(categories, rule_rows)
+        categories.path_index()
+        return categories
+
+
+if __name__ == "__main__":
+    # 预先生成分类快照（构建镜像时执行，服务启动时无需解析 CSV）
+    CategoryLoaderTool()._run()
@@ -1,15 +1,37 @@
 """
 单级分类工具
 """
-from typing import List, Optional, Dict
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Dict, Set
+import openai
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 from utils.llm_client import LLMClient
 from prompts.classification import ClassificationPrompts
 from models.schemas import CategoryData
 from config.settings import settings
+from utils.cache_key import make_key
+from utils.decision_cache import LevelDecisionCache
+from utils.option_resolver import OptionResolver, enum_response_format, extract_answer
+from utils.category_store import pinned_categories
 from loguru import logger
 
+# 当前分类过程中使用兜底选项的记录（由 track_fallback 设置，子任务共享同一个列表）
+_fallbacks: ContextVar[Optional[List[str]]] = ContextVar("classify_fallbacks", default=None)
+
+
+@contextmanager
+def track_fallback() -> Iterator[List[str]]:
+    """记录上下文内（含其创建的子任务）重试耗尽后使用兜底选项的分类，用于判断结果能否缓存"""
+    fallbacks: List[str] = []
+    token = _fallbacks.set(fallbacks)
+    try:
+        yield fallbacks
+    finally:
+        _fallbacks.reset(token)
+
 
 class ClassifyLevelInput(BaseModel):
     """分类输入"""
@@ -28,12 +50,29 @@ class ClassifyLevelTool(BaseTool):
 
     llm_client: LLMClient = None
     categories: Optional[CategoryData] = None
+    decision_cache: Optional[LevelDecisionCache] = None
+    resolver: Optional[OptionResolver] = None
+    constrained_supported: bool = True
 
     def __init__(self, categories: Optional[CategoryData] = None, **kwargs):
         super().__init__(**kwargs)
         # 初始化LLM客户端（使用分类场景配置）
         self.llm_client = LLMClient.for_scenario("classification")
         self.categories = categories
+        self.resolver = OptionResolver(fuzzy_threshold=settings.classify_fuzzy_threshold)
+        if settings.classify_cache_enabled:
+            self.decision_cache = LevelDecisionCache(max_size=settings.classify_cache_max_size)
+
+    @property
+    def active_categories(self) -> Optional[CategoryData]:
+        """当前请求固定的分类树（未固定时使用最新加载的分类树）"""
+        return pinned_categories(self.categories)
+
+    def set_categories(self, categories: CategoryData) -> None:
+        """切换分类数据，并使选项已变化的决策缓存失效"""
+        self.categories = categories
+        if self.decision_cache is not None:
+            self.decision_cache.retain_fingerprints(self._tree_fingerprints())
 
     def _run(
         self,
@@ -55,53 +94,257 @@ class ClassifyLevelTool(BaseTool):
 
         available_set = set(available_categories)
 
-        for attempt in range(max_retries):
-            # 生成提示词（传入categories对象）
-            prompt = ClassificationPrompts.create_prompt(
-                conversation=conversation,
-                available_categories=available_categories,
-                current_path=current_path,
-                level=level,
-                categories=self.categories
+        # 先查决策缓存（相同对话、路径和选项下的决策可直接复用）
+        cache_key, fingerprint = self._decision_key(conversation, available_categories, current_path, level)
+        cached = self._get_cached_decision(cache_key, available_set)
+        if cached is not None:
+            messages = self._build_messages(
+                conversation, available_categories, current_path, level, chat_history
             )
+            return self._finish(messages, cached)
 
-            # 构建消息列表：对话历史 + 当前提示
-            messages = chat_history.copy()
-            messages.append({"role": "user", "content": prompt})
+        for attempt in range(max_retries):
+            messages = self._build_messages(
+                conversation, available_categories, current_path, level, chat_history
+            )
 
             # 调用LLM
-            result = self.llm_client.chat_completion(
-                messages=messages,
-                max_tokens=8192  # 默认最大token数
+            result = self._complete(messages, available_categories)
+
+            # 先在本地纠正（归一化、【】提取、子串、模糊匹配），无法确定时才重试
+            category = self._resolve(result, available_categories)
+            if category is not None:
+                if self.decision_cache is not None:
+                    self.decision_cache.set(cache_key, fingerprint, category)
+                return self._finish(messages, category)
+
+            self._log_retry(result, attempt, max_retries)
+
+        return self._fallback(messages, available_categories)
+
+    async def _arun(
+        self,
+        conversation: str,
+        available_categories: List[str],
+        current_path: List[str] = None,
+        level: int = 1,
+        chat_history: List[Dict] = None
+    ) -> tuple[str, List[Dict]]:
+        """
+        异步执行单级分类（与 _run 逻辑一致）
+
+        Returns:
+            (分类结果, 更新后的对话历史)
+        """
+        current_path = current_path or []
+        chat_history = chat_history or []
+        max_retries = 3  # 默认重试3次
+
+        available_set = set(available_categories)
+
+        # 先查决策缓存（相同对话、路径和选项下的决策可直接复用）
+        cache_key, fingerprint = self._decision_key(conversation, available_categories, current_path, level)
+        cached = self._get_cached_decision(cache_key, available_set)
+        if cached is not None:
+            messages = self._build_messages(
+                conversation, available_categories, current_path, level, chat_history
             )
+            return self._finish(messages, cached)
 
-            category = result.strip()
-            logger.info(f"分类结果: {category}")
+        for attempt in range(max_retries):
+            messages = self._build_messages(
+                conversation, available_categories, current_path, level, chat_history
+            )
+
+            # 异步调用LLM
+            result = await self._acomplete(messages, available_categories)
+
+            # 先在本地纠正（归一化、【】提取、子串、模糊匹配），无法确定时才重试
+            category = self._resolve(result, available_categories)
+            if category is not None:
+                if self.decision_cache is not None:
+                    self.decision_cache.set(cache_key, fingerprint, category)
+                return self._finish(messages, category)
+
+            self._log_retry(result, attempt, max_retries)
+
+        return self._fallback(messages, available_categories)
+
+    def _decision_key(
+        self,
+        conversation: str,
+        available_categories: List[str],
+        current_path: List[str],
+        level: int
+    ) -> tuple[str, str]:
+        """计算决策缓存键和选项指纹"""
+        fingerprint = self._options_fingerprint(level, available_categories, self.active_categories)
+        key = make_key(
+            conversation,
+            " > ".join(current_path),
+            level,
+            fingerprint,
+            self.llm_client.model,
+            ClassificationPrompts.VERSION,
+            settings.prompt_cache_layout
+        )
+        return key, fingerprint
+
+    def _get_cached_decision(self, cache_key: str, available_set: Set[str]) -> Optional[str]:
+        """查询决策缓存"""
+        if self.decision_cache is None:
+            return None
+        cached = self.decision_cache.get(cache_key)
+        if cached is not None and cached in available_set:
+            logger.info(f"分类决策缓存命中: {cached}")
+            return cached
+        return None
 
-            # 清理【】符号（模型可能输出带括号的结果）
-            category_cleaned = category.strip('【】')
+    @staticmethod
+    def _options_fingerprint(
+        level: int,
+        available_categories: List[str],
+        categories: Optional[CategoryData]
+    ) -> str:
+        """根据该级选项的渲染内容计算指纹（名称、说明、示例任一变化都会改变指纹）"""
+        options_str = ClassificationPrompts.build_categories_str(
+            available_categories, level, categories
+        )
+        return hashlib.sha256(f"{level}\x00{options_str}".encode("utf-8")).hexdigest()
 
-            # 验证结果
-            if category_cleaned in available_set:
-                # 更新对话历史
-                updated_history = messages.copy()
-                updated_history.append({"role": "assistant", "content": category_cleaned})
-                return category_cleaned, updated_history
+    def _tree_fingerprints(self) -> Set[str]:
+        """当前分类树下所有 (级别, 父节点) 选项的指纹"""
+        categories = self.categories
+        if not categories:
+            return set()
+        level1_info = list(categories.level1.values())
+        fingerprints = {self._options_fingerprint(1, [info['name'] for info in level1_info], categories)}
+        for info in level1_info:
+            fingerprints.add(self._options_fingerprint(2, list(info['children'].keys()), categories))
+        for l2_name in categories.level3_parents:
+            if l2_name in categories.level2:
+                fingerprints.add(
+                    self._options_fingerprint(3, categories.level2[l2_name]['children'], categories)
+                )
+        return fingerprints
 
-            logger.warning(
-                f"分类结果 '{category}' 不在可选项中，"
-                f"正在重试 ({attempt + 1}/{max_retries})"
+    def _build_messages(
+        self,
+        conversation: str,
+        available_categories: List[str],
+        current_path: List[str],
+        level: int,
+        chat_history: List[Dict]
+    ) -> List[Dict]:
+        """构建消息列表：对话历史 + 当前提示"""
+        if level == 1 and not chat_history and settings.prompt_cache_layout:
+            # 前缀缓存布局：固定 system 消息 + 对话内容
+            return ClassificationPrompts.create_level1_messages(
+                conversation, available_categories, self.active_categories
             )
 
-        # 多次重试后使用默认值
+        # 生成提示词（传入categories对象）
+        prompt = ClassificationPrompts.create_prompt(
+            conversation=conversation,
+            available_categories=available_categories,
+            current_path=current_path,
+            level=level,
+            categories=self.active_categories
+        )
+
+        messages = chat_history.copy()
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _constrained_kwargs(self, available_categories: List[str]) -> Dict:
+        """约束输出模式下的调用参数（枚举 JSON Schema）"""
+        if settings.classify_constrained_mode != "json_schema" or not self.constrained_supported:
+            return {}
+        self.resolver.record("constrained")
+        return {"response_format": enum_response_format(available_categories)}
+
+    @staticmethod
+    def _rejects_constrained(error: openai.BadRequestError) -> bool:
+        """400 错误是否因后端不支持 response_format / json_schema（上下文超长、内容审核等其他错误不算）"""
+        fields = [getattr(error, "param", None), getattr(error, "code", None), str(error)]
+        text = " ".join(str(field) for field in fields if field).lower()
+        return any(marker in text for marker in ("response_format", "json_schema", "json schema"))
+
+    def _disable_constrained(self, error: Exception) -> None:
+        """后端不支持约束输出时关闭该模式，后续调用使用普通输出"""
+        self.constrained_supported = False
+        logger.warning(f"后端不支持约束输出（{error}），已切换为普通输出")
+
+    def _complete(self, messages: List[Dict], available_categories: List[str]) -> str:
+        """调用LLM（按配置使用约束输出）"""
+        params = LLMClient.generation_params("classification")
+        kwargs = self._constrained_kwargs(available_categories)
+        try:
+            return self.llm_client.chat_completion(messages=messages, **params, **kwargs)
+        except openai.BadRequestError as e:
+            if not kwargs or not self._rejects_constrained(e):
+                raise
+            self._disable_constrained(e)
+            return self.llm_client.chat_completion(messages=messages, **params)
+
+    async def _acomplete(self, messages: List[Dict], available_categories: List[str]) -> str:
+        """异步调用LLM（按配置使用约束输出）"""
+        params = LLMClient.generation_params("classification")
+        kwargs = self._constrained_kwargs(available_categories)
+        try:
+            return await self.llm_client.achat_completion(messages=messages, **params, **kwargs)
+        except openai.BadRequestError as e:
+            if not kwargs or not self._rejects_constrained(e):
+                raise
+            self._disable_constrained(e)
+            return await self.llm_client.achat_completion(messages=messages, **params)
+
+    def _resolve(self, result: str, available_categories: List[str]) -> Optional[str]:
+        """解析模型输出并映射到可选项，无法唯一确定时返回 None"""
+        answer = extract_answer(result)
+        logger.info(f"分类结果: {answer.strip()}")
+        category, method = self.resolver.resolve(answer, available_categories)
+        if category is not None and method != "exact":
+            logger.info(f"分类结果 '{answer.strip()}' 本地纠正为 '{category}'（{method}）")
+        return category
+
+    def _log_retry(self, result: str, attempt: int, max_retries: int) -> None:
+        """记录无效输出（还有重试次数时计入 retry）"""
+        if attempt + 1 < max_retries:
+            self.resolver.record("retry")
+        logger.warning(
+            f"分类结果 '{result.strip()}' 不在可选项中，"
+            f"正在重试 ({attempt + 1}/{max_retries})"
+        )
+
+    def history_after(
+        self,
+        conversation: str,
+        available_categories: List[str],
+        current_path: List[str],
+        level: int,
+        chat_history: List[Dict],
+        category: str
+    ) -> List[Dict]:
+        """假设本级分类结果为 category 时 _run 返回的对话历史（用于提前发起下一级分类）"""
+        messages = self._build_messages(conversation, available_categories, current_path, level, chat_history)
+        return self._finish(messages, category)[1]
+
+    @staticmethod
+    def _finish(messages: List[Dict], category: str) -> tuple[str, List[Dict]]:
+        """返回分类结果并更新对话历史"""
+        updated_history = messages.copy()
+        updated_history.append({"role": "assistant", "content": category})
+        return category, updated_history
+
+    def _fallback(self, messages: List[Dict], available_categories: List[str]) -> tuple[str, List[Dict]]:
+        """多次重试后使用默认值"""
         logger.warning(f"多次重试后仍未得到有效分类，使用第一个选项")
+        self.resolver.record("fallback")
         fallback = available_categories[0]
+        fallbacks = _fallbacks.get()
+        if fallbacks is not None:
+            fallbacks.append(fallback)
 
         # 即使是fallback也要更新历史
-        updated_history = messages.copy()
-        updated_history.append({"role": "assistant", "content": fallback})
-        return fallback, updated_history
-
-    async def _arun(self, *args, **kwargs):
-        """异步运行（暂不实现）"""
-        raise NotImplementedError("异步模式暂未实现")
+        return self._finish(messages, fallback)
@@ -0,0 +1,143 @@
+"""
+单次路径分类工具
+一次LLM调用直接选择完整的 一级-二级-三级 路径
+"""
+from typing import List, Optional, Dict
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+from utils.llm_client import LLMClient
+from prompts.classification import ClassificationPrompts
+from models.schemas import CategoryData
+from config.settings import settings
+from utils.option_resolver import OptionResolver, extract_answer
+from utils.category_store import pinned_categories
+from loguru import logger
+
+# 最多调用次数：首次 + 一次带纠正提示的重试，仍无效时回退到分层分类
+MAX_ATTEMPTS = 2
+
+
+class ClassifyPathInput(BaseModel):
+    """路径分类输入"""
+    conversation: str = Field(description="清洗后的对话内容")
+
+
+class ClassifyPathTool(BaseTool):
+    """单次路径分类工具"""
+    name: str = "classify_path"
+    description: str = "一次选择完整的分类路径"
+    args_schema: type[BaseModel] = ClassifyPathInput
+
+    llm_client: LLMClient = None
+    categories: Optional[CategoryData] = None
+    resolver: Optional[OptionResolver] = None
+
+    def __init__(self, categories: Optional[CategoryData] = None, **kwargs):
+        super().__init__(**kwargs)
+        # 初始化LLM客户端（使用分类场景配置）
+        self.llm_client = LLMClient.for_scenario("classification")
+        self.resolver = OptionResolver(fuzzy_threshold=settings.classify_fuzzy_threshold)
+        if categories is not None:
+            self.set_categories(categories)
+
+    @property
+    def active_categories(self) -> CategoryData:
+        """当前请求固定的分类树（未固定时使用最新加载的分类树）"""
+        return pinned_categories(self.categories)
+
+    @property
+    def valid_paths(self) -> Dict[str, List[str]]:
+        """路径字符串 -> 路径列表（用于校验模型输出）"""
+        return self.active_categories.path_index()
+
+    def set_categories(self, categories: CategoryData) -> None:
+        """切换分类数据（合法路径索引随分类数据一起建立）"""
+        self.categories = categories
+        logger.debug(f"合法分类路径数: {len(categories.path_index())}")
+
+    def _run(self, conversation: str) -> Optional[List[str]]:
+        """
+        执行单次路径分类
+
+        Returns:
+            分类路径，重试后仍无效时返回 None（由调用方回退到分层分类）
+        """
+        messages = self._build_messages(conversation)
+
+        for attempt in range(MAX_ATTEMPTS):
+            result = self.llm_client.chat_completion(
+                messages=messages,
+                **LLMClient.generation_params("classification")
+            )
+            path = self._parse_result(result)
+            if path is not None:
+                return path
+            messages = self._retry_messages(messages, result, attempt)
+
+        self.resolver.record("fallback")
+        return None
+
+    async def _arun(self, conversation: str) -> Optional[List[str]]:
+        """
+        异步执行单次路径分类
+
+        Returns:
+            分类路径，重试后仍无效时返回 None（由调用方回退到分层分类）
+        """
+        messages = self._build_messages(conversation)
+
+        for attempt in range(MAX_ATTEMPTS):
+            result = await self.llm_client.achat_completion(
+                messages=messages,
+                **LLMClient.generation_params("classification")
+            )
+            path = self._parse_result(result)
+            if path is not None:
+                return path
+            messages = self._retry_messages(messages, result, attempt)
+
+        self.resolver.record("fallback")
+        return None
+
+    def _retry_messages(self, messages: List[Dict], result: str, attempt: int) -> List[Dict]:
+        """
+        记录无效输出，并在消息后追加模型的回答和纠正提示
+        （原样重发相同消息时，temperature 为 0 的模型会给出相同的无效回答）
+        """
+        if attempt + 1 < MAX_ATTEMPTS:
+            self.resolver.record("retry")
+        logger.warning(
+            f"分类路径 '{result.strip()}' 不在可选项中，"
+            f"正在重试 ({attempt + 1}/{MAX_ATTEMPTS})"
+        )
+        return messages + [
+            {"role": "assistant", "content": result},
+            {"role": "user", "content": ClassificationPrompts.flat_retry_prompt(result)}
+        ]
+
+    def _build_messages(self, conversation: str) -> List[Dict]:
+        """构建消息列表"""
+        categories = self.active_categories
+        leaf_paths = list(categories.path_index().values())
+        if settings.prompt_cache_layout:
+            return ClassificationPrompts.create_flat_messages(
+                conversation=conversation,
+                leaf_paths=leaf_paths,
+                categories=categories
+            )
+        prompt = ClassificationPrompts.create_flat_prompt(
+            conversation=conversation,
+            leaf_paths=leaf_paths,
+            categories=categories
+        )
+        return [{"role": "user", "content": prompt}]
+
+    def _parse_result(self, result: str) -> Optional[List[str]]:
+        """解析并校验模型输出的路径（不完全一致时先在本地纠正）"""
+        answer = extract_answer(result, key="path")
+        logger.info(f"分类路径结果: {answer.strip()}")
+        valid_paths = self.valid_paths
+        path_str, method = self.resolver.resolve(answer, list(valid_paths))
+        if path_str is not None and method != "exact":
+            logger.info(f"分类路径 '{answer.strip()}' 本地纠正为 '{path_str}'（{method}）")
+        return valid_paths.get(path_str) if path_str is not None else None
@@ -0,0 +1,338 @@
+"""
+编译版对话清洗引擎
+与 ConversationCleanerTool 的逐步清洗输出一致，但：
+- 所有正则在类级别预编译一次
+- 无意义短语合并为一个交替正则，一次扫描全部删除
+- 行级步骤合并为一次逐行流式处理，每行只经过一遍，不生成中间行列表
+"""
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+# 无意义短语列表
+MEANINGLESS_PHRASES = (
+    "这边是人工客服，请问有什么可以帮您？",
+    "您好，智能客服小飞为您服务！可以点击/:no选择下方问题或输入您的问题/:?",
+    "询前表单客户已提交",
+    "您好，已进入人工，请问有什么可以帮您",
+    "您好，已进入人工服务，请问有什么可以帮您？",
+    "为了您账户信息安全，请您提供下姓名全称、注册账户手机号、身份证号后4位帮您核实账户情况哦，谢谢",
+    "有新的咨询进来了",
+    "锁定会话",
+    "解锁会话",
+    "解锁对话",
+    "系统发送未响应超时提醒",
+    "非常抱歉没有得到您的响应,请问还有什么可以帮您？",
+    "非常抱歉没有得到您的响应，如有问题，欢迎您在工作时间随时留言，法定假日除外，感谢您的配合！",
+    "系统发送满意度调查",
+    "感谢您的咨询，祝您生活愉快，再见！",
+    "客户超时未响应，系统关闭会话",
+    "您好，请您提供下注册账户手机号，谢谢",
+    "。",
+    "稍等，为您核实~",
+    "----：----",
+    "客户已进行满意度评价",
+    "''",
+)
+
+ROBOT_START = '-----以下是机器人服务消息-----'
+HUMAN_START = '-----以下是人工客服消息-----'
+
+
+class CleanerEngine:
+    """编译版清洗引擎"""
+
+    # 包含特定内容的行直接删除
+    SENSITIVE_LINE_RE = re.compile(r"询前表单-提交手机|您好，已进入人工服务|已撤回|【图片】|----：----|x|X")
+
+    # 敏感信息打码（需按顺序依次替换）
+    MASK_RES = (
+        (re.compile(r'(\b\d{3})\d{4}(\d{4}\b)'), r'\1****\2'),
+        (re.compile(r'(\d{3})\d{4}(\d{4})'), r'\1****\2'),
+        (re.compile(r'(\b\d{4})\d{10}(\d{4}\b)'), r'\1**********\2'),
+        (re.compile(r'(\b\d{4})\d{8,11}(\d{4}\b)'), r'\1********\2'),
+    )
+
+    # 打码正则都至少需要 11 位连续数字，不含这样的数字串的行无需打码
+    MASK_HINT_RE = re.compile(r'\d{11}')
+
+    DATE_RE = re.compile(r'\d{4}/\d{1,2}/\d{1,2}')
+    SPEAKER_RE = re.compile(r'(\S+)\s*\d{4}/\d{1,2}/\d{1,2}\s*\d{1,2}:\d{1,2}:\d{1,2}')
+
+    # 敏感信息行（原实现对每一项都做子串判断，包括形如正则的几项，这里保持一致）
+    SENSITIVE_INFO_RE = re.compile("|".join(re.escape(p) for p in (
+        "为了您账户信息安全",
+        "身份证号后四位",
+        "身份证后4位",
+        "姓名全称",
+        "银行卡后四位",
+        "提供一下您的",
+        "注册手机号码",
+        "注册账户手机号",
+        "手机号",
+        r"\d{11}",
+        r"\d{17}[\dXx]",
+        r"[\u4e00-\u9fa5]{2,4}\s*\d{18}",
+        r"[\u4e00-\u9fa5]{2,4}\s*\d{11}",
+    )))
+    # 出现后需要跳过下一条客户回复的提示语
+    VERIFY_PROMPT_RE = re.compile("为了账户信息安全|身份证后4位|完整手机号|身份证后四位")
+    MASKED_NUMBER_RES = (
+        re.compile(r'\d{3}\*{4}\d{4}'),
+        re.compile(r'\d{6}\*{4}\d{4}'),
+        re.compile(r'\d{4}\*{8}\d{4}'),
+    )
+    LONG_NUMBER_RE = re.compile(r'\b\d{4,}\b')
+    NAME_ONLY_RE = re.compile(r'^[\s\W]*[\u4e00-\u9fa5]{2,4}[\s\W]*$')
+    CJK_RE = re.compile(r'[\u4e00-\u9fa5]')
+
+    MULTI_SPACE_RE = re.compile(r'\s{2,}')
+
+    def __init__(self, phrases: Iterable[str] = MEANINGLESS_PHRASES):
+        self.phrases = tuple(phrases)
+        alternation = "|".join(re.escape(p) for p in self.phrases if p)
+        self._phrase_re = re.compile(alternation) if alternation else None
+        self._max_phrase_len = max((len(p) for p in self.phrases), default=0)
+        # 可能与某短语重叠出现的其他短语（后缀与前缀重合，或包含在其中间）
+        self._overlap_partners = {
+            a: tuple(b for b in self.phrases if b and any(
+                a[i:].startswith(b) or b.startswith(a[i:]) for i in range(1, len(a))
+            ))
+            for a in self.phrases if a
+        }
+
+    def clean(self, conversation) -> str:
+        """执行清洗"""
+        if not isinstance(conversation, str):
+            return ""
+        return self.clean_prepared(self.prepare(conversation))
+
+    def prepare(self, conversation: str) -> str:
+        """整段文本级步骤：删除机器人消息、删除无意义短语"""
+        text = self._remove_robot_messages(conversation)
+        return self._remove_phrases(text).strip()
+
+    def clean_prepared(self, text: str) -> str:
+        """行级步骤（输入为 prepare 的结果），逐行流式处理"""
+        output = []
+        skip_next_customer = False
+        in_sensitive_block = False
+
+        for line in self._joined_lines(self._message_lines(text)):
+            # 删除敏感信息和相关响应
+            if self.VERIFY_PROMPT_RE.search(line):
+                skip_next_customer = True
+                in_sensitive_block = True
+                continue
+
+            if skip_next_customer and line.startswith("客户："):
+                skip_next_customer = False
+                in_sensitive_block = False
+                continue
+
+            if self.SENSITIVE_INFO_RE.search(line):
+                in_sensitive_block = True
+                continue
+
+            if not in_sensitive_block:
+                cleaned_line = line
+                if '*' in cleaned_line:
+                    for pattern in self.MASKED_NUMBER_RES:
+                        cleaned_line = pattern.sub('', cleaned_line)
+                if cleaned_line.strip():
+                    cleaned_line = self.LONG_NUMBER_RE.sub('', cleaned_line)
+                    stripped = cleaned_line.strip()
+                    # 删除只有姓名的行、带间隔点的短行、孤立的客户行和空白行
+                    if stripped and stripped != "客户：" and not (
+                        self.NAME_ONLY_RE.match(stripped) or
+                        ('·' in cleaned_line and len(self.CJK_RE.findall(cleaned_line)) < 14)
+                    ):
+                        output.append(cleaned_line)
+
+            if in_sensitive_block and line.startswith("客户："):
+                in_sensitive_block = False
+
+        # 最终清理（连续空白可能跨行，对整段文本执行）
+        text = self.MULTI_SPACE_RE.sub(' ', '\n'.join(output))
+        text = text.replace("----：----", "")
+        text = text.replace(HUMAN_START, "")
+        return text.strip()
+
+    def _message_lines(self, text: str) -> Iterator[str]:
+        """删除敏感行、打码、删除空白行、清理多余的时间信息行，并整理说话人格式
+
+        连续的时间行只保留最后一行，结尾的时间行删除，因此每行要等到下一行到达后才能确定去留；
+        保留的首行去掉行首空白、末行去掉行尾空白（与原实现对整段文本 strip 一致）。
+        """
+        previous = None
+        previous_has_date = False
+        kept = None
+        first = True
+        for raw in text.split('\n'):
+            if self.SENSITIVE_LINE_RE.search(raw):
+                continue
+            if self.MASK_HINT_RE.search(raw):
+                for pattern, repl in self.MASK_RES:
+                    raw = pattern.sub(repl, raw)
+            for line in raw.splitlines():
+                if not line.strip():
+                    continue
+                has_date = self.DATE_RE.search(line) is not None
+                if previous is not None and not (previous_has_date and has_date):
+                    if kept is not None:
+                        yield self._format_speaker(kept)
+                    kept = previous.lstrip() if first else previous
+                    first = False
+                previous, previous_has_date = line, has_date
+
+        if previous is not None and not previous_has_date:
+            if kept is not None:
+                yield self._format_speaker(kept)
+            kept = previous.lstrip() if first else previous
+        if kept is not None:
+            yield self._format_speaker(kept.rstrip())
+
+    def _format_speaker(self, line: str) -> str:
+        """清理客户和客服消息格式"""
+        match = self.SPEAKER_RE.match(line)
+        if match:
+            return f"{match.group(1)}：{line[match.end():].strip()}"
+        return line
+
+    @staticmethod
+    def _joined_lines(lines: Iterable[str]) -> Iterator[str]:
+        """连接冒号结尾的行"""
+        waiting = None
+        for line in lines:
+            if waiting is not None:
+                next_line = line.strip()
+                yield f"{waiting}{next_line}" if waiting[:-1] != next_line else waiting
+                waiting = None
+            elif line.endswith("："):
+                waiting = line
+            else:
+                yield line
+        if waiting is not None:
+            yield waiting
+
+    @staticmethod
+    def _remove_robot_messages(text: str) -> str:
+        """删除机器人服务消息"""
+        if ROBOT_START in text and HUMAN_START in text:
+            start_index = text.index(ROBOT_START)
+            end_index = text.index(HUMAN_START)
+            text = text[:start_index] + text[end_index:]
+        return text
+
+    def _remove_phrases(self, text: str) -> str:
+        """一次扫描删除所有无意义短语
+
+        结果与逐个 str.replace 一致。逐个替换时，先删除的短语可能与周围文字拼出新的短语，
+        或者短语出现位置相互重叠，这两种情况下一次扫描的结果会不同，因此回退到逐个替换：
+        - 某处短语与另一短语的出现位置重叠
+        - 相邻两处不同短语之间的文字可能成为某个短语的一部分（删除后可能拼出新短语）
+        - 删除后的文本中仍能找到短语
+        """
+        if self._phrase_re is None:
+            return text
+
+        pieces = []
+        previous_end = 0
+        previous_phrase = None
+        for match in self._phrase_re.finditer(text):
+            start, end = match.span()
+            phrase = match.group()
+            if previous_phrase is not None and phrase != previous_phrase \
+                    and self._may_bridge(text[previous_end:start]):
+                return self._remove_phrases_sequential(text)
+            for partner in self._overlap_partners[phrase]:
+                if text.find(partner, start + 1, end - 1 + len(partner)) != -1:
+                    return self._remove_phrases_sequential(text)
+            pieces.append(text[previous_end:start])
+            previous_end = end
+            previous_phrase = phrase
+
+        if not pieces:
+            return text
+        pieces.append(text[previous_end:])
+        result = "".join(pieces)
+        if self._phrase_re.search(result):
+            return self._remove_phrases_sequential(text)
+        return result
+
+    def _may_bridge(self, gap: str) -> bool:
+        """两处短语之间的文字是否可能成为某个短语的一部分"""
+        return len(gap) < self._max_phrase_len and any(gap in phrase for phrase in self.phrases)
+
+    def _remove_phrases_sequential(self, text: str) -> str:
+        for phrase in self.phrases:
+            text = text.replace(phrase, "")
+        return text
+
+
+# ============================================
+# 多进程批量清洗
+# ============================================
+_worker_engine: Optional[CleanerEngine] = None
+
+
+def _init_worker(phrases: Sequence[str]) -> None:
+    """子进程初始化：每个进程只编译一次引擎"""
+    global _worker_engine
+    _worker_engine = CleanerEngine(phrases)
+
+
+def _clean_prepared_batch(texts: List[str]) -> List[str]:
+    """子进程中执行行级清洗步骤"""
+    return [_worker_engine.clean_prepared(text) for text in texts]
+
+
+def _clean_batch(conversations: List) -> List[str]:
+    """子进程中执行完整清洗"""
+    return [_worker_engine.clean(conversation) for conversation in conversations]
+
+
+def run_in_processes(
+    func: Callable[[List], List[str]],
+    items: Iterable,
+    phrases: Sequence[str],
+    workers: int,
+    batch_size: int
+) -> List[str]:
+    """按批分发到进程池执行，结果顺序与输入一致
+
+    只有一批数据时直接在当前进程执行，避免进程池开销。
+
+    Args:
+        func: 批处理函数（_clean_batch / _clean_prepared_batch）
+        items: 待处理数据
+        phrases: 无意义短语列表（用于子进程初始化引擎）
+        workers: 进程数
+        batch_size: 每批条数
+    """
+    iterator = iter(items)
+    first = list(islice(iterator, batch_size))
+    second = list(islice(iterator, batch_size))
+    if not second:
+        # 数据量小，在当前进程执行（同样只编译一次引擎）
+        if _worker_engine is None or _worker_engine.phrases != tuple(phrases):
+            _init_worker(phrases)
+        return func(first)
+
+    results: List[str] = []
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(tuple(phrases),)
+    ) as executor:
+        pending = [executor.submit(func, first), executor.submit(func, second)]
+        max_pending = workers * 2
+        while True:
+            while len(pending) < max_pending:
+                batch = list(islice(iterator, batch_size))
+                if not batch:
+                    break
+                pending.append(executor.submit(func, batch))
+            if not pending:
+                break
+            results.extend(pending.pop(0).result())
+    return results
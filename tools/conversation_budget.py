@@ -0,0 +1,148 @@
+"""
+对话 token 预算工具
+清洗后的长对话按任务的 token 预算裁剪后再放入提示词：
+1. 未超出预算时原样返回
+2. 删除客服重复发送的话术（同一内容只保留第一次）
+3. 仍超出时保留开头和结尾若干轮，中间优先保留客户发言，其次客服发言，
+   保持原有顺序，被省略的部分用一行省略标记代替
+"""
+from typing import List, Set
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+from loguru import logger
+from config.settings import settings
+from utils.llm_client import LLMClient
+
+CUSTOMER_PREFIX = "客户："
+OMITTED_MARK = "……（省略{count}轮对话）"
+
+
+class ConversationBudgetInput(BaseModel):
+    """预算裁剪输入"""
+    conversation: str = Field(description="清洗后的对话内容")
+    task: str = Field(description="任务类型: classification / summary")
+
+
+class ConversationBudgetTool(BaseTool):
+    """对话 token 预算裁剪工具"""
+    name: str = "conversation_budget"
+    description: str = "按任务的 token 预算裁剪对话，保留首尾轮次与客户发言"
+    args_schema: type[BaseModel] = ConversationBudgetInput
+
+    llm_client: LLMClient = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # 只用于本地 token 计数
+        self.llm_client = LLMClient.for_scenario("summary")
+
+    @staticmethod
+    def budget_for(task: str) -> int:
+        """任务的输入 token 预算，0 表示不限制"""
+        if task == "classification":
+            return settings.classification_input_budget
+        if task == "summary":
+            return settings.summary_input_budget
+        return 0
+
+    def _run(self, conversation: str, task: str) -> str:
+        """按任务预算裁剪对话"""
+        return self.fit(conversation, self.budget_for(task))
+
+    def fit(self, conversation: str, budget: int) -> str:
+        """
+        把对话裁剪到预算以内
+
+        Args:
+            conversation: 清洗后的对话
+            budget: token 预算，0 表示不限制
+
+        Returns:
+            裁剪后的对话（未超出预算时原样返回）
+        """
+        if budget <= 0 or not conversation:
+            return conversation
+        total = self._count(conversation)
+        if total <= budget:
+            return conversation
+
+        lines = self._dedupe_agent_lines(conversation.split("\n"))
+        costs = [self._count(line) + 1 for line in lines]
+        if sum(costs) <= budget:
+            text = "\n".join(lines)
+        else:
+            text = self._select_turns(lines, costs, budget)
+
+        logger.info(f"对话超出 token 预算，已裁剪: {total} -> {self._count(text)} (预算 {budget})")
+        return text
+
+    def _count(self, text: str) -> int:
+        """本地计算 token 数（tokenizer 不可用时按字符数估算）"""
+        return self.llm_client.count_tokens(text) or len(text)
+
+    @staticmethod
+    def _dedupe_agent_lines(lines: List[str]) -> List[str]:
+        """删除空行和客服重复发送的话术（同一内容只保留第一次出现）"""
+        seen = set()
+        result = []
+        for line in lines:
+            if not line.strip():
+                continue
+            if not line.startswith(CUSTOMER_PREFIX):
+                content = line.split("：", 1)[-1].strip()
+                if content in seen:
+                    continue
+                seen.add(content)
+            result.append(line)
+        return result
+
+    def _select_turns(self, lines: List[str], costs: List[int], budget: int) -> str:
+        """按优先级选取轮次：首尾轮次 > 中间客户发言 > 中间客服发言"""
+        head = min(settings.budget_head_turns, len(lines))
+        tail = min(settings.budget_tail_turns, len(lines) - head)
+        middle = range(head, len(lines) - tail)
+        order = (
+            list(range(head))
+            + list(range(len(lines) - tail, len(lines)))
+            + [i for i in middle if lines[i].startswith(CUSTOMER_PREFIX)]
+            + [i for i in middle if not lines[i].startswith(CUSTOMER_PREFIX)]
+        )
+
+        # 每段连续省略的轮次占一行省略标记；初始时全部省略，只有一段
+        mark_cost = self._count(OMITTED_MARK.format(count=len(lines))) + 1
+        selected = set()
+        used = mark_cost
+        for index in order:
+            left_gap = index > 0 and index - 1 not in selected
+            right_gap = index < len(lines) - 1 and index + 1 not in selected
+            gap_delta = int(left_gap and right_gap) - int(not left_gap and not right_gap)
+            cost = costs[index] + gap_delta * mark_cost
+            if used + cost <= budget:
+                selected.add(index)
+                used += cost
+
+        if not selected:
+            return self._truncate_text("\n".join(lines), budget)
+        return "\n".join(self._render(lines, selected))
+
+    @staticmethod
+    def _render(lines: List[str], selected: Set[int]) -> List[str]:
+        """按原顺序输出选中的轮次，连续省略的轮次合并为一行省略标记"""
+        output = []
+        omitted = 0
+        for index, line in enumerate(lines):
+            if index in selected:
+                if omitted:
+                    output.append(OMITTED_MARK.format(count=omitted))
+                    omitted = 0
+                output.append(line)
+            else:
+                omitted += 1
+        if omitted:
+            output.append(OMITTED_MARK.format(count=omitted))
+        return output
+
+    def _truncate_text(self, text: str, budget: int) -> str:
+        """单轮就超出预算时，按比例保留开头和结尾的文本"""
+        keep = max(1, len(text) * budget // (self._count(text) * 2))
+        return f"{text[:keep]}\n{OMITTED_MARK.format(count=1)}\n{text[-keep:]}"
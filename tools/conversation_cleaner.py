@@ -2,12 +2,24 @@
 对话清洗工具
 将原 chat_clean.py 封装为 LangChain Tool
 """
-import re
-import pandas as pd
-from typing import Dict, Any
+import os
+from typing import TYPE_CHECKING, Iterable, List, Optional
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 from loguru import logger
+from tools.cleaner_engine import (
+    CleanerEngine,
+    MEANINGLESS_PHRASES,
+    ROBOT_START,
+    HUMAN_START,
+    run_in_processes,
+    _clean_batch,
+    _clean_prepared_batch
+)
+
+if TYPE_CHECKING:
+    # pandas 只在批量清洗 DataFrame 列时使用，运行时按需导入，不拖慢服务启动
+    import pandas as pd
 
 
 class ConversationCleanerInput(BaseModel):
@@ -22,219 +34,92 @@ class ConversationCleanerTool(BaseTool):
     args_schema: type[BaseModel] = ConversationCleanerInput
 
     # 无意义短语列表
-    meaningless_phrases: list = [
-        "这边是人工客服，请问有什么可以帮您？",
-        "您好，智能客服小飞为您服务！可以点击/:no选择下方问题或输入您的问题/:?",
-        "询前表单客户已提交",
-        "您好，已进入人工，请问有什么可以帮您",
-        "您好，已进入人工服务，请问有什么可以帮您？",
-        "为了您账户信息安全，请您提供下姓名全称、注册账户手机号、身份证号后4位帮您核实账户情况哦，谢谢",
-        "有新的咨询进来了",
-        "锁定会话",
-        "解锁会话",
-        "解锁对话",
-        "系统发送未响应超时提醒",
-        "非常抱歉没有得到您的响应,请问还有什么可以帮您？",
-        "非常抱歉没有得到您的响应，如有问题，欢迎您在工作时间随时留言，法定假日除外，感谢您的配合！",
-        "系统发送满意度调查",
-        "感谢您的咨询，祝您生活愉快，再见！",
-        "客户超时未响应，系统关闭会话",
-        "您好，请您提供下注册账户手机号，谢谢",
-        "。",
-        "稍等，为您核实~",
-        "----：----",
-        "客户已进行满意度评价",
-        "''",
-    ]
+    meaningless_phrases: list = list(MEANINGLESS_PHRASES)
+
+    # 编译版清洗引擎
+    engine: Optional[CleanerEngine] = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = CleanerEngine(self.meaningless_phrases)
 
     def _run(self, conversation: str) -> str:
-        pass
-        """执行清洗"""
-        if pd.isna(conversation) or not isinstance(conversation, str):
+        """执行清洗（编译版单遍引擎）"""
+        if not isinstance(conversation, str):
             return ""
 
         logger.debug("开始清洗对话内容")
-
-        # 按顺序应用所有清理函数
-        text = self._remove_robot_messages(conversation)
-        text = self._clean_basic_content(text)
-        text = self._remove_sensitive_lines(text)
-        text = self._mask_sensitive_info(text)
-        text = self._remove_empty_lines(text)
-        text = self._clean_messages(text)
-        text = self._clean_customer_service_messages(text)
-        text = self._concatenate_lines_with_colon(text)
-        text = self._remove_sensitive_info_and_responses(text)
-        text = self._remove_isolated_customer_lines(text)
-        text = self._remove_empty_lines(text)
-
-        # 最终清理
-        text = re.sub(r'\s{2,}', ' ', text)
-        text = text.replace("----：----", "")
-        text = text.replace("-----以下是人工客服消息-----", "")
-
+        text = self.engine.clean(conversation)
         logger.debug("对话清洗完成")
-        return text.strip()
-
-    def _clean_basic_content(self, text: str) -> str:
-        """删除无意义文本"""
-        for phrase in self.meaningless_phrases:
-            text = text.replace(phrase, "")
-        return text.strip()
-
-    def _remove_empty_lines(self, text: str) -> str:
-        """删除空白行"""
-        if pd.isna(text):
-            return ""
-        return "\n".join([line for line in text.splitlines() if line.strip()])
-
-    def _mask_sensitive_info(self, text: str) -> str:
-        """替换敏感信息"""
-        if pd.isna(text):
-            return text
-        text = re.sub(r'(\b\d{3})\d{4}(\d{4}\b)', r'\1****\2', text)
-        text = re.sub(r'(\d{3})\d{4}(\d{4})', r'\1****\2', text)
-        text = re.sub(r'(\b\d{4})\d{10}(\d{4}\b)', r'\1**********\2', text)
-        text = re.sub(r'(\b\d{4})\d{8,11}(\d{4}\b)', r'\1********\2', text)
         return text
 
-    def _remove_sensitive_lines(self, text: str) -> str:
-        """删除包含特定内容的行"""
-        pattern = r"询前表单-提交手机|您好，已进入人工服务|已撤回|【图片】|----：----|x|X"
-        return "\n".join([line for line in text.strip().split('\n') if not re.search(pattern, line)])
-
-    def _clean_messages(self, text: str) -> str:
-        """清理多余的时间信息行"""
-        lines = text.strip().split('\n')
-        cleaned_lines = []
-        skip_next = False
-        for i in range(len(lines)):
-            if skip_next:
-                skip_next = False
-                continue
-            if re.search(r'\d{4}/\d{1,2}/\d{1,2}', lines[i]):
-                if i + 1 < len(lines) and re.search(r'\d{4}/\d{1,2}/\d{1,2}', lines[i + 1]):
-                    continue
-                else:
-                    cleaned_lines.append(lines[i])
-            else:
-                cleaned_lines.append(lines[i])
-        if cleaned_lines and re.search(r'\d{4}/\d{1,2}/\d{1,2}', cleaned_lines[-1]):
-            cleaned_lines.pop()
-        return '\n'.join(cleaned_lines)
-
-    def _remove_robot_messages(self, text: str) -> str:
-        """删除机器人服务消息"""
-        if '-----以下是机器人服务消息-----' in text and '-----以下是人工客服消息-----' in text:
-            start_index = text.index('-----以下是机器人服务消息-----')
-            end_index = text.index('-----以下是人工客服消息-----')
-            text = text[:start_index] + text[end_index:]
-        return text
-
-    def _clean_customer_service_messages(self, text: str) -> str:
-        """清理客户和客服消息格式"""
-        pattern = r'(\S+)\s*\d{4}/\d{1,2}/\d{1,2}\s*\d{1,2}:\d{1,2}:\d{1,2}'
-        lines = text.strip().split('\n')
-        cleaned_lines = []
-        for line in lines:
-            match = re.match(pattern, line)
-            if match:
-                speaker = match.group(1)
-                content = line[match.end():].strip()
-                cleaned_lines.append(f"{speaker}：{content}")
-            else:
-                cleaned_lines.append(line)
-        return '\n'.join(cleaned_lines)
-
-    def _concatenate_lines_with_colon(self, text: str) -> str:
-        """连接冒号结尾的行"""
-        lines = text.strip().split('\n')
-        concatenated_lines = []
-        i = 0
-        while i < len(lines):
-            current_line = lines[i]
-            if current_line.endswith("：") and (i + 1 < len(lines)):
-                next_line = lines[i + 1].strip()
-                if current_line[:-1] != next_line:
-                    concatenated_lines.append(f"{current_line}{next_line}")
-                else:
-                    concatenated_lines.append(current_line)
-                i += 1
-            else:
-                concatenated_lines.append(current_line)
-            i += 1
-        return '\n'.join(concatenated_lines)
-
-    def _remove_isolated_customer_lines(self, text: str) -> str:
-        """删除孤立的客户行"""
-        lines = text.strip().split('\n')
-        return '\n'.join([line for line in lines if line.strip() != "客户："])
-
-    def _remove_sensitive_info_and_responses(self, text: str) -> str:
-        """删除敏感信息和相关响应"""
-        if pd.isna(text):
-            return text
-
-        lines = text.split('\n')
-        cleaned_lines = []
-        skip_next_customer = False
-        in_sensitive_block = False
-
-        sensitive_patterns = [
-            "为了您账户信息安全",
-            "身份证号后四位",
-            "身份证后4位",
-            "姓名全称",
-            "银行卡后四位",
-            "提供一下您的",
-            "注册手机号码",
-            "注册账户手机号",
-            "手机号",
-            r"\d{11}",
-            r"\d{17}[\dXx]",
-            r"[\u4e00-\u9fa5]{2,4}\s*\d{18}",
-            r"[\u4e00-\u9fa5]{2,4}\s*\d{11}"
-        ]
-
-        for line in lines:
-            if not line.strip():
-                continue
-
-            contains_sensitive = any(pattern in line if isinstance(pattern, str) else bool(re.search(pattern, line))
-                                     for pattern in sensitive_patterns)
-
-            if any(phrase in line for phrase in ["为了账户信息安全", "身份证后4位", "完整手机号", "身份证后四位"]):
-                skip_next_customer = True
-                in_sensitive_block = True
-                continue
-
-            if skip_next_customer and line.startswith("客户："):
-                skip_next_customer = False
-                in_sensitive_block = False
-                continue
-
-            if contains_sensitive:
-                in_sensitive_block = True
-                continue
-
-            if not in_sensitive_block and not contains_sensitive:
-                cleaned_line = line
-                cleaned_line = re.sub(r'\d{3}\*{4}\d{4}', '', cleaned_line)
-                cleaned_line = re.sub(r'\d{6}\*{4}\d{4}', '', cleaned_line)
-                cleaned_line = re.sub(r'\d{4}\*{8}\d{4}', '', cleaned_line)
-
-                if cleaned_line.strip():
-                    cleaned_lines.append(cleaned_line)
-
-            if in_sensitive_block and line.startswith("客户："):
-                in_sensitive_block = False
-
-        result = '\n'.join(cleaned_lines)
-        result = re.sub(r'\b\d{4,}\b', '', result)
-
-        result_lines = result.split('\n')
-        result_lines = [line for line in result_lines
-                        if not (re.match(r'^[\s\W]*[\u4e00-\u9fa5]{2,4}[\s\W]*$', line.strip()) or
-                                (('·' in line) and (len(re.findall(r'[\u4e00-\u9fa5]', line)) < 14)))]
-
-        return '\n'.join(result_lines).strip()
+    def clean_many(
+        self,
+        conversations: Iterable,
+        workers: Optional[int] = None,
+        batch_size: int = 200
+    ) -> List[str]:
+        """
+        批量清洗（多进程并行，结果顺序与输入一致）
+
+        Args:
+            conversations: 原始对话（可为任意可迭代对象，非字符串项返回空字符串）
+            workers: 进程数（默认CPU核数）
+            batch_size: 每批分发给子进程的条数
+
+        Returns:
+            清洗后的对话列表
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            return [self.engine.clean(conversation) for conversation in conversations]
+        return run_in_processes(
+            _clean_batch, conversations, self.meaningless_phrases, workers, batch_size
+        )
+
+    def clean_series(
+        self,
+        series: "pd.Series",
+        workers: Optional[int] = None,
+        batch_size: int = 200
+    ) -> "pd.Series":
+        """
+        清洗 DataFrame 中的一列对话
+
+        整段文本级步骤（删除机器人消息、逐个删除无意义短语）用 Series.str 按列执行，
+        行级有状态的步骤分发到进程池。保持 object 类型，使 strip 等操作与逐条清洗完全一致。
+
+        Args:
+            series: 原始对话列
+            workers: 进程数（默认CPU核数）
+            batch_size: 每批分发给子进程的条数
+
+        Returns:
+            清洗后的对话列（索引与输入一致）
+        """
+        import pandas as pd
+
+        text = series.reset_index(drop=True).astype(object)
+        text = text.where(text.map(lambda value: isinstance(value, str)), "")
+
+        # 删除机器人服务消息（只处理同时包含两个分隔标记的行）
+        has_robot = (
+            text.str.contains(ROBOT_START, regex=False)
+            & text.str.contains(HUMAN_START, regex=False)
+        )
+        if has_robot.any():
+            text[has_robot] = text[has_robot].map(CleanerEngine._remove_robot_messages)
+
+        # 与逐条清洗一致：按列表顺序依次删除无意义短语
+        for phrase in self.meaningless_phrases:
+            text = text.str.replace(phrase, "", regex=False)
+        text = text.str.strip()
+
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            cleaned = [self.engine.clean_prepared(value) for value in text]
+        else:
+            cleaned = run_in_processes(
+                _clean_prepared_batch, text.tolist(), self.meaningless_phrases, workers, batch_size
+            )
+        return pd.Series(cleaned, index=series.index, name=series.name, dtype=object)
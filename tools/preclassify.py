@@ -0,0 +1,140 @@
+"""
+近邻预分类工具
+用已核实的历史分类结果建立近邻索引，新对话的 top-k 近邻分类高度一致时直接返回该路径，
+跳过 LLM 分类链；否则返回 None，由调用方走原有分类流程
+"""
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field, PrivateAttr
+from loguru import logger
+from config.settings import settings
+from models.schemas import CategoryData
+from tools.conversation_cleaner import ConversationCleanerTool
+from utils.bulk_io import iter_rows, get_field
+from utils.category_store import pinned_categories
+from utils.neighbor_index import build_index
+
+
+class PreClassifyInput(BaseModel):
+    """预分类输入"""
+    conversation: str = Field(description="清洗后的对话内容")
+
+
+class PreClassifyTool(BaseTool):
+    """近邻预分类工具"""
+    name: str = "preclassify"
+    description: str = "根据相似历史对话的分类结果直接给出分类路径"
+    args_schema: type[BaseModel] = PreClassifyInput
+
+    index: Any = None
+    # 与索引文档一一对应的分类路径字符串
+    labels: List[str] = Field(default_factory=list)
+    categories: Optional[CategoryData] = None
+    version: str = ""
+    hits: int = 0
+    misses: int = 0
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, categories: Optional[CategoryData] = None, data_path: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        if categories is not None:
+            self.set_categories(categories)
+        data_path = settings.preclassify_data_path if data_path is None else data_path
+        if data_path:
+            self.load(data_path)
+
+    @property
+    def enabled(self) -> bool:
+        return self.index is not None and self.index.size > 0
+
+    @property
+    def valid_paths(self) -> Dict[str, List[str]]:
+        """路径字符串 -> 路径列表（只有当前请求所用分类树中合法的路径参与投票）"""
+        categories = pinned_categories(self.categories)
+        return categories.path_index() if categories is not None else {}
+
+    def set_categories(self, categories: CategoryData) -> None:
+        """切换分类数据（分类树中已不存在的历史路径不再参与投票）"""
+        self.categories = categories
+
+    def load(self, data_path: str) -> None:
+        """
+        加载已标注的历史对话并建立索引
+
+        Args:
+            data_path: .csv / .jsonl 文件，字段 conversation（原始对话）与 category（一级-二级[-三级]）
+        """
+        logger.info(f"加载预分类样本: {data_path}")
+        conversations, labels = [], []
+        digest = hashlib.sha256()
+        for row in iter_rows(data_path):
+            conversation = get_field(row, "conversation")
+            category = get_field(row, "category")
+            if conversation is None or category is None:
+                continue
+            conversations.append(conversation)
+            labels.append(category.strip())
+            digest.update(f"{category}\x00{conversation}\x00".encode("utf-8"))
+
+        # 在服务进程内串行清洗：启动阶段不创建进程池（已有线程的进程中 fork 子进程不安全，也拖慢启动）
+        texts = ConversationCleanerTool().clean_many(conversations, workers=1)
+        self.index = build_index(texts, settings.preclassify_embedding_model or None)
+        self.labels = labels
+        self.version = digest.hexdigest()[:16]
+        logger.success(f"预分类索引建立完成 - 样本数: {len(labels)}, 版本: {self.version}")
+
+    def _run(self, conversation: str) -> Optional[List[str]]:
+        """
+        近邻投票预分类
+
+        Returns:
+            近邻一致度达到阈值时返回分类路径，否则返回 None
+        """
+        if not self.enabled or not conversation:
+            return None
+
+        path = self._vote(self.index.search(conversation, settings.preclassify_top_k))
+        with self._lock:
+            if path is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return path
+
+    def _vote(self, neighbors: List[tuple]) -> Optional[List[str]]:
+        """只统计相似度达标的近邻，按相似度加权投票：票数和得票率均达到阈值才采用"""
+        valid_paths = self.valid_paths
+        neighbors = [
+            (self.labels[doc_id], score) for doc_id, score in neighbors
+            if score >= settings.preclassify_min_similarity and self.labels[doc_id] in valid_paths
+        ]
+        if not neighbors:
+            return None
+
+        weights: Dict[str, float] = defaultdict(float)
+        votes: Dict[str, int] = defaultdict(int)
+        for label, score in neighbors:
+            weights[label] += score
+            votes[label] += 1
+        label = max(weights, key=weights.get)
+        confidence = weights[label] / sum(weights.values())
+
+        if confidence < settings.preclassify_confidence or votes[label] < settings.preclassify_min_votes:
+            logger.debug(f"近邻预分类置信度不足: {label} ({confidence:.2f}, {votes[label]}票)")
+            return None
+        logger.info(f"近邻预分类命中: {label} (置信度 {confidence:.2f}, {votes[label]}票)")
+        return valid_paths[label]
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": self.index.size if self.enabled else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
@@ -0,0 +1,113 @@
+"""
+规则快速分类工具
+用分类文件中编译好的关键词/正则规则判断明显的会话（如"注销账号"），无需调用LLM。
+模式（CATEGORY_RULES_MODE）：
+- on: 规则唯一命中时直接采用
+- shadow: 只记录规则结论，仍由LLM分类，并统计两者是否一致（用于安全地扩充规则）
+- off: 不使用规则
+"""
+import threading
+from typing import Any, Dict, List, Optional
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field, PrivateAttr
+from loguru import logger
+from config.settings import settings
+from models.schemas import CategoryData
+from utils.category_store import pinned_categories
+
+
+class RuleClassifyInput(BaseModel):
+    """规则分类输入"""
+    conversation: str = Field(description="清洗后的对话内容")
+
+
+class RuleClassifyTool(BaseTool):
+    """规则快速分类工具"""
+    name: str = "rule_classify"
+    description: str = "根据关键词/正则规则直接给出明显会话的分类路径"
+    args_schema: type[BaseModel] = RuleClassifyInput
+
+    categories: Optional[CategoryData] = None
+    counts: Dict[str, int] = Field(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, categories: Optional[CategoryData] = None, **kwargs):
+        super().__init__(**kwargs)
+        if categories is not None:
+            self.set_categories(categories)
+
+    @property
+    def decisive(self) -> bool:
+        """规则结论是否直接采用（on 模式）"""
+        return settings.category_rules_mode == "on"
+
+    @property
+    def active_categories(self) -> Optional[CategoryData]:
+        """当前请求固定的分类树（未固定时使用最新加载的分类树）"""
+        return pinned_categories(self.categories)
+
+    def set_categories(self, categories: CategoryData) -> None:
+        """切换分类数据（规则随分类文件一起加载）"""
+        self.categories = categories
+        if settings.category_rules_mode != "off" and (categories.rules is None or not categories.rules.size):
+            logger.info(
+                f"分类文件未配置 keywords/regex 规则，规则分类不生效 (CATEGORY_RULES_MODE={settings.category_rules_mode})"
+            )
+
+    def _run(self, conversation: str) -> Optional[List[str]]:
+        """
+        规则匹配
+
+        Returns:
+            规则唯一命中的分类路径，未命中、命中多个分类或规则关闭时返回 None
+        """
+        categories = self.active_categories
+        rules = categories.rules if categories is not None else None
+        if settings.category_rules_mode == "off" or rules is None or not rules.size:
+            return None
+
+        path, hits = rules.match(conversation)
+        if path is not None:
+            self._record("rule_hits")
+            logger.info(f"规则命中: {'-'.join(path)} (匹配: {hits})")
+        elif hits:
+            self._record("ambiguous")
+            logger.info(f"规则命中多个分类，交由LLM判断: {hits}")
+        return path
+
+    def record_decision(self, rule_path: Optional[List[str]], final_path: List[str], source: str = "llm") -> None:
+        """
+        记录一次非规则决定的分类；shadow 模式下对比规则结论与最终结果
+
+        Args:
+            rule_path: 规则结论（未命中为 None）
+            final_path: 最终分类路径
+            source: 做出决定的环节（llm / preclassify），按来源分别统计，
+                    shadow_agree / shadow_disagree 只统计与LLM的对比
+        """
+        self._record(f"{source}_decisions")
+        if rule_path is None:
+            return
+        prefix = "" if source == "llm" else f"{source}_"
+        if list(rule_path) == list(final_path):
+            self._record(f"{prefix}shadow_agree")
+        else:
+            self._record(f"{prefix}shadow_disagree")
+            logger.warning(
+                f"规则结论与{source}分类不一致: 规则 {'-'.join(rule_path)} / {source} {'-'.join(final_path)}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """规则命中次数与各环节决定次数"""
+        categories = self.active_categories
+        rules = categories.rules if categories is not None else None
+        with self._lock:
+            return {
+                "mode": settings.category_rules_mode,
+                "size": rules.size if rules is not None else 0,
+                **self.counts
+            }
+
+    def _record(self, event: str) -> None:
+        with self._lock:
+            self.counts[event] = self.counts.get(event, 0) + 1
@@ -1,6 +1,10 @@
 """
 摘要生成工具
 """
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 from utils.llm_client import LLMClient
@@ -15,7 +19,7 @@ class SummarizeInput(BaseModel):
 
 
 class SummarizeTool(BaseTool):
-    """摘要生成工具"""
+    """摘要生成工具（超长对话使用分段并行摘要 + 汇总）"""
     name: str = "summarize"
     description: str = "生成对话摘要"
     args_schema: type[BaseModel] = SummarizeInput
@@ -30,17 +34,137 @@ class SummarizeTool(BaseTool):
     def _run(self, conversation: str) -> str:
         """生成摘要"""
         logger.debug("开始生成摘要")
-        prompt = SummaryPrompts.create_prompt(conversation)
-
-        messages = [{"role": "user", "content": prompt}]
+        chunks = self._split_chunks(conversation)
+        if chunks:
+            messages = self._build_reduce_messages(self._map_chunks(chunks))
+        else:
+            messages = self._build_messages(conversation)
         summary = self.llm_client.chat_completion(
             messages=messages,
-            max_tokens=8192  # 默认最大token数
+            **LLMClient.generation_params("summary")
+        )
+
+        logger.debug("摘要生成完成")
+        return summary.strip()
+
+    async def _arun(self, conversation: str) -> str:
+        """异步生成摘要"""
+        logger.debug("开始异步生成摘要")
+        chunks = await asyncio.to_thread(self._split_chunks, conversation)
+        if chunks:
+            messages = self._build_reduce_messages(await self._amap_chunks(chunks))
+        else:
+            messages = self._build_messages(conversation)
+        summary = await self.llm_client.achat_completion(
+            messages=messages,
+            **LLMClient.generation_params("summary")
         )
 
         logger.debug("摘要生成完成")
         return summary.strip()
 
-    async def _arun(self, *args, **kwargs):
-        """异步运行（暂不实现）"""
-        raise NotImplementedError("异步模式暂未实现")
+    async def astream(self, conversation: str) -> AsyncIterator[str]:
+        """流式生成摘要，逐段产出模型输出的文本（超长对话先并行提取分段要点，再流式汇总）"""
+        logger.debug("开始流式生成摘要")
+        chunks = await asyncio.to_thread(self._split_chunks, conversation)
+        if chunks:
+            messages = self._build_reduce_messages(await self._amap_chunks(chunks))
+        else:
+            messages = self._build_messages(conversation)
+        async for delta in self.llm_client.astream_completion(
+            messages=messages,
+            **LLMClient.generation_params("summary")
+        ):
+            yield delta
+
+        logger.debug("摘要生成完成")
+
+    def _split_chunks(self, conversation: str) -> Optional[List[str]]:
+        """
+        超出摘要预算时按轮次（行）切分对话，每段不超过 summary_chunk_tokens（单轮超出时先把该轮切开）
+
+        Returns:
+            分段列表；无需分段摘要时返回 None
+        """
+        budget = settings.summary_input_budget
+        if settings.summary_long_mode != "map_reduce" or budget <= 0:
+            return None
+        if self._count(conversation) <= budget:
+            return None
+
+        chunk_tokens = max(1, settings.summary_chunk_tokens)
+        chunks, current, used = [], [], 0
+        for line in conversation.split("\n"):
+            for piece in self._split_line(line, chunk_tokens):
+                cost = self._count(piece) + 1
+                if current and used + cost > chunk_tokens:
+                    chunks.append("\n".join(current))
+                    current, used = [], 0
+                current.append(piece)
+                used += cost
+        if current:
+            chunks.append("\n".join(current))
+
+        logger.info(f"对话超出摘要预算，分 {len(chunks)} 段并行摘要后汇总")
+        return chunks
+
+    def _split_line(self, line: str, chunk_tokens: int) -> List[str]:
+        """单轮就超出分段预算时，按 token 与字符数的比例把该轮切成若干段（不丢弃内容）"""
+        cost = self._count(line) + 1
+        if cost <= chunk_tokens:
+            return [line]
+        size = max(1, len(line) * (chunk_tokens - 1) // cost)
+        return [line[start:start + size] for start in range(0, len(line), size)]
+
+    def _count(self, text: str) -> int:
+        """本地计算 token 数（tokenizer 不可用时按字符数估算）"""
+        return self.llm_client.count_tokens(text) or len(text)
+
+    def _map_chunks(self, chunks: List[str]) -> List[str]:
+        """并行提取各段要点（线程池，沿用当前上下文的优先级通道与用量统计）"""
+        workers = max(1, min(len(chunks), settings.batch_concurrency))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summary-map") as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self.llm_client.chat_completion,
+                    self._build_chunk_messages(chunk, index, len(chunks)),
+                    **self._chunk_params()
+                )
+                for index, chunk in enumerate(chunks, 1)
+            ]
+            return [future.result().strip() for future in futures]
+
+    async def _amap_chunks(self, chunks: List[str]) -> List[str]:
+        """异步并行提取各段要点"""
+        notes = await asyncio.gather(*(
+            self.llm_client.achat_completion(
+                self._build_chunk_messages(chunk, index, len(chunks)),
+                **self._chunk_params()
+            )
+            for index, chunk in enumerate(chunks, 1)
+        ))
+        return [note.strip() for note in notes]
+
+    @staticmethod
+    def _chunk_params() -> dict:
+        """分段要点提取的生成参数（输出长度单独限制）"""
+        return {**LLMClient.generation_params("summary"), "max_tokens": settings.summary_chunk_max_tokens}
+
+    @staticmethod
+    def _build_chunk_messages(chunk: str, index: int, total: int) -> list:
+        """构建分段要点提取消息"""
+        return [{"role": "user", "content": SummaryPrompts.create_chunk_prompt(chunk, index, total)}]
+
+    @staticmethod
+    def _build_reduce_messages(notes: List[str]) -> list:
+        """构建汇总消息"""
+        return [{"role": "user", "content": SummaryPrompts.create_reduce_prompt(notes)}]
+
+    @staticmethod
+    def _build_messages(conversation: str) -> list:
+        """构建摘要请求消息"""
+        if settings.prompt_cache_layout:
+            return SummaryPrompts.create_messages(conversation)
+        prompt = SummaryPrompts.create_prompt(conversation)
+        return [{"role": "user", "content": prompt}]
@@ -1,4 +1,5 @@
 """工具模块"""
 from .llm_client import LLMClient
+from .timing import StageTimer
 
-__all__ = ['LLMClient']
+__all__ = ['LLMClient', 'StageTimer']
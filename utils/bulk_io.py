@@ -0,0 +1,118 @@
+"""
+批量离线处理的输入输出工具
+- 流式读取 CSV / JSONL（不一次性加载整个文件）
+- 断点文件：记录已完成的输入行数和输出文件偏移，崩溃后可从断点继续
+"""
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Any, Optional
+
+from loguru import logger
+
+# 长对话可能超过 csv 默认的单字段长度限制
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+def iter_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """按行流式读取会话数据
+
+    Args:
+        path: 输入文件路径（.csv 或 .jsonl）
+
+    Yields:
+        每行一个字典
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                yield row
+    elif suffix in (".jsonl", ".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"第 {line_no} 行不是合法JSON，已跳过: {e}")
+                    yield {}
+                    continue
+                if not isinstance(row, dict):
+                    logger.warning(f"第 {line_no} 行不是JSON对象，已跳过")
+                    row = {}
+                yield row
+    else:
+        raise ValueError(f"不支持的输入格式: {suffix}（仅支持 .csv / .jsonl）")
+
+
+class BulkCheckpoint:
+    """批量任务断点
+
+    结果按输入顺序写入输出文件，因此只需记录两项：
+    - rows_done: 已完成（已写入输出）的输入行数
+    - output_offset: 对应的输出文件字节偏移
+
+    恢复时跳过前 rows_done 行，并把输出文件截断到 output_offset，
+    丢弃崩溃前写了一半或未记入断点的结果。
+    """
+
+    def __init__(self, path: str, input_path: str):
+        self.path = path
+        self.input_path = str(input_path)
+        self.rows_done = 0
+        self.output_offset = 0
+
+    @classmethod
+    def load(cls, path: str, input_path: str) -> "BulkCheckpoint":
+        """读取断点文件（不存在时返回空断点）"""
+        checkpoint = cls(path, input_path)
+        if not os.path.exists(path):
+            return checkpoint
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("input_path") != checkpoint.input_path:
+            raise ValueError(
+                f"断点文件 {path} 属于输入 {data.get('input_path')}，"
+                f"与当前输入 {checkpoint.input_path} 不一致"
+            )
+        checkpoint.rows_done = int(data.get("rows_done", 0))
+        checkpoint.output_offset = int(data.get("output_offset", 0))
+        return checkpoint
+
+    def save(self, rows_done: int, output_offset: int) -> None:
+        """原子写入断点文件"""
+        self.rows_done = rows_done
+        self.output_offset = output_offset
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "input_path": self.input_path,
+                "rows_done": rows_done,
+                "output_offset": output_offset
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def open_output(self, output_path: str):
+        """以追加模式打开输出文件，并截断到断点记录的偏移"""
+        mode = "r+b" if os.path.exists(output_path) else "wb"
+        f = open(output_path, mode)
+        f.truncate(self.output_offset)
+        f.seek(self.output_offset)
+        return f
+
+
+def get_field(row: Dict[str, Any], name: str, default: Optional[str] = None) -> Optional[str]:
+    """读取字段并转为字符串（空值返回默认值）"""
+    value = row.get(name)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    return str(value)
@@ -0,0 +1,14 @@
+"""
+缓存键计算
+结果缓存与单级决策缓存共用：各组成部分依次写入 SHA-256，部分之间以 \\x00 分隔
+"""
+import hashlib
+
+
+def make_key(*parts) -> str:
+    """根据各组成部分计算缓存键"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
@@ -0,0 +1,99 @@
+"""
+分类关键词/正则规则
+分类文件可选的 keywords（多个用 | 分隔）与 regex 列，加载时编译：
+所有关键词合并为一个 Aho-Corasick 自动机，正则各自预编译。
+只匹配客户发言，命中的规则全部指向同一个叶子路径时才给出结论
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from utils.keyword_matcher import KeywordMatcher
+
+CUSTOMER_PREFIX = "客户："
+
+
+class CategoryRules:
+    """编译后的分类规则表（只读，可在多线程中共享）"""
+
+    def __init__(self):
+        self.matcher = KeywordMatcher()
+        self.patterns: List[Tuple[re.Pattern, str]] = []
+        # 路径字符串 -> 路径列表
+        self.paths: Dict[str, List[str]] = {}
+
+    @property
+    def size(self) -> int:
+        return self.matcher.size + len(self.patterns)
+
+    @classmethod
+    def compile(cls, categories, rule_rows: Iterable[Tuple[int, str, str]]) -> "CategoryRules":
+        """
+        编译规则表
+
+        Args:
+            categories: 已构建好的分类数据
+            rule_rows: (分类id, keywords, regex)，只有叶子分类的规则生效
+
+        Returns:
+            规则表
+        """
+        rules = cls()
+        leaf_paths = {"-".join(path): path for path in categories.leaf_paths()}
+        for cat_id, keywords, regex in rule_rows:
+            path_str = "-".join(cls._node_path(categories.nodes, cat_id))
+            if path_str not in leaf_paths:
+                logger.warning(f"分类规则只能配置在叶子分类上，已忽略: {path_str}")
+                continue
+            rules.paths[path_str] = leaf_paths[path_str]
+            for keyword in (keywords or "").split("|"):
+                if keyword.strip():
+                    rules.matcher.add(keyword.strip(), path_str)
+            if regex and regex.strip():
+                try:
+                    rules.patterns.append((re.compile(regex.strip()), path_str))
+                except re.error as e:
+                    logger.warning(f"分类规则正则无效，已忽略: {path_str} {regex} ({e})")
+        rules.matcher.build()
+        if rules.size:
+            logger.info(f"分类规则编译完成 - 规则数: {rules.size}, 覆盖分类: {len(rules.paths)}")
+        return rules
+
+    def match(self, conversation: str) -> Tuple[Optional[List[str]], Dict[str, List[str]]]:
+        """
+        匹配对话中的客户发言
+
+        Returns:
+            (唯一命中的分类路径或 None, 命中详情 {路径字符串: [命中的关键词/正则]})
+        """
+        if not self.size or not conversation:
+            return None, {}
+
+        text = self._customer_text(conversation)
+        hits: Dict[str, List[str]] = {}
+        for _, keyword, path_str in self.matcher.iter_matches(text):
+            hits.setdefault(path_str, []).append(keyword)
+        for pattern, path_str in self.patterns:
+            if pattern.search(text):
+                hits.setdefault(path_str, []).append(pattern.pattern)
+
+        if len(hits) == 1:
+            return self.paths[next(iter(hits))], hits
+        return None, hits
+
+    @staticmethod
+    def _customer_text(conversation: str) -> str:
+        """只保留客户发言（没有说话人标记的对话使用全文）"""
+        lines = [line for line in conversation.split("\n") if line.startswith(CUSTOMER_PREFIX)]
+        return "\n".join(lines) if lines else conversation
+
+    @staticmethod
+    def _node_path(nodes: Dict[int, Dict], cat_id: int) -> List[str]:
+        """沿 parent_id 回溯得到节点的完整路径"""
+        path = []
+        node = nodes.get(cat_id)
+        while node is not None:
+            path.append(node['name'])
+            node = nodes.get(node['parent_id'])
+        return path[::-1]
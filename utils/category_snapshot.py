@@ -0,0 +1,71 @@
+"""
+分类数据快照
+解析好的 CategoryData（含预渲染选项块、路径索引与编译后的规则）用 pickle 保存。
+文件先写一个小的头部（快照键），再写分类数据；快照键由快照格式、分类文件内容哈希和提示词版本组成，
+启动时键一致即直接加载快照，无需用 pandas 解析 CSV。
+快照只应由本服务写入（pickle 不能加载不可信文件）
+"""
+import os
+import pickle
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from config.settings import settings
+from models.schemas import CategoryData
+
+# CategoryData 结构或加载逻辑变化时递增，使旧快照失效
+SNAPSHOT_FORMAT = 1
+
+
+def snapshot_path(csv_path: Path) -> Optional[Path]:
+    """快照文件路径（未启用时返回 None，未配置路径时放在分类文件旁）"""
+    if not settings.category_snapshot_enabled:
+        return None
+    if settings.category_snapshot_path:
+        return Path(settings.category_snapshot_path)
+    return csv_path.with_name(csv_path.name + ".snapshot")
+
+
+def snapshot_key(source_hash: str, prompts_version: str) -> str:
+    """快照键：格式版本 + 分类文件内容哈希 + 提示词版本（选项块随提示词渲染）"""
+    return f"{SNAPSHOT_FORMAT}:{source_hash}:{prompts_version}"
+
+
+def load_snapshot(path: Path, key: str) -> Optional[CategoryData]:
+    """
+    加载快照
+
+    Returns:
+        快照键一致时返回分类数据；文件不存在、已过期或损坏时返回 None
+    """
+    try:
+        with open(path, "rb") as f:
+            if pickle.load(f) != key:
+                logger.info(f"分类快照已过期，重新解析分类文件: {path}")
+                return None
+            categories = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"分类快照读取失败，重新解析分类文件: {path} ({e})")
+        return None
+    return categories if isinstance(categories, CategoryData) else None
+
+
+def save_snapshot(path: Path, key: str, categories: CategoryData) -> None:
+    """写入快照（先写临时文件再替换，并发启动的进程不会读到半个文件）；写入失败只记录警告"""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(categories, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        logger.info(f"分类快照已写入: {path}")
+    except Exception as e:
+        logger.warning(f"分类快照写入失败（不影响使用）: {path} ({e})")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,158 @@
+"""
+分类树热更新
+CategoryStore 保存当前分类树：重新加载时在请求路径之外构建新的 CategoryData，
+构建成功后原子替换并递增版本号（generation）；构建失败时继续使用旧分类树。
+每个请求开始时用 use_categories 固定当时的分类树，处理中的请求始终使用同一棵树，
+替换只影响之后开始的请求。
+CategoryFileWatcher 轮询分类文件的修改时间，变化时触发重新加载
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from loguru import logger
+
+from models.schemas import CategoryData
+
+# 当前请求固定使用的分类树（未固定时为 None）
+_pinned_categories: ContextVar[Optional[CategoryData]] = ContextVar("category_tree", default=None)
+
+
+def pinned_categories(default: Optional[CategoryData] = None) -> Optional[CategoryData]:
+    """当前请求固定的分类树，未固定时返回 default"""
+    pinned = _pinned_categories.get()
+    return pinned if pinned is not None else default
+
+
+@contextmanager
+def use_categories(categories: CategoryData) -> Iterator[CategoryData]:
+    """在上下文内固定分类树（子任务、复制上下文的线程均继承）"""
+    token = _pinned_categories.set(categories)
+    try:
+        yield categories
+    finally:
+        _pinned_categories.reset(token)
+
+
+class CategoryStore:
+    """当前分类树及其版本号（读无锁，重新加载串行执行）"""
+
+    def __init__(self, loader: Callable[[], CategoryData]):
+        """
+        Args:
+            loader: 构建分类数据的函数（每次调用返回新的 CategoryData）
+        """
+        self._loader = loader
+        self._reload_lock = threading.Lock()
+        self.categories = loader()
+        self.generation = 1
+        self.loaded_at = time.time()
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def reload(
+        self,
+        force: bool = False,
+        on_swap: Optional[Callable[[CategoryData, CategoryData], Any]] = None
+    ) -> Optional[Tuple[CategoryData, CategoryData]]:
+        """
+        重新加载分类树
+
+        Args:
+            force: 内容未变化时也替换
+            on_swap: 替换后调用 on_swap(旧分类树, 新分类树)（仍持有重新加载锁，多次重新加载按顺序生效）
+
+        Returns:
+            替换成功时返回 (旧分类树, 新分类树)；内容未变化返回 None
+
+        Raises:
+            加载失败时抛出原异常（当前分类树保持不变）
+        """
+        with self._reload_lock:
+            try:
+                categories = self._loader()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                raise
+
+            old = self.categories
+            if not force and categories.version == old.version:
+                logger.info(f"分类文件内容未变化，跳过替换 - 版本: {old.version}")
+                return None
+
+            # 单次属性赋值即原子替换：已固定旧分类树的请求不受影响
+            self.categories = categories
+            self.generation += 1
+            self.loaded_at = time.time()
+            self.reloads += 1
+            self.last_error = None
+            if on_swap is not None:
+                on_swap(old, categories)
+            logger.success(
+                f"分类树已替换 - 版本: {old.version} -> {categories.version}, 代数: {self.generation}"
+            )
+            return old, categories
+
+    def stats(self) -> Dict[str, Any]:
+        """分类树版本信息"""
+        return {
+            "version": self.categories.version,
+            "generation": self.generation,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+
+
+class CategoryFileWatcher:
+    """轮询分类文件（修改时间 + 大小），变化时调用回调（后台守护线程）"""
+
+    def __init__(self, path: str, callback: Callable[[], Any], interval: float):
+        self.path = Path(path)
+        self.callback = callback
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._signature = self._stat()
+
+    def start(self) -> "CategoryFileWatcher":
+        self._thread = threading.Thread(target=self._loop, name="category-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"分类文件监听已启动: {self.path} (间隔 {self.interval}s)")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def check(self) -> bool:
+        """检查一次文件是否变化，变化时调用回调；返回是否触发"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        logger.info(f"检测到分类文件变化: {self.path}")
+        try:
+            self.callback()
+        except Exception as e:
+            logger.error(f"分类文件变化后重新加载失败，继续使用旧分类树: {e}")
+        return True
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            # 文件正在被替换（先删后写）时暂时不存在，下次轮询再检查
+            return None
+        return stat.st_mtime_ns, stat.st_size
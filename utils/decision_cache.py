@@ -0,0 +1,79 @@
+"""
+分类决策缓存
+缓存单级分类决策：(清洗后对话, 当前路径, 级别, 选项指纹) -> 分类名称
+选项指纹由该级可选分类的渲染内容计算，分类树只改动某个分支时，
+其余分支的决策仍可复用
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional
+
+from loguru import logger
+
+
+class LevelDecisionCache:
+    """有界 LRU 决策缓存（线程安全）"""
+
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        # key -> (选项指纹, 分类名称)
+        self._entries: "OrderedDict[str, tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """查询决策，未命中返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, fingerprint: str, category: str) -> None:
+        """写入决策，超过容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = (fingerprint, category)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def retain_fingerprints(self, valid_fingerprints: Iterable[str]) -> int:
+        """分类树重新加载后，删除选项已变化的决策
+
+        Args:
+            valid_fingerprints: 新分类树下所有有效的选项指纹
+
+        Returns:
+            删除的条目数
+        """
+        valid = set(valid_fingerprints)
+        with self._lock:
+            stale = [key for key, (fp, _) in self._entries.items() if fp not in valid]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.info(f"分类决策缓存失效 {len(stale)} 条")
+        return len(stale)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
@@ -0,0 +1,64 @@
+"""
+Aho-Corasick 多关键词匹配
+所有关键词编译为一个自动机，对文本只扫描一遍即可找出全部命中的关键词
+"""
+from collections import deque
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class KeywordMatcher:
+    """Aho-Corasick 自动机（构建后只读，可在多线程中共享）"""
+
+    def __init__(self):
+        # 每个状态：子节点 goto 表、失败指针、输出（关键词, 关联值）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, Any]]] = [[]]
+        self.size = 0
+
+    def add(self, keyword: str, value: Any) -> None:
+        """添加关键词（需在 build 之前调用）"""
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((keyword, value))
+        self.size += 1
+
+    def build(self) -> "KeywordMatcher":
+        """计算失败指针（BFS），并把后缀状态的输出合并到当前状态"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str, Any]]:
+        """
+        扫描文本
+
+        Yields:
+            (关键词结束位置, 关键词, 关联值)
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, value in output[state]:
+                yield index, keyword, value
@@ -3,15 +3,23 @@ LLM客户端封装 - 使用 LangChain 1.0
 支持基于OpenAI兼容接口的模型（如qwen-max）
 参考: web2json-agent/utils/llm_client.py
 """
+import asyncio
 import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Literal
+from typing import List, Dict, Any, Optional, Literal, AsyncIterator, Iterator
 
-import tiktoken
+import httpx
+import openai
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from loguru import logger
 from config.settings import settings
+from utils.rate_limiter import AdaptiveRateLimiter, backoff_delay
+from utils.tokenizer import get_tokenizer
 
 # 加载项目根目录的 .env 文件
 project_root = Path(__file__).parent.parent
@@ -25,6 +33,9 @@ if not os.getenv("OPENAI_API_KEY"):
 # 定义场景类型
 ScenarioType = Literal["default", "classification", "summary"]
 
+# 当前请求的 token 用量累计（由 LLMClient.track_usage 设置，子任务共享同一个字典）
+_request_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_request_usage", default=None)
+
 
 class LLMClient:
     """LLM客户端封装类 - 基于 LangChain 1.0
@@ -41,11 +52,19 @@ class LLMClient:
     _global_total_input_tokens = 0
     _global_total_completion_tokens = 0
     _global_total_tokens = 0
+    _global_total_cached_tokens = 0
     _global_request_count = 0
+    # 因达到 max_tokens 被截断（finish_reason=length）的响应数
+    _global_truncated_count = 0
 
     # 单例字典，按 (model, api_base) 作为键
     _instances: Dict[tuple, "LLMClient"] = {}
 
+    # 所有实例共享的 HTTP 连接池（同步/异步各一个）
+    _http_client: Optional[httpx.Client] = None
+    _http_async_client: Optional[httpx.AsyncClient] = None
+    _http_lock = threading.Lock()
+
     def __new__(cls, api_key: Optional[str] = None, api_base: Optional[str] = None,
                 model: Optional[str] = None, temperature: float = 0.3):
         """使用单例模式，确保相同配置的客户端共享实例"""
@@ -87,30 +106,139 @@ class LLMClient:
         self.model = model or settings.default_model
         self.temperature = temperature
 
-        # 初始化 tokenizer 用于本地 token 计数（可选）
-        self.tokenizer = None
-        try:
-            self.tokenizer = tiktoken.encoding_for_model(self.model)
-        except (KeyError, Exception) as e:
-            # 如果模型不在 tiktoken 的预设中或网络问题，尝试使用 cl100k_base
-            try:
-                self.tokenizer = tiktoken.get_encoding("cl100k_base")
-            except Exception as e2:
-                # 如果tiktoken完全不可用，设置为None，后续估算将被跳过
-                logger.warning(f"Tokenizer初始化失败，token统计将不可用: {e2}")
-                self.tokenizer = None
-
-        # 使用 LangChain 1.0 的 ChatOpenAI（兼容所有OpenAI兼容接口）
-        self.client = ChatOpenAI(
-            model=self.model,
-            api_key=self.api_key,
-            base_url=self.api_base,
-            temperature=self.temperature
+        # ChatOpenAI 在首次调用时创建（共享连接池关闭后会按新连接池重新创建）
+        self._client = None
+
+        # 限流调度器：RPM/TPM 预算 + AIMD 自适应并发
+        self.limiter = AdaptiveRateLimiter(
+            rpm=settings.llm_rpm,
+            tpm=settings.llm_tpm,
+            initial_concurrency=settings.llm_initial_concurrency,
+            min_concurrency=settings.llm_min_concurrency,
+            max_concurrency=settings.llm_max_concurrency,
+            latency_target=settings.llm_latency_target,
+            lane_weights={
+                "interactive": settings.llm_interactive_weight,
+                "bulk": settings.llm_bulk_weight
+            },
+            name=self.model
         )
 
         self._initialized = True
         logger.info(f"LLM客户端初始化完成 - 模型: {self.model}, Base: {self.api_base}")
 
+    @property
+    def client(self) -> ChatOpenAI:
+        """LangChain 1.0 的 ChatOpenAI（兼容所有OpenAI兼容接口），使用共享连接池"""
+        if self._client is None:
+            # 共享连接池，避免每次调用重新建立 TCP/TLS 连接
+            http_client, http_async_client = self.get_http_clients()
+            self._client = ChatOpenAI(
+                model=self.model,
+                api_key=self.api_key,
+                base_url=self.api_base,
+                temperature=self.temperature,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                # 重试由限流调度器负责（需要感知 429 以调整并发）
+                max_retries=0
+            )
+        return self._client
+
+    @client.setter
+    def client(self, value) -> None:
+        self._client = value
+
+    @classmethod
+    def get_http_clients(cls) -> tuple:
+        """获取共享的同步/异步 HTTP 客户端（按 settings 中的连接池配置懒加载创建）
+
+        Returns:
+            (httpx.Client, httpx.AsyncClient)
+        """
+        with cls._http_lock:
+            if cls._http_client is None or cls._http_async_client is None:
+                limits = httpx.Limits(
+                    max_connections=settings.llm_http_max_connections,
+                    max_keepalive_connections=settings.llm_http_max_keepalive,
+                    keepalive_expiry=settings.llm_http_keepalive_expiry
+                )
+                timeout = httpx.Timeout(
+                    settings.llm_read_timeout,
+                    connect=settings.llm_connect_timeout
+                )
+                http2 = settings.llm_http2
+                if http2:
+                    try:
+                        import h2  # noqa: F401
+                    except ImportError:
+                        logger.warning("未安装 h2，LLM 连接回退到 HTTP/1.1")
+                        http2 = False
+
+                cls._http_client = httpx.Client(limits=limits, timeout=timeout, http2=http2)
+                cls._http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+                logger.info(
+                    f"LLM HTTP 连接池初始化完成 - 最大连接: {settings.llm_http_max_connections}, "
+                    f"保活连接: {settings.llm_http_max_keepalive}, HTTP/2: {http2}"
+                )
+            return cls._http_client, cls._http_async_client
+
+    @classmethod
+    async def awarmup(cls, connections: Optional[int] = None) -> None:
+        """预热连接池：对每个 API Base 预先建立连接（完成 DNS/TCP/TLS 握手）
+
+        使用不消耗 token 的 GET /models 请求，任何 HTTP 响应都视为连接已建立；
+        预热失败只记录警告，不影响服务启动
+
+        Args:
+            connections: 每个 API Base 预热的连接数，默认使用 settings.llm_warmup_connections
+        """
+        connections = settings.llm_warmup_connections if connections is None else connections
+        if connections <= 0 or not cls._instances:
+            return
+
+        _, http_async_client = cls.get_http_clients()
+        targets = {}
+        for instance in cls._instances.values():
+            if getattr(instance, "_initialized", False):
+                targets.setdefault(instance.api_base, instance.api_key)
+
+        async def ping(api_base: str, api_key: str) -> None:
+            await http_async_client.get(
+                f"{api_base.rstrip('/')}/models",
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=settings.llm_connect_timeout
+            )
+
+        for api_base, api_key in targets.items():
+            results = await asyncio.gather(
+                *(ping(api_base, api_key) for _ in range(connections)),
+                return_exceptions=True
+            )
+            errors = [r for r in results if isinstance(r, Exception)]
+            if errors:
+                logger.warning(f"LLM 连接预热失败 - Base: {api_base}, 错误: {errors[0]}")
+            else:
+                logger.info(f"LLM 连接预热完成 - Base: {api_base}, 连接数: {connections}")
+
+    @classmethod
+    async def aclose_http_clients(cls) -> None:
+        """
+        关闭共享的 HTTP 连接池（服务停止或事件循环结束时调用）
+
+        各单例持有的 ChatOpenAI 引用的是旧连接池，一并丢弃；之后再调用时
+        按新建的连接池重新创建（如 uvicorn 重载、main.py 中多次 asyncio.run）
+        """
+        with cls._http_lock:
+            http_client, http_async_client = cls._http_client, cls._http_async_client
+            cls._http_client = cls._http_async_client = None
+            for instance in cls._instances.values():
+                instance._client = None
+        if http_client is not None:
+            http_client.close()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
     @classmethod
     def from_settings(cls, settings_obj, model: Optional[str] = None, temperature: Optional[float] = None):
         """从Settings对象创建LLMClient
@@ -181,6 +309,11 @@ class LLMClient:
             temperature=config["temperature"]
         )
 
+    @property
+    def tokenizer(self):
+        """本地 tokenizer（首次计数时加载，同一模型在进程内共享；不可用时为 None）"""
+        return get_tokenizer(self.model)
+
     def count_tokens(self, text: str) -> int:
         """计算文本的 token 数量
 
@@ -190,32 +323,46 @@ class LLMClient:
         Returns:
             token 数量
         """
-        if not text or not self.tokenizer:
+        if not text:
+            return 0
+        tokenizer = self.tokenizer
+        if tokenizer is None:
             return 0
         try:
-            return len(self.tokenizer.encode(text))
+            return len(tokenizer.encode(text))
         except Exception:
             return 0
 
-    def update_token_count(self, input_tokens: int, completion_tokens: int = 0) -> None:
+    def update_token_count(self, input_tokens: int, completion_tokens: int = 0, cached_tokens: int = 0) -> None:
         """更新 token 计数并打印统计信息
 
         Args:
             input_tokens: 输入 token 数
             completion_tokens: 输出 token 数
+            cached_tokens: 输入中命中服务端前缀缓存的 token 数
         """
         # 更新全局统计
         LLMClient._global_total_input_tokens += input_tokens
         LLMClient._global_total_completion_tokens += completion_tokens
+        LLMClient._global_total_cached_tokens += cached_tokens
         LLMClient._global_total_tokens = (
             LLMClient._global_total_input_tokens +
             LLMClient._global_total_completion_tokens
         )
         LLMClient._global_request_count += 1
 
+        # 累计到当前请求（如果调用方开启了 track_usage）
+        request_usage = _request_usage.get()
+        if request_usage is not None:
+            request_usage["request_count"] += 1
+            request_usage["input_tokens"] += input_tokens
+            request_usage["completion_tokens"] += completion_tokens
+            request_usage["cached_tokens"] += cached_tokens
+            request_usage["total_tokens"] += input_tokens + completion_tokens
+
         # 按照指定格式打印 token 消耗
         logger.info(
-            f"Token usage: Input={input_tokens}, Completion={completion_tokens}, "
+            f"Token usage: Input={input_tokens}, Cached={cached_tokens}, Completion={completion_tokens}, "
             f"Cumulative Input={LLMClient._global_total_input_tokens}, "
             f"Cumulative Completion={LLMClient._global_total_completion_tokens}, "
             f"Total={input_tokens + completion_tokens}, "
@@ -227,51 +374,350 @@ class LLMClient:
         messages: List[Dict[str, Any]],
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
         **kwargs
     ) -> str:
         """调用聊天完成API
 
         Args:
             messages: 消息列表
-            temperature: 温度参数（可选）
-            max_tokens: 最大token数（可选）
-            **kwargs: 其他参数
+            temperature: 温度参数（可选，默认使用客户端的温度）
+            max_tokens: 最大输出token数（可选）
+            top_p: 核采样参数（可选）
+            stop: 停止序列（可选）
+            **kwargs: 其他调用参数（如 response_format），原样传给模型接口
 
         Returns:
             模型响应文本
         """
+        call_kwargs = self._call_kwargs(temperature, max_tokens, top_p, stop, kwargs)
+        estimated_tokens = self._estimate_tokens(messages)
+        attempt = 0
+        while True:
+            # 经限流调度器放行后再调用（RPM/TPM 预算 + 自适应并发）
+            self.limiter.acquire(estimated_tokens)
+            start = time.perf_counter()
+            try:
+                # 使用 LangChain 1.0 的 invoke 方法
+                response = self.client.invoke(messages, **call_kwargs)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    self.limiter.release()
+                    raise
+                delay = self._handle_call_error(e, attempt)
+                if delay is None:
+                    logger.error(f"LLM调用失败: {e}")
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            tokens_used = self._record_usage(messages, response)
+            self._check_truncated(response, call_kwargs)
+            self.limiter.release(
+                latency=time.perf_counter() - start,
+                tokens_used=tokens_used,
+                tokens_reserved=estimated_tokens
+            )
+            return response.content
+
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        **kwargs
+    ) -> str:
+        """异步调用聊天完成API（基于 ainvoke，不阻塞事件循环）
+
+        Args:
+            messages: 消息列表
+            temperature: 温度参数（可选，默认使用客户端的温度）
+            max_tokens: 最大输出token数（可选）
+            top_p: 核采样参数（可选）
+            stop: 停止序列（可选）
+            **kwargs: 其他调用参数（如 response_format），原样传给模型接口
+
+        Returns:
+            模型响应文本
+        """
+        call_kwargs = self._call_kwargs(temperature, max_tokens, top_p, stop, kwargs)
+        estimated_tokens = self._estimate_tokens(messages)
+        attempt = 0
+        while True:
+            await self.limiter.aacquire(estimated_tokens)
+            start = time.perf_counter()
+            try:
+                response = await self.client.ainvoke(messages, **call_kwargs)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # 任务被取消等情况：归还许可后直接抛出
+                    self.limiter.release()
+                    raise
+                delay = self._handle_call_error(e, attempt)
+                if delay is None:
+                    logger.error(f"LLM异步调用失败: {e}")
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            tokens_used = self._record_usage(messages, response)
+            self._check_truncated(response, call_kwargs)
+            self.limiter.release(
+                latency=time.perf_counter() - start,
+                tokens_used=tokens_used,
+                tokens_reserved=estimated_tokens
+            )
+            return response.content
+
+    async def astream_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """流式调用聊天完成API（基于 astream），逐段产出模型输出的文本
+
+        与 achat_completion 共用限流调度；只有在尚未产出任何内容时才会重试，
+        流结束后按服务端返回的 usage（stream_usage）记录 token 用量
+
+        Args:
+            messages: 消息列表
+            temperature: 温度参数（可选，默认使用客户端的温度）
+            max_tokens: 最大输出token数（可选）
+            top_p: 核采样参数（可选）
+            stop: 停止序列（可选）
+            **kwargs: 其他参数
+
+        Yields:
+            模型输出的文本片段
+        """
+        call_kwargs = self._call_kwargs(temperature, max_tokens, top_p, stop, kwargs)
+        estimated_tokens = self._estimate_tokens(messages)
+        attempt = 0
+        while True:
+            await self.limiter.aacquire(estimated_tokens)
+            start = time.perf_counter()
+            aggregated = None
+            started = False
+            try:
+                async for chunk in self.client.astream(messages, stream_usage=True, **call_kwargs):
+                    aggregated = chunk if aggregated is None else aggregated + chunk
+                    if chunk.content:
+                        started = True
+                        yield chunk.content
+            except BaseException as e:
+                if not isinstance(e, Exception) or started:
+                    # 取消、调用方提前结束或已输出部分内容：不再重试
+                    self.limiter.release()
+                    if isinstance(e, Exception):
+                        logger.error(f"LLM流式调用中断: {e}")
+                    raise
+                delay = self._handle_call_error(e, attempt)
+                if delay is None:
+                    logger.error(f"LLM流式调用失败: {e}")
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            tokens_used = 0
+            if aggregated is not None:
+                tokens_used = self._record_usage(messages, aggregated)
+                self._check_truncated(aggregated, call_kwargs)
+            self.limiter.release(
+                latency=time.perf_counter() - start,
+                tokens_used=tokens_used,
+                tokens_reserved=estimated_tokens
+            )
+            return
+
+    @staticmethod
+    @contextmanager
+    def track_usage() -> Iterator[Dict[str, int]]:
+        """统计上下文内（含其创建的子任务）所有 LLM 调用的 token 用量
+
+        Examples:
+            >>> with LLMClient.track_usage() as usage:
+            ...     await analyzer.aanalyze(request)
+            >>> usage["total_tokens"]
+        """
+        usage = {
+            "request_count": 0,
+            "input_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "total_tokens": 0,
+            "truncated": 0
+        }
+        token = _request_usage.set(usage)
         try:
-            # 使用 LangChain 1.0 的 invoke 方法
-            response = self.client.invoke(messages)
+            yield usage
+        finally:
+            _request_usage.reset(token)
 
-            # 从响应中提取 token 使用情况
-            if hasattr(response, 'response_metadata') and 'token_usage' in response.response_metadata:
-                usage = response.response_metadata['token_usage']
-                prompt_tokens = usage.get('prompt_tokens', 0)
-                completion_tokens = usage.get('completion_tokens', 0)
+    @staticmethod
+    def generation_params(scenario: ScenarioType = "default") -> Dict[str, Any]:
+        """场景的生成参数（max_tokens / top_p / stop），按当前配置读取
 
-                # 更新并打印 token 统计
-                self.update_token_count(prompt_tokens, completion_tokens)
-            else:
-                # 如果无法从响应中获取，尝试估算
-                logger.warning("无法从响应中获取 token 使用信息，将进行估算")
-                # 估算输入 token
-                input_text = ""
-                for msg in messages:
-                    if isinstance(msg, dict) and 'content' in msg:
-                        input_text += str(msg['content'])
-                input_tokens = self.count_tokens(input_text)
+        Examples:
+            >>> llm.chat_completion(messages, **LLMClient.generation_params("classification"))
+        """
+        if scenario == "classification":
+            return {
+                "max_tokens": settings.classification_max_tokens,
+                "top_p": settings.classification_top_p,
+                "stop": settings.classification_stop or None
+            }
+        if scenario == "summary":
+            return {
+                "max_tokens": settings.summary_max_tokens,
+                "top_p": settings.summary_top_p,
+                "stop": settings.summary_stop or None
+            }
+        return {}
+
+    @staticmethod
+    def _call_kwargs(
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        top_p: Optional[float],
+        stop: Optional[List[str]],
+        extra: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """组装传给模型接口的参数（未指定的参数不传，由客户端/服务端默认值决定）
+
+        ChatOpenAI 会把 max_tokens 改名为 max_completion_tokens，而 DeepSeek/DashScope 等
+        OpenAI 兼容服务只识别 max_tokens，因此通过 extra_body 按原字段名发送
+        """
+        params = {"temperature": temperature, "top_p": top_p, "stop": stop}
+        call_kwargs = {key: value for key, value in params.items() if value is not None}
+        call_kwargs.update(extra)
+        if max_tokens is not None:
+            call_kwargs["extra_body"] = {**(call_kwargs.get("extra_body") or {}), "max_tokens": max_tokens}
+        return call_kwargs
+
+    def _check_truncated(self, response: Any, call_kwargs: Dict[str, Any]) -> bool:
+        """检查响应是否因达到 max_tokens 被截断，截断时计入统计"""
+        metadata = getattr(response, "response_metadata", None) or {}
+        if metadata.get("finish_reason") != "length":
+            return False
+
+        LLMClient._global_truncated_count += 1
+        request_usage = _request_usage.get()
+        if request_usage is not None:
+            request_usage["truncated"] += 1
+        logger.warning(
+            f"LLM输出达到 max_tokens={call_kwargs.get('extra_body', {}).get('max_tokens')} 被截断 "
+            f"(模型: {self.model}, 累计截断: {LLMClient._global_truncated_count})"
+        )
+        return True
 
-                # 估算输出 token
-                completion_tokens = self.count_tokens(response.content)
+    def _handle_call_error(self, error: Exception, attempt: int) -> Optional[float]:
+        """处理调用异常：归还许可并反馈给调度器
 
-                self.update_token_count(input_tokens, completion_tokens)
+        Returns:
+            重试前需要等待的秒数；不可重试或重试次数用尽时返回 None
+        """
+        status_code = getattr(error, "status_code", None)
+        throttled = status_code == 429
+        retry_after = self._retry_after(error) if throttled else None
+        self.limiter.release(throttled=throttled, retry_after=retry_after)
+
+        retryable = (
+            throttled
+            or (status_code is not None and status_code >= 500)
+            or isinstance(error, (openai.APIConnectionError, openai.APITimeoutError))
+        )
+        if not retryable or attempt >= settings.llm_max_retries:
+            return None
 
-            return response.content
+        delay = backoff_delay(attempt, settings.llm_backoff_base, settings.llm_backoff_max, retry_after)
+        logger.warning(
+            f"LLM调用{'被限流' if throttled else '失败'}（{error.__class__.__name__}），"
+            f"{delay:.2f}秒后重试 ({attempt + 1}/{settings.llm_max_retries})"
+        )
+        return delay
 
-        except Exception as e:
-            logger.error(f"LLM调用失败: {e}")
-            raise
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """读取 429 响应中的 Retry-After 头（秒）"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def _estimate_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """预估请求的输入 token 数（用于 TPM 预算，tokenizer 不可用时按字符数估算）"""
+        text = "".join(
+            str(msg['content']) for msg in messages
+            if isinstance(msg, dict) and 'content' in msg
+        )
+        return self.count_tokens(text) or len(text)
+
+    def _record_usage(self, messages: List[Dict[str, Any]], response: Any) -> int:
+        """从响应中提取 token 使用情况并更新统计
+
+        Args:
+            messages: 请求消息列表
+            response: 模型响应
+
+        Returns:
+            本次调用消耗的总 token 数
+        """
+        if hasattr(response, 'response_metadata') and 'token_usage' in response.response_metadata:
+            usage = response.response_metadata['token_usage']
+            prompt_tokens = usage.get('prompt_tokens', 0)
+            completion_tokens = usage.get('completion_tokens', 0)
+            cached_tokens = self._extract_cached_tokens(usage)
+
+            # 更新并打印 token 统计
+            self.update_token_count(prompt_tokens, completion_tokens, cached_tokens)
+            return prompt_tokens + completion_tokens
+        elif getattr(response, 'usage_metadata', None):
+            # 流式响应：usage 由 LangChain 汇总在 usage_metadata 中
+            usage = response.usage_metadata
+            prompt_tokens = usage.get('input_tokens', 0)
+            completion_tokens = usage.get('output_tokens', 0)
+            cached_tokens = (usage.get('input_token_details') or {}).get('cache_read', 0)
+
+            self.update_token_count(prompt_tokens, completion_tokens, cached_tokens)
+            return prompt_tokens + completion_tokens
+        else:
+            # 如果无法从响应中获取，尝试估算
+            logger.warning("无法从响应中获取 token 使用信息，将进行估算")
+            # 估算输入 token
+            input_text = ""
+            for msg in messages:
+                if isinstance(msg, dict) and 'content' in msg:
+                    input_text += str(msg['content'])
+            input_tokens = self.count_tokens(input_text)
+
+            # 估算输出 token
+            completion_tokens = self.count_tokens(response.content)
+
+            self.update_token_count(input_tokens, completion_tokens)
+            return input_tokens + completion_tokens
+
+    @staticmethod
+    def _extract_cached_tokens(usage: Dict[str, Any]) -> int:
+        """提取命中前缀缓存的输入 token 数
+
+        OpenAI/DashScope 返回 prompt_tokens_details.cached_tokens，
+        DeepSeek 返回 prompt_cache_hit_tokens
+        """
+        details = usage.get('prompt_tokens_details') or {}
+        cached_tokens = details.get('cached_tokens') or usage.get('prompt_cache_hit_tokens') or 0
+        return int(cached_tokens)
 
     @classmethod
     def get_total_usage(cls) -> Dict[str, int]:
@@ -284,7 +730,18 @@ class LLMClient:
             "request_count": cls._global_request_count,
             "total_input_tokens": cls._global_total_input_tokens,
             "total_completion_tokens": cls._global_total_completion_tokens,
-            "total_tokens": cls._global_total_tokens
+            "total_cached_tokens": cls._global_total_cached_tokens,
+            "total_tokens": cls._global_total_tokens,
+            "truncated_count": cls._global_truncated_count
+        }
+
+    @classmethod
+    def get_limiter_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """获取各模型客户端的限流调度统计"""
+        return {
+            f"{model}@{api_base}": instance.limiter.stats()
+            for (model, api_base), instance in cls._instances.items()
+            if getattr(instance, "_initialized", False)
         }
 
     @classmethod
@@ -293,5 +750,7 @@ class LLMClient:
         cls._global_total_input_tokens = 0
         cls._global_total_completion_tokens = 0
         cls._global_total_tokens = 0
+        cls._global_total_cached_tokens = 0
         cls._global_request_count = 0
+        cls._global_truncated_count = 0
         logger.info("Token使用统计已重置")
@@ -0,0 +1,130 @@
+"""
+近邻检索索引
+对已标注的历史对话建立向量索引，查询与新对话最相似的 top-k 条记录：
+- tfidf: 字符 n-gram TF-IDF 稀疏向量 + numpy 倒排表（无需额外安装向量模型）
+- embedding: sentence-transformers 本地 CPU 向量模型（需要安装，未安装时回退到 tfidf）
+numpy 在建立/查询索引时才导入，未启用预分类时不拖慢服务启动
+"""
+import math
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from utils.ngrams import char_ngrams
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class TfidfIndex:
+    """字符 n-gram TF-IDF 索引（余弦相似度，倒排表累加点积）"""
+
+    def __init__(self, ngram_range: Tuple[int, int] = (2, 3), max_df: float = 0.5):
+        self.ngram_range = ngram_range
+        # 出现在超过该比例文档中的 n-gram（如"客户""客服"）不参与检索
+        self.max_df = max_df
+        self.idf: Dict[str, float] = {}
+        # n-gram -> (文档序号数组, 权重数组)
+        self.postings: Dict[str, Tuple["np.ndarray", "np.ndarray"]] = {}
+        self.size = 0
+
+    def fit(self, texts: Sequence[str]) -> "TfidfIndex":
+        """建立索引"""
+        import numpy as np
+
+        counts = [char_ngrams(text, self.ngram_range) for text in texts]
+        self.size = len(counts)
+        df = Counter(term for grams in counts for term in grams)
+        max_count = max(1, int(self.max_df * self.size)) if self.size > 1 else 1
+        self.idf = {
+            term: math.log((1 + self.size) / (1 + freq)) + 1
+            for term, freq in df.items() if freq <= max_count
+        }
+
+        postings: Dict[str, Tuple[List[int], List[float]]] = defaultdict(lambda: ([], []))
+        for doc_id, grams in enumerate(counts):
+            for term, weight in self._vectorize(grams).items():
+                doc_ids, weights = postings[term]
+                doc_ids.append(doc_id)
+                weights.append(weight)
+        self.postings = {
+            term: (np.asarray(doc_ids, dtype=np.int32), np.asarray(weights, dtype=np.float32))
+            for term, (doc_ids, weights) in postings.items()
+        }
+        return self
+
+    def search(self, text: str, k: int) -> List[Tuple[int, float]]:
+        """返回最相似的 k 条记录 [(文档序号, 相似度)]"""
+        if not self.size:
+            return []
+        import numpy as np
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term, weight in self._vectorize(char_ngrams(text, self.ngram_range)).items():
+            posting = self.postings.get(term)
+            if posting is not None:
+                # 同一 n-gram 的倒排表中文档序号不重复，可以直接按下标累加
+                scores[posting[0]] += weight * posting[1]
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in top if scores[doc_id] > 0]
+
+    def _vectorize(self, grams: Counter) -> Dict[str, float]:
+        """次线性 TF × IDF，L2 归一化"""
+        vector = {
+            term: (1 + math.log(count)) * self.idf[term]
+            for term, count in grams.items() if term in self.idf
+        }
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if not norm:
+            return {}
+        return {term: value / norm for term, value in vector.items()}
+
+
+class EmbeddingIndex:
+    """本地向量模型索引（sentence-transformers，归一化向量内积即余弦相似度）"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.vectors = None
+        self.size = 0
+
+    def fit(self, texts: Sequence[str]) -> "EmbeddingIndex":
+        """建立索引"""
+        self.vectors = self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        self.size = len(texts)
+        return self
+
+    def search(self, text: str, k: int) -> List[Tuple[int, float]]:
+        """返回最相似的 k 条记录 [(文档序号, 相似度)]"""
+        if not self.size:
+            return []
+        query = self.model.encode([text], normalize_embeddings=True, convert_to_numpy=True)[0]
+        scores = self.vectors @ query
+        top = scores.argsort()[::-1][:k]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in top]
+
+
+def build_index(texts: Sequence[str], embedding_model: Optional[str] = None):
+    """
+    建立近邻索引
+
+    Args:
+        texts: 文档列表
+        embedding_model: 本地向量模型名称或路径，为空或不可用时使用字符 n-gram TF-IDF
+
+    Returns:
+        TfidfIndex 或 EmbeddingIndex
+    """
+    if embedding_model:
+        try:
+            return EmbeddingIndex(embedding_model).fit(texts)
+        except ImportError:
+            logger.warning("未安装 sentence-transformers，近邻索引回退到字符 n-gram TF-IDF")
+        except Exception as e:
+            logger.warning(f"向量模型 {embedding_model} 加载失败（{e}），近邻索引回退到字符 n-gram TF-IDF")
+    return TfidfIndex().fit(texts)
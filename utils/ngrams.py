@@ -0,0 +1,15 @@
+"""
+字符 n-gram 提取（纯 Python，不依赖 numpy，可在启动路径上使用）
+"""
+from collections import Counter
+from typing import Tuple
+
+
+def char_ngrams(text: str, ngram_range: Tuple[int, int] = (2, 3)) -> Counter:
+    """提取字符 n-gram（忽略空白）"""
+    text = "".join(text.split())
+    grams = Counter()
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    return grams
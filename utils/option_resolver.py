@@ -0,0 +1,158 @@
+"""
+分类结果本地纠正
+模型输出不在可选项中时，先在本地尝试把输出映射到唯一的选项，再决定是否重试：
+1. exact       去掉【】后与选项完全一致
+2. normalized  全半角/空白/标点/引号/"分类："等前缀归一化后一致
+3. bracket     冗长回答中【】内恰好只提到一个合法选项
+4. substring   回答中包含选项名称（取最长的唯一匹配）
+5. fuzzy       编辑距离相似度超过阈值且明显优于次优选项（仅用于短回答）
+"""
+import difflib
+import json
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 归一化时去掉的字符：空白、常见中英文标点、引号、书名号等
+_STRIP_CHARS_RE = re.compile(r"[\s`'\"“”‘’「」『』《》<>【】\[\]()（）:：,，.。;；!！?？*#]+")
+# 回答开头常见的说明前缀，如 "分类：" "一级分类为" "答案是"
+_PREFIX_RE = re.compile(r"^(?:[一二三]级)?(?:分类(?:结果|名称|路径)?|类别|答案|结果)(?:是|为)?")
+_BRACKET_RE = re.compile(r"【([^【】]+)】")
+
+
+def normalize(text: str) -> str:
+    """归一化文本（全角转半角、去空白标点、去说明前缀、小写）"""
+    text = unicodedata.normalize("NFKC", text or "").strip()
+    text = _PREFIX_RE.sub("", _STRIP_CHARS_RE.sub("", text))
+    return text.lower()
+
+
+class OptionResolver:
+    """把模型输出映射到可选项之一，并统计各种纠正方式的命中次数（线程安全）"""
+
+    def __init__(self, fuzzy_threshold: float = 0.8):
+        self.fuzzy_threshold = fuzzy_threshold
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, answer: str, options: List[str]) -> Tuple[Optional[str], str]:
+        """
+        解析模型输出
+
+        Args:
+            answer: 模型原始输出
+            options: 可选项
+
+        Returns:
+            (匹配的选项, 匹配方式)，无法唯一确定时返回 (None, "unresolved")
+        """
+        option_set = set(options)
+        stripped = (answer or "").strip().strip("【】").strip()
+        if stripped in option_set:
+            return self._hit(stripped, "exact")
+
+        normalized_options: Dict[str, List[str]] = {}
+        for option in options:
+            normalized_options.setdefault(normalize(option), []).append(option)
+
+        match = self._unique(normalized_options.get(normalize(answer)))
+        if match is not None:
+            return self._hit(match, "normalized")
+
+        bracketed = set()
+        for name in _BRACKET_RE.findall(answer or ""):
+            if name.strip() in option_set:
+                bracketed.add(name.strip())
+            else:
+                bracketed.update(normalized_options.get(normalize(name), []))
+        if len(bracketed) == 1:
+            return self._hit(bracketed.pop(), "bracket")
+
+        match = self._longest_substring(answer or "", options)
+        if match is not None:
+            return self._hit(match, "substring")
+
+        match = self._fuzzy(normalize(answer), normalized_options)
+        if match is not None:
+            return self._hit(match, "fuzzy")
+
+        return self._hit(None, "unresolved")
+
+    def record(self, event: str) -> None:
+        """记录一次其他事件（如 retry / fallback / constrained）"""
+        with self._lock:
+            self._counts[event] = self._counts.get(event, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        """各匹配方式及事件的累计次数"""
+        with self._lock:
+            return dict(self._counts)
+
+    def _hit(self, option: Optional[str], method: str) -> Tuple[Optional[str], str]:
+        self.record(method)
+        return option, method
+
+    @staticmethod
+    def _unique(candidates: Optional[Iterable[str]]) -> Optional[str]:
+        candidates = set(candidates or [])
+        return candidates.pop() if len(candidates) == 1 else None
+
+    @staticmethod
+    def _longest_substring(answer: str, options: List[str]) -> Optional[str]:
+        """回答中出现的选项名称：取最长者，其余匹配必须是它的子串（如"扣款"之于"取消扣款"）"""
+        found = {option for option in options if option and option in answer}
+        if not found:
+            return None
+        longest = max(found, key=len)
+        if all(option in longest for option in found):
+            return longest
+        return None
+
+    def _fuzzy(self, answer: str, normalized_options: Dict[str, List[str]]) -> Optional[str]:
+        """编辑距离相似度匹配：只处理与选项长度相近的短回答"""
+        if not answer or not normalized_options:
+            return None
+        max_len = max(len(key) for key in normalized_options)
+        if len(answer) > max_len * 2:
+            return None
+
+        scored = sorted(
+            ((difflib.SequenceMatcher(None, answer, key).ratio(), key) for key in normalized_options),
+            reverse=True
+        )
+        best_score, best_key = scored[0]
+        second_score = scored[1][0] if len(scored) > 1 else 0.0
+        if best_score >= self.fuzzy_threshold and best_score - second_score >= 0.1:
+            return self._unique(normalized_options[best_key])
+        return None
+
+
+def enum_response_format(options: List[str], key: str = "category") -> Dict:
+    """构造约束输出的 response_format：JSON 对象，唯一字段取值限定为可选项之一"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": f"{key}_choice",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {key: {"type": "string", "enum": list(options)}},
+                "required": [key],
+                "additionalProperties": False
+            }
+        }
+    }
+
+
+def extract_answer(result: str, key: str = "category") -> str:
+    """提取模型输出中的答案：约束输出模式下为 JSON 对象中的字段值，否则为原文"""
+    text = (result or "").strip()
+    if text.startswith("{"):
+        try:
+            value = json.loads(text).get(key)
+        except (ValueError, AttributeError):
+            value = None
+        if isinstance(value, str):
+            return value
+    return text
@@ -0,0 +1,373 @@
+"""
+LLM 调用限流调度器
+- 请求数/分钟（RPM）与 token 数/分钟（TPM）令牌桶预算
+- AIMD 自适应并发：成功时加性增长，遇到 429 或延迟超标时乘性减小
+- 优先级通道：实时（interactive）与批量（bulk）调用分别排队，按权重调度，
+  同一通道内先进先出；同时支持线程（同步）与协程（异步）调用方
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from loguru import logger
+
+
+# 优先级通道（按优先级从高到低）
+LANES = ("interactive", "bulk")
+DEFAULT_LANE = "interactive"
+
+# 当前调用所属通道（由编排层按请求设置，LLM 调用时读取）
+_current_lane: ContextVar[str] = ContextVar("llm_lane", default=DEFAULT_LANE)
+
+
+def resolve_lane(lane: Optional[str]) -> str:
+    """校验通道名称，为空或未知时使用默认通道"""
+    if not lane:
+        return DEFAULT_LANE
+    if lane not in LANES:
+        logger.warning(f"未知的优先级通道 '{lane}'，使用 {DEFAULT_LANE}")
+        return DEFAULT_LANE
+    return lane
+
+
+def current_lane() -> str:
+    """当前上下文的优先级通道"""
+    return _current_lane.get()
+
+
+@contextmanager
+def use_lane(lane: Optional[str]) -> Iterator[str]:
+    """在上下文中设置优先级通道（协程内创建的子任务会继承该设置）"""
+    token = _current_lane.set(resolve_lane(lane))
+    try:
+        yield _current_lane.get()
+    finally:
+        _current_lane.reset(token)
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 1.0,
+    cap: float = 30.0,
+    retry_after: Optional[float] = None
+) -> float:
+    """计算带抖动的指数退避时间（full jitter），服务端给出 Retry-After 时不短于该值"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class _TokenBucket:
+    """按分钟额度匀速补充的令牌桶，额度为 0 表示不限制"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._rate = float(per_minute) / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+            self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """距离可取出 amount 个令牌还需等待的秒数"""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self._rate
+
+    def consume(self, amount: float, now: float) -> None:
+        """取出令牌（amount 为负数时归还），允许透支，透支部分由后续请求等待补齐"""
+        if self.capacity <= 0:
+            return
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+class _Waiter:
+    """排队中的一次调用"""
+    __slots__ = ("tokens", "lane", "admitted", "enqueued_at", "event", "loop")
+
+    def __init__(self, tokens: int, lane: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.tokens = tokens
+        self.lane = lane
+        self.admitted = False
+        self.enqueued_at = time.monotonic()
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    def notify(self) -> None:
+        """唤醒等待方（可跨线程调用）"""
+        if self.loop is None:
+            self.event.set()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            # 事件循环已关闭，等待方不再存在
+            pass
+
+
+class AdaptiveRateLimiter:
+    """RPM/TPM 预算 + AIMD 自适应并发 + 优先级通道的调用调度器（线程安全）
+
+    多个通道都有排队调用时按平滑加权轮询选择通道；权重为 0 的通道只在
+    其他通道都没有排队时放行（严格低优先级，只消耗剩余容量）。
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        initial_concurrency: int = 16,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        latency_target: float = 0.0,
+        decrease_factor: float = 0.5,
+        lane_weights: Optional[Dict[str, int]] = None,
+        name: str = ""
+    ):
+        self.name = name
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self._requests = _TokenBucket(rpm)
+        self._tokens = _TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self.lane_weights = {lane: 1 for lane in LANES}
+        self.lane_weights.update(lane_weights or {})
+        self._waiters: Dict[str, "deque[_Waiter]"] = {lane: deque() for lane in LANES}
+        self._lane_credit = {lane: 0 for lane in LANES}
+        self._lane_stats = {lane: {"admitted": 0, "total_wait": 0.0, "max_wait": 0.0} for lane in LANES}
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        # 平滑后的调用延迟（秒），作为两次减小并发之间的最短间隔
+        self._latency = 1.0
+        # 统计
+        self.admitted = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    # ------------------------------------------------------------
+    # 获取 / 释放
+    # ------------------------------------------------------------
+    def acquire(self, tokens: int = 0, lane: Optional[str] = None) -> None:
+        """同步获取调用许可（阻塞直到预算和并发允许），lane 为空时使用当前上下文的通道"""
+        waiter = _Waiter(tokens, resolve_lane(lane or current_lane()))
+        with self._lock:
+            self._waiters[waiter.lane].append(waiter)
+            wait = self._dispatch_locked(waiter)
+        try:
+            while not waiter.admitted:
+                waiter.event.wait(timeout=wait)
+                waiter.event.clear()
+                with self._lock:
+                    if waiter.admitted:
+                        break
+                    wait = self._dispatch_locked(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def aacquire(self, tokens: int = 0, lane: Optional[str] = None) -> None:
+        """异步获取调用许可（等待期间不阻塞事件循环，任务取消时自动退出队列）"""
+        waiter = _Waiter(tokens, resolve_lane(lane or current_lane()), loop=asyncio.get_running_loop())
+        with self._lock:
+            self._waiters[waiter.lane].append(waiter)
+            wait = self._dispatch_locked(waiter)
+        try:
+            while not waiter.admitted:
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                waiter.event.clear()
+                with self._lock:
+                    if waiter.admitted:
+                        break
+                    wait = self._dispatch_locked(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def release(
+        self,
+        latency: Optional[float] = None,
+        throttled: bool = False,
+        retry_after: Optional[float] = None,
+        tokens_used: Optional[int] = None,
+        tokens_reserved: int = 0
+    ) -> None:
+        """
+        释放调用许可并根据结果调整并发上限
+
+        Args:
+            latency: 调用耗时（秒），成功时提供
+            throttled: 是否被服务端限流（429）
+            retry_after: 服务端要求的等待秒数
+            tokens_used: 实际消耗的 token 数（用于修正预估值）
+            tokens_reserved: 获取许可时预估并预扣的 token 数
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            if tokens_used is not None:
+                self._tokens.consume(tokens_used - tokens_reserved, now)
+            if throttled:
+                self._on_throttled(now, retry_after)
+            elif latency is not None:
+                self._on_success(now, latency)
+            self._dispatch_locked()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """等待被中断：已放行则归还许可，否则移出队列"""
+        with self._lock:
+            if waiter.admitted:
+                self._in_flight -= 1
+            else:
+                try:
+                    self._waiters[waiter.lane].remove(waiter)
+                except ValueError:
+                    pass
+            self._dispatch_locked()
+
+    def _dispatch_locked(self, caller: Optional[_Waiter] = None) -> Optional[float]:
+        """
+        按通道权重和队列顺序放行等待中的调用（需持有锁）
+
+        Returns:
+            下一个待放行调用因预算不足需要等待的秒数；因并发已满而等待时返回 None（由 release 唤醒）
+        """
+        now = time.monotonic()
+        while True:
+            lane = self._pick_lane()
+            if lane is None:
+                return None
+            if self._in_flight >= int(self._limit):
+                return None
+
+            head = self._waiters[lane][0]
+            wait = max(
+                self._paused_until - now,
+                self._requests.wait_time(1, now),
+                self._tokens.wait_time(head.tokens, now)
+            )
+            if wait > 0:
+                # 待放行的调用需要按时间等待，确保它醒来自行重试
+                if head is not caller:
+                    head.notify()
+                return wait
+
+            self._commit_lane(lane)
+            self._waiters[lane].popleft()
+            self._requests.consume(1, now)
+            self._tokens.consume(head.tokens, now)
+            self._in_flight += 1
+            self.admitted += 1
+            waited = now - head.enqueued_at
+            self.total_wait += waited
+            lane_stats = self._lane_stats[lane]
+            lane_stats["admitted"] += 1
+            lane_stats["total_wait"] += waited
+            lane_stats["max_wait"] = max(lane_stats["max_wait"], waited)
+            head.admitted = True
+            if head is not caller:
+                head.notify()
+
+    def _pick_lane(self) -> Optional[str]:
+        """平滑加权轮询选出下一个放行的通道（只读，放行时由 _commit_lane 记账）"""
+        candidates = [lane for lane in LANES if self._waiters[lane] and self.lane_weights[lane] > 0]
+        if not candidates:
+            # 只剩权重为 0 的通道：按优先级顺序放行
+            return next((lane for lane in LANES if self._waiters[lane]), None)
+        return max(
+            candidates,
+            key=lambda lane: (self._lane_credit[lane] + self.lane_weights[lane], -LANES.index(lane))
+        )
+
+    def _commit_lane(self, chosen: str) -> None:
+        """更新各通道的轮询积分"""
+        candidates = [lane for lane in LANES if self._waiters[lane] and self.lane_weights[lane] > 0]
+        if chosen not in candidates:
+            return
+        for lane in candidates:
+            self._lane_credit[lane] += self.lane_weights[lane]
+        self._lane_credit[chosen] -= sum(self.lane_weights[lane] for lane in candidates)
+        for lane in LANES:
+            if lane not in candidates:
+                self._lane_credit[lane] = 0
+
+    # ------------------------------------------------------------
+    # AIMD
+    # ------------------------------------------------------------
+    def _on_success(self, now: float, latency: float) -> None:
+        """成功：延迟超标时温和减小，否则每轮（约 limit 次成功）并发上限 +1"""
+        self._latency += 0.2 * (latency - self._latency)
+        if self.latency_target and latency > self.latency_target:
+            self._decrease(now, 0.9)
+        else:
+            self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+
+    def _on_throttled(self, now: float, retry_after: Optional[float]) -> None:
+        """被限流：并发上限乘性减小，并按 Retry-After 暂停放行"""
+        self.throttled += 1
+        self._decrease(now, self.decrease_factor)
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+    def _decrease(self, now: float, factor: float) -> None:
+        """减小并发上限（每个调用延迟周期内最多减小一次，避免同一波 429 连续减半）"""
+        if now - self._last_decrease < self._latency:
+            return
+        old = self._limit
+        self._limit = max(self.min_concurrency, self._limit * factor)
+        self._last_decrease = now
+        logger.warning(f"LLM 并发上限调整 [{self.name}]: {old:.1f} -> {self._limit:.1f}")
+
+    # ------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------
+    @property
+    def limit(self) -> float:
+        return self._limit
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调度统计"""
+        now = time.monotonic()
+        with self._lock:
+            lanes = {}
+            for lane in LANES:
+                queue = self._waiters[lane]
+                lane_stats = self._lane_stats[lane]
+                admitted = lane_stats["admitted"]
+                lanes[lane] = {
+                    "weight": self.lane_weights[lane],
+                    "queued": len(queue),
+                    "oldest_wait": round(now - queue[0].enqueued_at, 4) if queue else 0.0,
+                    "admitted": admitted,
+                    "avg_wait": round(lane_stats["total_wait"] / admitted, 4) if admitted else 0.0,
+                    "max_wait": round(lane_stats["max_wait"], 4),
+                }
+            return {
+                "concurrency_limit": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "queued": sum(len(queue) for queue in self._waiters.values()),
+                "admitted": self.admitted,
+                "throttled": self.throttled,
+                "avg_wait": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+                "lanes": lanes,
+            }
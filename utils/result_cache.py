@@ -0,0 +1,183 @@
+"""
+分析结果缓存
+以清洗后对话 + 模型 + 提示词版本 + 分类树版本的哈希为键（utils.cache_key.make_key），
+内存 LRU（带 TTL）为一级缓存，可选 SQLite 作为二级磁盘缓存
+（读到过期行时删除；每写入 PURGE_EVERY 次清理过期行，并只保留最新的 db_max_rows 行）。
+依赖分类树的条目记录分类树版本，分类树更新后只删除旧版本的条目（prune_category_version），
+不依赖分类树的条目（如摘要）不受影响
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+
+class ResultCache:
+    """内容寻址的结果缓存（线程安全）"""
+
+    # 磁盘层每写入多少次清理一次
+    PURGE_EVERY = 100
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: float = 3600,
+        db_path: Optional[str] = None,
+        db_max_rows: int = 100000
+    ):
+        """
+        Args:
+            max_size: 内存缓存最大条目数
+            ttl: 过期时间（秒），<=0 表示不过期
+            db_path: SQLite 文件路径，为空则不启用磁盘缓存
+            db_max_rows: 磁盘缓存最大行数（超出时删除最旧的行），<=0 表示不限制
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_max_rows = db_max_rows
+        self._writes = 0
+        # key -> (写入时间, 值, 分类树版本)
+        self._memory: "OrderedDict[str, tuple[float, Dict[str, Any], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(result_cache)")}
+            if "category_version" not in columns:
+                # 旧版本创建的缓存文件没有该列，已有条目视为不依赖分类树
+                self._db.execute(
+                    "ALTER TABLE result_cache ADD COLUMN category_version TEXT NOT NULL DEFAULT ''"
+                )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS result_cache_created_at ON result_cache (created_at)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS result_cache_category_version ON result_cache (category_version)"
+            )
+            self._purge_db(time.time())
+            self._db.commit()
+            logger.info(f"结果缓存磁盘层已启用: {db_path}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value, _ = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at, category_version FROM result_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        value = json.loads(row[0])
+                        self._put_memory(key, value, row[1], row[2])
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any], category_version: str = "") -> None:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            category_version: 条目依赖的分类树版本，为空表示不依赖分类树
+        """
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, value, now, category_version)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO result_cache (key, value, created_at, category_version) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, category_version)
+                )
+                self._writes += 1
+                if self._writes % self.PURGE_EVERY == 0:
+                    self._purge_db(now)
+                self._db.commit()
+
+    def clear(self) -> None:
+        """清空缓存（包括磁盘层）"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM result_cache")
+                self._db.commit()
+        logger.info("结果缓存已清空")
+
+    def prune_category_version(self, category_version: str) -> None:
+        """删除依赖指定分类树版本的条目（包括磁盘层），不依赖分类树的条目保留"""
+        if not category_version:
+            return
+        with self._lock:
+            stale = [key for key, entry in self._memory.items() if entry[2] == category_version]
+            for key in stale:
+                del self._memory[key]
+            removed = len(stale)
+            if self._db is not None:
+                removed = self._db.execute(
+                    "DELETE FROM result_cache WHERE category_version = ?", (category_version,)
+                ).rowcount
+                self._db.commit()
+        logger.info(f"结果缓存已删除分类树版本 {category_version} 的条目: {removed}")
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "size": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0
+            }
+
+    def _purge_db(self, now: float) -> None:
+        """删除磁盘层的过期行，并只保留最新的 db_max_rows 行（调用方持有锁并负责提交）"""
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM result_cache WHERE created_at < ?", (now - self.ttl,))
+        if self.db_max_rows > 0:
+            self._db.execute(
+                "DELETE FROM result_cache WHERE key IN ("
+                "SELECT key FROM result_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.db_max_rows,)
+            )
+
+    def _put_memory(self, key: str, value: Dict[str, Any], created_at: float, category_version: str) -> None:
+        self._memory[key] = (created_at, value, category_version)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl > 0 and now - created_at > self.ttl
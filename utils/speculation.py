@@ -0,0 +1,66 @@
+"""
+一级分类分支预测（用于投机执行二级分类）
+本地打分 = 对话与分支文本（一级名称 + 其下二级名称）的字符 bigram 重合度 + 历史先验（各一级分类出现频率），
+取得分最高的几个分支，在一级分类请求进行的同时提前发起这些分支的二级分类
+"""
+import math
+import threading
+from collections import Counter
+from typing import Dict, List
+
+from utils.ngrams import char_ngrams
+
+
+class BranchPredictor:
+    """一级分类分支预测器（线程安全），并统计投机命中率"""
+
+    def __init__(self, prior_weight: float = 1.0):
+        self.prior_weight = prior_weight
+        self._priors: Counter = Counter()
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def rank(self, conversation: str, branches: Dict[str, str], top_n: int) -> List[str]:
+        """
+        按可能性排序分支
+
+        Args:
+            conversation: 对话内容
+            branches: 一级分类名称 -> 分支文本
+            top_n: 返回的分支数
+
+        Returns:
+            可能性最高的 top_n 个一级分类名称
+        """
+        grams = set(char_ngrams(conversation, (2, 2)))
+        with self._lock:
+            priors = dict(self._priors)
+        total = sum(priors.values())
+
+        scores = {}
+        for name, text in branches.items():
+            branch_grams = set(char_ngrams(text, (2, 2)))
+            overlap = len(grams & branch_grams) / math.sqrt(len(branch_grams)) if branch_grams else 0.0
+            prior = priors.get(name, 0) / total if total else 0.0
+            scores[name] = overlap + self.prior_weight * prior
+        return sorted(scores, key=scores.get, reverse=True)[:top_n]
+
+    def observe(self, level1: str) -> None:
+        """记录实际的一级分类（更新历史先验）"""
+        with self._lock:
+            self._priors[level1] += 1
+
+    def record(self, event: str, count: int = 1) -> None:
+        """记录投机事件（speculated / hits / misses / wasted_calls / skipped）"""
+        with self._lock:
+            self._counts[event] = self._counts.get(event, 0) + count
+
+    def stats(self) -> Dict[str, float]:
+        """投机执行统计"""
+        with self._lock:
+            counts = dict(self._counts)
+        speculated = counts.get("speculated", 0)
+        return {
+            **counts,
+            "hit_rate": round(counts.get("hits", 0) / speculated, 4) if speculated else 0.0
+        }
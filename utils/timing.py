@@ -0,0 +1,54 @@
+"""
+阶段计时工具
+记录每个处理阶段相对请求开始的起止时间，便于观察并行阶段的重叠情况
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from loguru import logger
+
+
+class StageTimer:
+    """阶段计时器
+
+    用法：
+        timer = StageTimer()
+        with timer.stage("classify"):
+            ...
+        timer.log("会话 xxx")
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        # 阶段名 -> (开始偏移秒, 结束偏移秒)
+        self._stages: Dict[str, Tuple[float, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录一个阶段的起止时间（同步/异步代码中均可使用）"""
+        start = time.perf_counter() - self._origin
+        try:
+            yield
+        finally:
+            self._stages[name] = (start, time.perf_counter() - self._origin)
+
+    @property
+    def total(self) -> float:
+        """从计时器创建到现在的总耗时（秒）"""
+        return time.perf_counter() - self._origin
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """返回各阶段的开始偏移与耗时（秒）"""
+        return {
+            name: {"start": round(start, 3), "duration": round(end - start, 3)}
+            for name, (start, end) in self._stages.items()
+        }
+
+    def log(self, prefix: str = "") -> None:
+        """打印各阶段耗时（+开始偏移/耗时）"""
+        parts = [
+            f"{name}=+{start:.3f}s/{end - start:.3f}s"
+            for name, (start, end) in self._stages.items()
+        ]
+        logger.info(f"{prefix}阶段耗时: {', '.join(parts)}, total={self.total:.3f}s")
@@ -0,0 +1,106 @@
+"""
+本地 tokenizer 加载
+tiktoken 首次使用某个编码时会从网络下载 BPE 文件。把这些文件预先放入 TOKENIZER_CACHE_DIR
+（随镜像打包），运行时只读取本地文件；tiktoken 本身也延迟到第一次计数时才导入。
+
+打包（在有网络的构建环境中执行，把所用模型的编码文件下载到该目录）：
+    python -m utils.tokenizer [模型名 ...]
+"""
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from config.settings import settings
+
+# 模型不在 tiktoken 预设中时使用的编码
+FALLBACK_ENCODING = "cl100k_base"
+
+# 模型名 -> tokenizer（加载失败时为 None，不再重试）
+_tokenizers: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def bundled_cache_dir() -> Optional[Path]:
+    """随项目打包的编码文件目录（相对路径基于项目根目录）"""
+    if not settings.tokenizer_cache_dir:
+        return None
+    path = Path(settings.tokenizer_cache_dir)
+    if not path.is_absolute():
+        path = Path(__file__).parent.parent / path
+    return path
+
+
+def _use_bundled_cache(create: bool = False) -> None:
+    """让 tiktoken 从打包目录读取编码文件（已显式设置 TIKTOKEN_CACHE_DIR 时不覆盖）"""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        return
+    path = bundled_cache_dir()
+    if path is None:
+        return
+    if create:
+        path.mkdir(parents=True, exist_ok=True)
+    if path.is_dir():
+        os.environ["TIKTOKEN_CACHE_DIR"] = str(path)
+
+
+def _load(model: str):
+    _use_bundled_cache()
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("未安装 tiktoken，token统计将按字符数估算")
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # 模型不在 tiktoken 的预设中或编码文件不可用，尝试通用编码
+        try:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+        except Exception as e:
+            logger.warning(f"Tokenizer初始化失败，token统计将不可用: {e}")
+            return None
+
+
+def get_tokenizer(model: str):
+    """
+    获取模型的 tokenizer（首次调用时加载，进程内共享）
+
+    Returns:
+        tiktoken Encoding，不可用时返回 None
+    """
+    if model in _tokenizers:
+        return _tokenizers[model]
+    with _lock:
+        if model not in _tokenizers:
+            _tokenizers[model] = _load(model)
+        return _tokenizers[model]
+
+
+def loaded_models() -> List[str]:
+    """已加载（或已尝试加载）tokenizer 的模型"""
+    return list(_tokenizers)
+
+
+def preload(*models: str) -> threading.Thread:
+    """在后台线程中预先加载 tokenizer（不阻塞服务启动）"""
+    thread = threading.Thread(
+        target=lambda: [get_tokenizer(model) for model in models],
+        name="tokenizer-preload",
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    _use_bundled_cache(create=True)
+    names = sys.argv[1:] or sorted({settings.default_model, settings.agent_model})
+    for name in names:
+        tokenizer = get_tokenizer(name)
+        logger.info(f"{name}: {tokenizer.name if tokenizer is not None else '不可用'}")
+    logger.success(f"编码文件目录: {os.environ.get('TIKTOKEN_CACHE_DIR')}")